@@ -20,12 +20,14 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "drf_spectacular",
     "todo",
 ]
 
 MIDDLEWARE = [
+    "todo.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -68,6 +70,21 @@ DATABASES = {
     }
 }
 
+if os.getenv("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST"),
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["todo.routers.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+# Окно read-your-writes: после записи чтения пользователя идут в primary
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5"))
+DATABASE_REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "2"))
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("DATABASE_REPLICA_LAG_CHECK_INTERVAL", "5"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -91,8 +108,17 @@ LANGUAGE_CODE = "en-us"
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "static"
 
+# Загруженные файлы (импорт задач); каталог должен быть общим для backend и celery_worker
+MEDIA_URL = "media/"
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / "media"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Админка больших таблиц: выше порога нефильтрованный счётчик берётся из pg_class.reltuples,
+# точный COUNT для отфильтрованных списков ограничен таймаутом
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", "100000"))
+ADMIN_COUNT_TIMEOUT_MS = int(os.getenv("ADMIN_COUNT_TIMEOUT_MS", "1000"))
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "todo.auth.TelegramUserAuthentication",
@@ -101,11 +127,48 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_CLASSES": [
+        "todo.throttling.TelegramUserRateThrottle",
+    ],
+    # Token bucket на пользователя: N запросов — ёмкость (допустимый всплеск) и пополнение за период.
+    # Пустое значение отключает ограничение для скоупа.
+    "DEFAULT_THROTTLE_RATES": {
+        "read": os.getenv("THROTTLE_RATE_READ", "120/min"),
+        "write": os.getenv("THROTTLE_RATE_WRITE", "30/min"),
+        "register": os.getenv("THROTTLE_RATE_REGISTER", "5/min"),
+    },
+}
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+# Таймаут (секунды) прямых обращений к Redis из запросов API
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+# Idempotency-Key: сколько хранится первый ответ и сколько живёт метка «запрос выполняется»
+IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TTL = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "60"))
+
+# Поток событий об изменениях Task/Category/UserProfile: redis (Redis Stream в REDIS_URL),
+# memory (в памяти процесса — тесты и локальный запуск) или пусто — события не публикуются
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "redis")
+EVENTS_STREAM = os.getenv("EVENTS_STREAM", "todo:events")
+EVENTS_STREAM_MAXLEN = int(os.getenv("EVENTS_STREAM_MAXLEN", "100000"))
+# сколько секунд процесс помнит Telegram id пользователя для событий вне запросов бота
+EVENTS_TELEGRAM_ID_CACHE_SECONDS = int(os.getenv("EVENTS_TELEGRAM_ID_CACHE_SECONDS", "60"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_REDIS_URL", REDIS_URL),
+    }
 }
 
-CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 CELERY_TIMEZONE = TIME_ZONE
+# Заголовок X-DB-Query-Count в ответах (нужен нагрузочному бенчмарку, в проде выключен)
+METRICS_QUERY_COUNT_HEADER = os.getenv("METRICS_QUERY_COUNT_HEADER", "False") == "True"
+
+# Порт HTTP-эндпоинта метрик Celery-воркера (0 — не поднимать)
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", "0"))
 CELERY_BEAT_SCHEDULE = {
     "task-due-check": {
         "task": "todo.tasks.send_task_due_notifications",
@@ -123,6 +186,10 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
     "COMPONENT_SPLIT_REQUEST": True,
 }
+# Готовая схема OpenAPI (генерируется при старте: manage.py spectacular --file ...) и сколько секунд
+# клиенты кешируют её ответ; без файла схема один раз строится в процессе
+API_SCHEMA_FILE = os.getenv("API_SCHEMA_FILE", str(BASE_DIR / "openapi.yaml"))
+API_SCHEMA_CACHE_SECONDS = int(os.getenv("API_SCHEMA_CACHE_SECONDS", "86400"))
 
 
 
@@ -0,0 +1,281 @@
+"""
+Нагрузочный бенчмарк REST API с трафиком, похожим на Telegram-бота.
+
+Запуск против локально поднятого backend (для подсчёта SQL-запросов backend
+должен работать с METRICS_QUERY_COUNT_HEADER=True). Baseline в репозитории не хранится —
+цифры зависят от машины, поэтому сначала сохраните прогон на своём окружении:
+
+    python -m benchmarks.loadtest --output benchmarks/baseline.json
+
+и сравнивайте с ним следующие прогоны:
+
+    python -m benchmarks.loadtest --base-url http://localhost:8000 --duration 30 \\
+        --output bench.json --baseline benchmarks/baseline.json
+
+Код возврата 1 — найдена регрессия относительно baseline, 2 — файл baseline не найден.
+
+Ответы 429 (лимиты THROTTLE_RATE_*) считаются отдельно и не входят в перцентили и RPS:
+для честного замера backend запускают с поднятыми лимитами, например THROTTLE_RATE_READ=100000/min.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# Доли операций в трафике (примерно как у бота: много чтений, немного записей)
+TRAFFIC_MIX = {
+    "register": 10,
+    "list_tasks": 40,
+    "list_categories": 20,
+    "create_task": 15,
+    "update_task": 15,
+}
+CATEGORY_NAMES = ["Работа", "Дом", "Учёба", "Покупки", "Здоровье"]
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    errors: int = 0
+    throttled: int = 0
+
+    def record(self, latency: float, response: Optional[httpx.Response]) -> None:
+        # быстрые отказы лимитера исказили бы перцентили — считаем их отдельно
+        if response is not None and response.status_code == 429:
+            self.throttled += 1
+            return
+        self.latencies.append(latency)
+        if response is None or response.status_code >= 400:
+            self.errors += 1
+            return
+        raw_queries = response.headers.get("X-DB-Query-Count")
+        if raw_queries is not None:
+            self.queries.append(int(raw_queries))
+
+
+@dataclass
+class VirtualUser:
+    telegram_user_id: int
+    task_ids: List[str] = field(default_factory=list)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"X-Telegram-User-Id": str(self.telegram_user_id)}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.users = [VirtualUser(args.telegram_id_base + idx) for idx in range(args.users)]
+        self.operations = list(TRAFFIC_MIX)
+        self.weights = [TRAFFIC_MIX[name] for name in self.operations]
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=self.args.base_url.rstrip("/"), timeout=self.args.timeout, limits=limits
+        ) as client:
+            for user in self.users:
+                await self._register(client, user, record=False)
+
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            workers = [
+                self._worker(client, random.Random(f"{self.args.seed}:{idx}"), deadline)
+                for idx in range(self.args.concurrency)
+            ]
+            await asyncio.gather(*workers)
+            elapsed = time.perf_counter() - started
+        return self._report(elapsed)
+
+    async def _worker(self, client: httpx.AsyncClient, rng: random.Random, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            user = rng.choice(self.users)
+            operation = rng.choices(self.operations, weights=self.weights)[0]
+            if operation == "update_task" and not user.task_ids:
+                operation = "create_task"
+            await getattr(self, f"_{operation}")(client, user, rng=rng)
+
+    async def _timed(self, name: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await request
+        except httpx.HTTPError:
+            pass
+        self.stats[name].record(time.perf_counter() - start, response)
+        return response
+
+    async def _register(self, client, user: VirtualUser, record: bool = True, **_) -> None:
+        request = client.post(
+            "/api/telegram/register/", json={"telegram_chat_id": user.telegram_user_id}, headers=user.headers
+        )
+        if record:
+            await self._timed("register", request)
+        else:
+            (await request).raise_for_status()
+
+    async def _list_tasks(self, client, user: VirtualUser, **_) -> None:
+        await self._timed("list_tasks", client.get("/api/tasks/", headers=user.headers))
+
+    async def _list_categories(self, client, user: VirtualUser, **_) -> None:
+        await self._timed("list_categories", client.get("/api/categories/", headers=user.headers))
+
+    async def _create_task(self, client, user: VirtualUser, rng: random.Random) -> None:
+        due_date = datetime.now(timezone.utc) + timedelta(days=rng.uniform(1, 30))
+        payload = {
+            "title": f"Бенчмарк #{rng.randrange(10 ** 9)}",
+            "description": "",
+            "due_date": due_date.isoformat(),
+            "category_names": rng.sample(CATEGORY_NAMES, rng.randint(0, 2)),
+        }
+        response = await self._timed("create_task", client.post("/api/tasks/", json=payload, headers=user.headers))
+        if response is not None and response.status_code == 201:
+            user.task_ids.append(response.json()["id"])
+
+    async def _update_task(self, client, user: VirtualUser, rng: random.Random) -> None:
+        task_id = rng.choice(user.task_ids)
+        payload = {"is_completed": rng.random() < 0.5}
+        await self._timed(
+            "update_task", client.patch(f"/api/tasks/{task_id}/", json=payload, headers=user.headers)
+        )
+
+    def _report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name, stats in sorted(self.stats.items()):
+            endpoints[name] = {
+                "requests": len(stats.latencies),
+                "errors": stats.errors,
+                "throttled": stats.throttled,
+                "throughput_rps": round(len(stats.latencies) / elapsed, 2),
+                "p50_ms": _ms(percentile(stats.latencies, 50)),
+                "p95_ms": _ms(percentile(stats.latencies, 95)),
+                "p99_ms": _ms(percentile(stats.latencies, 99)),
+                "queries_per_request": (
+                    round(sum(stats.queries) / len(stats.queries), 2) if stats.queries else None
+                ),
+            }
+        total = sum(item["requests"] for item in endpoints.values())
+        return {
+            "meta": {
+                "base_url": self.args.base_url,
+                "users": self.args.users,
+                "concurrency": self.args.concurrency,
+                "duration_s": round(elapsed, 2),
+                "seed": self.args.seed,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            },
+            "total_throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 2) if value is not None else None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Возвращает список регрессий относительно baseline."""
+    regressions = []
+    for name, base in baseline.get("endpoints", {}).items():
+        cur = current["endpoints"].get(name)
+        if cur is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base.get(metric) and cur.get(metric) and cur[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {base[metric]} -> {cur[metric]}")
+        if base.get("throughput_rps") and cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {base['throughput_rps']} -> {cur['throughput_rps']}")
+        base_queries, cur_queries = base.get("queries_per_request"), cur.get("queries_per_request")
+        if base_queries is not None and cur_queries is not None and cur_queries > base_queries + 0.5:
+            regressions.append(f"{name}: queries_per_request {base_queries} -> {cur_queries}")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'endpoint':<16}{'req':>8}{'err':>6}{'429':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, item in report["endpoints"].items():
+        print(
+            f"{name:<16}{item['requests']:>8}{item['errors']:>6}{item['throttled']:>6}{item['throughput_rps']:>9}"
+            f"{item['p50_ms'] or '-':>9}{item['p95_ms'] or '-':>9}{item['p99_ms'] or '-':>9}"
+            f"{item['queries_per_request'] if item['queries_per_request'] is not None else '-':>7}"
+        )
+    print(f"\nВсего: {report['total_throughput_rps']} req/s")
+    throttled = sum(item["throttled"] for item in report["endpoints"].values())
+    if throttled:
+        print(f"Отклонено лимитами (429): {throttled} — поднимите THROTTLE_RATE_* на время бенчмарка")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк Telegram ToDo API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50, help="Количество виртуальных Telegram-пользователей")
+    parser.add_argument("--concurrency", type=int, default=20, help="Количество параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=30.0, help="Длительность прогона, секунды")
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--telegram-id-base", type=int, default=8_000_000_000)
+    parser.add_argument("--output", default="bench.json", help="Куда записать результаты в JSON")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Допустимое ухудшение латентности/RPS")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    baseline = None
+    if args.baseline:
+        # проверяем до прогона, чтобы не ждать --duration впустую
+        try:
+            with open(args.baseline, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        except FileNotFoundError:
+            print(
+                f"Baseline {args.baseline} не найден. Сначала сохраните прогон: "
+                f"python -m benchmarks.loadtest --output {args.baseline}",
+                file=sys.stderr,
+            )
+            return 2
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+
+    if baseline is None:
+        return 0
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print("\nРегрессии относительно baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nРегрессий относительно baseline нет.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,58 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
-from .models import Category, Task, UserProfile
+from .admin_pagination import CURSOR_VAR, LargeTableAdminMixin
+from .models import TASK_SEARCH_VECTOR, Category, Task, UserProfile, task_prefix_query
+
+User = get_user_model()
+
+
+def _username_prefix(term: str) -> Q:
+    """Поиск пользователя по префиксу username через индекс *_like (varchar_pattern_ops)."""
+    return Q(user_id__in=User.objects.filter(username__startswith=term).values("pk"))
+
+
+class CategoryIdFilter(admin.SimpleListFilter):
+    """
+    Фильтр по категории без загрузки всех категорий в сайдбар.
+
+    Вместо списка выводится поле ввода id категории; из БД читается только выбранная категория.
+    """
+
+    title = "категории"
+    parameter_name = "category"
+    template = "admin/todo/input_filter.html"
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if value and value.isdigit():
+            return list(Category.objects.filter(pk=int(value)).values_list("pk", "name"))
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            raise IncorrectLookupParameters
+        return queryset.filter(categories=int(value))
+
+    def choices(self, changelist):
+        skip = {self.parameter_name, PAGE_VAR, CURSOR_VAR}
+        selected = self.lookup_choices[0][1] if self.lookup_choices else None
+        yield {
+            "value": self.value() or "",
+            "selected_name": selected,
+            "parameter_name": self.parameter_name,
+            "hidden": [(key, value) for key, value in changelist.params.items() if key not in skip],
+            "reset_url": changelist.get_query_string(remove=[self.parameter_name]),
+        }
 
 
 @admin.register(Category)
@@ -14,22 +66,51 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
-    """Настройки админки для задач."""
+class TaskAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Настройки админки для задач.
+
+    Рассчитана на десятки миллионов строк: оценочный счётчик, keyset-пагинация
+    по (created_at, id), поиск по полнотекстовому GIN-индексу и ленивый фильтр категорий.
+    """
 
     list_display = ("id", "title", "user", "due_date", "is_completed", "created_at")
-    list_filter = ("is_completed", "due_date", "created_at", "categories")
+    list_filter = ("is_completed", "due_date", "created_at", CategoryIdFilter)
+    list_select_related = ("user",)
     search_fields = ("title", "description", "user__username")
+    search_help_text = "Поиск по словам (и их началу) в названии и описании, префиксу username или id задачи."
     autocomplete_fields = ("user", "categories")
-    readonly_fields = ("id", "created_at")
+    readonly_fields = ("id", "created_at", "series_start")
+    keyset_fields = ("created_at", "pk")
+
+    def get_search_results(self, request, queryset, search_term):
+        """Индексный поиск вместо icontains: tsvector по title/description, префикс username, точный id."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        condition = Q(pk=search_term) | _username_prefix(search_term)
+        query = task_prefix_query(search_term)
+        if query is not None:
+            condition |= Q(search=query)
+        return queryset.alias(search=TASK_SEARCH_VECTOR).filter(condition), False
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Настройки админки для профилей пользователей."""
 
     list_display = ("user", "telegram_user_id", "telegram_chat_id")
+    list_select_related = ("user",)
     search_fields = ("user__username", "telegram_user_id", "telegram_chat_id")
+    search_help_text = "Telegram user/chat id целиком или префикс username."
 
-
-
+    def get_search_results(self, request, queryset, search_term):
+        """Точный поиск по уникальным Telegram id и по префиксу username — только по индексам."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = _username_prefix(search_term)
+        if search_term.lstrip("-").isdigit():
+            telegram_id = int(search_term)
+            condition |= Q(telegram_user_id=telegram_id) | Q(telegram_chat_id=telegram_id)
+        return queryset.filter(condition), False
@@ -0,0 +1,147 @@
+import base64
+import binascii
+import json
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections, transaction
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+CURSOR_VAR = "cursor"
+
+
+def estimated_row_count(queryset: QuerySet) -> Optional[int]:
+    """Оценка количества строк таблицы из pg_class.reltuples (None, если статистики ещё нет)."""
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор без дорогого COUNT(*) на больших таблицах.
+
+    Для нефильтрованного списка берёт оценку из pg_class.reltuples, если таблица больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD строк. Отфильтрованный список считается точно,
+    но с statement_timeout; при таймауте возвращается оценка.
+    """
+
+    is_estimate = False
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                self.is_estimate = True
+                return estimate
+        try:
+            with transaction.atomic(using=queryset.db), connections[queryset.db].cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('statement_timeout', %s, true)", [str(settings.ADMIN_COUNT_TIMEOUT_MS)]
+                )
+                return super().count
+        except OperationalError:
+            self.is_estimate = True
+            return estimated_row_count(queryset) or 0
+
+
+def _encode_cursor(values: Sequence) -> str:
+    raw = json.dumps([value.isoformat() if hasattr(value, "isoformat") else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, size: int) -> List:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, ValueError, UnicodeError):
+        raise IncorrectLookupParameters
+    if not isinstance(values, list) or len(values) != size:
+        raise IncorrectLookupParameters
+    return values
+
+
+def _after_cursor(fields: Sequence[str], values: List) -> Q:
+    """Условие (f1, f2, ...) < (v1, v2, ...) для сортировки по убыванию."""
+    condition = Q()
+    for idx, field in enumerate(fields):
+        equal = {name: values[pos] for pos, name in enumerate(fields[:idx])}
+        condition |= Q(**equal, **{f"{field}__lt": values[idx]})
+    return condition
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList с keyset-пагинацией для сортировки по умолчанию.
+
+    Поля ключа берутся из `keyset_fields` ModelAdmin (по убыванию, последним — pk).
+    Ссылка «Дальше» несёт курсор последней строки страницы, поэтому глубокие страницы
+    не требуют OFFSET. При явной сортировке по колонке работает обычная пагинация.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.keyset = False
+        self.next_page_url = None
+        self.first_page_url = None
+        self.result_count_is_estimate = False
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        # курсор не должен переноситься в ссылки фильтров и сортировки
+        self.params.pop(CURSOR_VAR, None)
+        keyset_fields = self.model_admin.keyset_fields
+        self.keyset = bool(keyset_fields) and ORDER_VAR not in self.params and not self.show_all
+        if not self.keyset:
+            super().get_results(request)
+            self.result_count_is_estimate = getattr(self.paginator, "is_estimate", False)
+            return
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        queryset = self.queryset.order_by(*(f"-{field}" for field in keyset_fields))
+        if self.cursor:
+            values = _decode_cursor(self.cursor, len(keyset_fields))
+            queryset = queryset.filter(_after_cursor(keyset_fields, values))
+        rows = list(queryset[: self.list_per_page + 1])
+
+        self.result_list = rows[: self.list_per_page]
+        self.result_count = paginator.count
+        self.result_count_is_estimate = getattr(paginator, "is_estimate", False)
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.can_show_all = False
+        self.multi_page = len(rows) > self.list_per_page or bool(self.cursor)
+        self.paginator = paginator
+        self.first_page_url = self.get_query_string(remove=[CURSOR_VAR])
+        if len(rows) > self.list_per_page:
+            last = self.result_list[-1]
+            cursor = _encode_cursor([getattr(last, field) for field in keyset_fields])
+            self.next_page_url = self.get_query_string({CURSOR_VAR: cursor})
+
+
+class LargeTableAdminMixin:
+    """Настройки ModelAdmin для таблиц на миллионы строк: оценочный счётчик и keyset-пагинация."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    keyset_fields: Sequence[str] = ("pk",)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -5,5 +5,10 @@ class TodoConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "todo"
 
+    def ready(self):
+        from . import events, schema  # noqa: F401 — schema регистрирует расширение аутентификации OpenAPI
+
+        events.connect_signals()
+
 
 
@@ -0,0 +1,424 @@
+"""
+Поток событий об изменениях данных.
+
+После фиксации транзакции (transaction.on_commit) каждое создание, изменение и удаление
+Task, Category и UserProfile публикуется компактной записью в Redis Stream EVENTS_STREAM.
+Потребители — кеши бота, планировщики — подписываются на поток вместо опроса Postgres:
+XREAD для рассылки всем процессам (инвалидация кешей) или группы потребителей
+(EventConsumer), когда каждое событие должен обработать ровно один процесс.
+
+Поля записи:
+- e — сущность: task, category, profile или user — массовое изменение данных пользователя
+  (импорт), по которому потребитель сбрасывает всё, что знает о пользователе;
+- k — created, updated или deleted;
+- u — id пользователя Django, tg — Telegram user id (если известен);
+- id — id сущности;
+- due, done — due_date (ISO 8601) и is_completed задачи.
+
+bulk_create и QuerySet.update сигналов не вызывают: такие места публикуют события
+сами (см. publish), либо события для них не нужны.
+
+Событие, обработчик которого раз за разом падает, после EventConsumer.max_deliveries доставок
+переносится в поток `<EVENTS_STREAM>:dead` и подтверждается, чтобы не крутиться в pending вечно.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from redis.exceptions import RedisError, ResponseError
+
+from .metrics import CHANGE_EVENTS_FAILED, CHANGE_EVENTS_PUBLISHED
+from .models import Category, Task, UserProfile
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+TRACKED_MODELS = (Task, Category, UserProfile)
+
+# user id -> (время запроса, Telegram id) для событий вне запросов бота
+TELEGRAM_ID_CACHE_SIZE = 10000
+_telegram_ids: Dict[int, Tuple[float, Optional[int]]] = {}
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    entity: str
+    kind: str
+    user_id: int
+    entity_id: str
+    telegram_user_id: Optional[int] = None
+    due_date: Optional[str] = None
+    is_completed: Optional[bool] = None
+
+    def to_fields(self) -> Dict[str, str]:
+        fields = {"e": self.entity, "k": self.kind, "u": str(self.user_id), "id": self.entity_id}
+        if self.telegram_user_id is not None:
+            fields["tg"] = str(self.telegram_user_id)
+        if self.due_date is not None:
+            fields["due"] = self.due_date
+        if self.is_completed is not None:
+            fields["done"] = "1" if self.is_completed else "0"
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Mapping[Any, Any]) -> "ChangeEvent":
+        data = {_text(key): _text(value) for key, value in fields.items()}
+        return cls(
+            entity=data["e"],
+            kind=data["k"],
+            user_id=int(data["u"]),
+            entity_id=data["id"],
+            telegram_user_id=int(data["tg"]) if "tg" in data else None,
+            due_date=data.get("due"),
+            is_completed=data["done"] == "1" if "done" in data else None,
+        )
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+# ----------------------------- хранилища ----------------------------- #
+
+class RedisStreamBackend:
+    """События в Redis Stream; длина потока ограничена приблизительным MAXLEN."""
+
+    def __init__(self, client: redis.Redis, stream: str, maxlen: int):
+        self.client = client
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def publish(self, events: Sequence[ChangeEvent]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(self.stream, event.to_fields(), maxlen=self.maxlen, approximate=True)
+        pipe.execute()
+
+    def read(
+        self, last_id: str = "$", count: int = 100, block_ms: Optional[int] = None
+    ) -> List[Tuple[str, ChangeEvent]]:
+        response = self.client.xread({self.stream: last_id}, count=count, block=block_ms)
+        return _parse_entries(response)
+
+    def ensure_group(self, group: str, start_id: str = "$") -> None:
+        try:
+            self.client.xgroup_create(self.stream, group, id=start_id, mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def read_group(
+        self, group: str, consumer: str, count: int = 100, block_ms: Optional[int] = None
+    ) -> List[Tuple[str, ChangeEvent]]:
+        response = self.client.xreadgroup(group, consumer, {self.stream: ">"}, count=count, block=block_ms)
+        return _parse_entries(response)
+
+    def ack(self, group: str, ids: Sequence[str]) -> None:
+        if ids:
+            self.client.xack(self.stream, group, *ids)
+
+    def claim_stale(
+        self, group: str, consumer: str, min_idle_ms: int, count: int = 100
+    ) -> List[Tuple[str, ChangeEvent]]:
+        _, entries, _ = self.client.xautoclaim(self.stream, group, consumer, min_idle_ms, count=count)
+        return [(_text(entry_id), ChangeEvent.from_fields(fields)) for entry_id, fields in entries if fields]
+
+    def delivery_count(self, group: str, entry_id: str) -> int:
+        pending = self.client.xpending_range(self.stream, group, min=entry_id, max=entry_id, count=1)
+        return pending[0]["times_delivered"] if pending else 0
+
+    def dead_letter(self, group: str, entry_id: str, event: ChangeEvent) -> None:
+        fields = {**event.to_fields(), "group": group, "src": entry_id}
+        self.client.xadd(f"{self.stream}:dead", fields, maxlen=self.maxlen, approximate=True)
+
+
+def _parse_entries(response) -> List[Tuple[str, ChangeEvent]]:
+    return [
+        (_text(entry_id), ChangeEvent.from_fields(fields))
+        for _, entries in response or []
+        for entry_id, fields in entries
+    ]
+
+
+class InMemoryBackend:
+    """
+    Поток в памяти процесса с тем же API (тесты, локальный запуск без Redis).
+
+    Блокирующего ожидания нет: чтение сразу возвращает то, что уже опубликовано.
+    """
+
+    def __init__(self, maxlen: int = 100000):
+        self.maxlen = maxlen
+        self.entries: List[Tuple[str, ChangeEvent]] = []
+        self._sequence = 0
+        # группа -> (номер последней выданной записи, неподтверждённые id -> (потребитель, время выдачи, доставок))
+        self._groups: Dict[str, Tuple[int, Dict[str, Tuple[str, float, int]]]] = {}
+        self.dead: List[Tuple[str, str, ChangeEvent]] = []
+
+    def publish(self, events: Sequence[ChangeEvent]) -> None:
+        for event in events:
+            self._sequence += 1
+            self.entries.append((f"{self._sequence}-0", event))
+        del self.entries[: max(len(self.entries) - self.maxlen, 0)]
+
+    def _after(self, sequence: int) -> List[Tuple[str, ChangeEvent]]:
+        return [entry for entry in self.entries if int(entry[0].split("-")[0]) > sequence]
+
+    def read(
+        self, last_id: str = "$", count: int = 100, block_ms: Optional[int] = None
+    ) -> List[Tuple[str, ChangeEvent]]:
+        if last_id == "$":
+            return []
+        return self._after(int(last_id.split("-")[0]))[:count]
+
+    def ensure_group(self, group: str, start_id: str = "$") -> None:
+        if group not in self._groups:
+            start = self._sequence if start_id == "$" else int(start_id.split("-")[0])
+            self._groups[group] = (start, {})
+
+    def read_group(
+        self, group: str, consumer: str, count: int = 100, block_ms: Optional[int] = None
+    ) -> List[Tuple[str, ChangeEvent]]:
+        last, pending = self._groups[group]
+        batch = self._after(last)[:count]
+        if batch:
+            now = time.monotonic()
+            pending.update((entry_id, (consumer, now, 1)) for entry_id, _ in batch)
+            self._groups[group] = (int(batch[-1][0].split("-")[0]), pending)
+        return batch
+
+    def ack(self, group: str, ids: Sequence[str]) -> None:
+        pending = self._groups[group][1]
+        for entry_id in ids:
+            pending.pop(entry_id, None)
+
+    def claim_stale(
+        self, group: str, consumer: str, min_idle_ms: int, count: int = 100
+    ) -> List[Tuple[str, ChangeEvent]]:
+        pending = self._groups[group][1]
+        deadline = time.monotonic() - min_idle_ms / 1000
+        stale = [entry_id for entry_id, (_, issued, _) in pending.items() if issued <= deadline][:count]
+        events = dict(self.entries)
+        now = time.monotonic()
+        for entry_id in stale:
+            pending[entry_id] = (consumer, now, pending[entry_id][2] + 1)
+        return [(entry_id, events[entry_id]) for entry_id in stale if entry_id in events]
+
+    def delivery_count(self, group: str, entry_id: str) -> int:
+        pending = self._groups[group][1].get(entry_id)
+        return pending[2] if pending else 0
+
+    def dead_letter(self, group: str, entry_id: str, event: ChangeEvent) -> None:
+        self.dead.append((group, entry_id, event))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Хранилище событий по EVENTS_BACKEND: redis, memory или None (публикация выключена)."""
+    if settings.EVENTS_BACKEND == "redis":
+        return RedisStreamBackend(get_redis(), settings.EVENTS_STREAM, settings.EVENTS_STREAM_MAXLEN)
+    if settings.EVENTS_BACKEND == "memory":
+        return InMemoryBackend(settings.EVENTS_STREAM_MAXLEN)
+    return None
+
+
+# ----------------------------- публикация ----------------------------- #
+
+def publish(events: Iterable[ChangeEvent], using: Optional[str] = None) -> None:
+    """
+    Публикует события после фиксации текущей транзакции (вне транзакции — сразу).
+
+    При откате транзакции события не публикуются. Ошибка Redis не ломает запрос:
+    событие теряется, а потребители страхуются TTL своих кешей.
+    """
+    events = list(events)
+    if events and get_backend() is not None:
+        transaction.on_commit(lambda: _send(events), using=using)
+
+
+def _send(events: List[ChangeEvent]) -> None:
+    try:
+        get_backend().publish(events)
+    except RedisError as exc:
+        logger.warning("Не удалось опубликовать %d событий изменений: %s", len(events), exc)
+        CHANGE_EVENTS_FAILED.inc(len(events))
+        return
+    for event in events:
+        CHANGE_EVENTS_PUBLISHED.labels(event.entity, event.kind).inc()
+
+
+def task_event(task: Task, kind: str, telegram_user_id: Optional[int] = None) -> ChangeEvent:
+    return ChangeEvent(
+        entity="task",
+        kind=kind,
+        user_id=task.user_id,
+        entity_id=str(task.pk),
+        telegram_user_id=telegram_user_id,
+        due_date=task.due_date.astimezone(dt_timezone.utc).isoformat() if task.due_date else None,
+        is_completed=task.is_completed,
+    )
+
+
+def category_event(category: Category, kind: str, telegram_user_id: Optional[int] = None) -> ChangeEvent:
+    return ChangeEvent("category", kind, category.user_id, str(category.pk), telegram_user_id)
+
+
+def profile_event(profile: UserProfile, kind: str) -> ChangeEvent:
+    return ChangeEvent("profile", kind, profile.user_id, str(profile.pk), profile.telegram_user_id)
+
+
+def user_event(user_id: int, telegram_user_id: Optional[int] = None) -> ChangeEvent:
+    """Массовое изменение данных пользователя: потребитель сбрасывает всё, что знает о нём."""
+    return ChangeEvent("user", UPDATED, user_id, str(user_id), telegram_user_id)
+
+
+def _telegram_user_id(instance) -> Optional[int]:
+    """
+    Telegram id владельца. В запросах бота пользователь и профиль уже загружены
+    аутентификацией, поэтому обычно обходится без запроса к БД; в остальных случаях
+    (админка, задачи Celery) id берётся из кеша процесса или одним запросом на пользователя.
+    """
+    user_field = type(instance)._meta.get_field("user")
+    if user_field.is_cached(instance):
+        user = instance.user
+        profile_rel = type(user)._meta.get_field("profile")
+        if profile_rel.is_cached(user):
+            profile = getattr(user, "profile", None)
+            return profile.telegram_user_id if profile else None
+
+    now = time.monotonic()
+    cached = _telegram_ids.get(instance.user_id)
+    if cached and now - cached[0] < settings.EVENTS_TELEGRAM_ID_CACHE_SECONDS:
+        return cached[1]
+    telegram_user_id = (
+        UserProfile.objects.filter(user_id=instance.user_id).values_list("telegram_user_id", flat=True).first()
+    )
+    _remember_telegram_id(instance.user_id, telegram_user_id)
+    return telegram_user_id
+
+
+def _remember_telegram_id(user_id: int, telegram_user_id: Optional[int]) -> None:
+    if len(_telegram_ids) >= TELEGRAM_ID_CACHE_SIZE:
+        _telegram_ids.clear()
+    _telegram_ids[user_id] = (time.monotonic(), telegram_user_id)
+
+
+def _event_for(instance, kind: str) -> ChangeEvent:
+    if isinstance(instance, UserProfile):
+        # смена профиля сразу видна кешу Telegram id этого процесса, в остальных — через TTL
+        _remember_telegram_id(instance.user_id, None if kind == DELETED else instance.telegram_user_id)
+        return profile_event(instance, kind)
+    if isinstance(instance, Task):
+        return task_event(instance, kind, _telegram_user_id(instance))
+    return category_event(instance, kind, _telegram_user_id(instance))
+
+
+def _on_save(sender, instance, created: bool, raw: bool = False, using: Optional[str] = None, **kwargs) -> None:
+    if raw:
+        # loaddata
+        return
+    publish([_event_for(instance, CREATED if created else UPDATED)], using=using)
+
+
+def _on_delete(sender, instance, using: Optional[str] = None, **kwargs) -> None:
+    publish([_event_for(instance, DELETED)], using=using)
+
+
+def _on_task_categories(sender, instance, action: str, using: Optional[str] = None, **kwargs) -> None:
+    """Смена категорий задачи — тоже изменение задачи (для category.tasks.add — изменение категории)."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        publish([_event_for(instance, UPDATED)], using=using)
+
+
+def connect_signals() -> None:
+    """Подключает публикацию событий к сигналам моделей (вызывается из TodoConfig.ready)."""
+    if get_backend() is None:
+        return
+    for model in TRACKED_MODELS:
+        post_save.connect(_on_save, sender=model, dispatch_uid=f"todo-events-save-{model.__name__}")
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f"todo-events-delete-{model.__name__}")
+    m2m_changed.connect(
+        _on_task_categories, sender=Task.categories.through, dispatch_uid="todo-events-task-categories"
+    )
+
+
+# ----------------------------- подписка ----------------------------- #
+
+class EventConsumer:
+    """
+    Участник группы потребителей: каждое событие получает один процесс группы.
+
+    Необработанные события остаются в pending группы; события упавшего потребителя
+    забирает другой после `claim_idle_ms` простоя (XAUTOCLAIM). Событие, на котором обработчик
+    упал `max_deliveries` раз, уходит в поток `<EVENTS_STREAM>:dead` и подтверждается.
+
+        consumer = EventConsumer("reminders", "worker-1")
+        consumer.run(handle_event)
+    """
+
+    def __init__(
+        self,
+        group: str,
+        name: str,
+        backend=None,
+        start_id: str = "$",
+        claim_idle_ms: int = 60000,
+        max_deliveries: int = 5,
+    ):
+        if backend is None:
+            backend = get_backend()
+            if isinstance(backend, RedisStreamBackend):
+                # отдельный клиент: блокирующее чтение дольше короткого REDIS_SOCKET_TIMEOUT запросов API
+                backend = RedisStreamBackend(
+                    redis.Redis.from_url(settings.REDIS_URL), settings.EVENTS_STREAM, settings.EVENTS_STREAM_MAXLEN
+                )
+        if backend is None:
+            raise RuntimeError("EVENTS_BACKEND не задан — поток событий выключен")
+        self.backend = backend
+        self.group = group
+        self.name = name
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.backend.ensure_group(group, start_id)
+
+    def poll(self, count: int = 100, block_ms: Optional[int] = 5000) -> List[Tuple[str, ChangeEvent]]:
+        """Зависшие события упавших потребителей, а если их нет — новые."""
+        stale = self.backend.claim_stale(self.group, self.name, self.claim_idle_ms, count)
+        if stale:
+            return stale
+        return self.backend.read_group(self.group, self.name, count, block_ms)
+
+    def ack(self, ids: Sequence[str]) -> None:
+        self.backend.ack(self.group, ids)
+
+    def run(
+        self, handler: Callable[[ChangeEvent], None], max_batches: Optional[int] = None, **poll_kwargs
+    ) -> None:
+        """Обрабатывает события по одному; подтверждаются только обработанные без исключения."""
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batches += 1
+            done = []
+            for entry_id, event in self.poll(**poll_kwargs):
+                try:
+                    handler(event)
+                except Exception:  # noqa: BLE001
+                    logger.exception("Ошибка обработки события %s (группа %s)", entry_id, self.group)
+                    if self.backend.delivery_count(self.group, entry_id) < self.max_deliveries:
+                        continue
+                    logger.error("Событие %s перенесено в dead-letter после %d доставок", entry_id, self.max_deliveries)
+                    self.backend.dead_letter(self.group, entry_id, event)
+                done.append(entry_id)
+            self.ack(done)
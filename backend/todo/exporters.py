@@ -0,0 +1,168 @@
+import csv
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List
+
+from django.db.models import QuerySet
+from rest_framework.renderers import BaseRenderer
+
+from .models import Task
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = ["id", "title", "description", "created_at", "due_date", "is_completed"]
+CSV_HEADER = EXPORT_COLUMNS + ["categories"]
+# Разделитель категорий внутри одной CSV-ячейки
+CSV_CATEGORY_SEPARATOR = ";"
+ICS_DATETIME_FORMAT = "%Y%m%dT%H%M%SZ"
+ICS_LINE_LIMIT = 75
+
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Рендерер-заглушка для content negotiation по ?format=.
+
+    Сам экспорт отдаётся StreamingHttpResponse; render нужен только для ответов с ошибками.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class NDJSONRenderer(_ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class CSVRenderer(_ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class ICalendarRenderer(_ExportRenderer):
+    media_type = "text/calendar"
+    format = "ics"
+
+
+def iter_task_chunks(queryset: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Читает задачи серверным курсором пачками по chunk_size.
+
+    Категории подтягиваются одним запросом на пачку, а не на каждую задачу,
+    поэтому память не зависит от количества задач пользователя.
+    """
+    through = Task.categories.through.objects.using(queryset.db)
+    rows = queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        categories: Dict[str, List[str]] = defaultdict(list)
+        links = through.filter(task_id__in=[row[0] for row in chunk]).values_list("task_id", "category__name")
+        for task_id, name in links.order_by("category__name"):
+            categories[task_id].append(name)
+        yield [dict(zip(EXPORT_COLUMNS, row), categories=categories[row[0]]) for row in chunk]
+
+
+def _stream_ndjson(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    for chunk in chunks:
+        lines = []
+        for task in chunk:
+            task["created_at"] = task["created_at"].isoformat()
+            task["due_date"] = task["due_date"].isoformat()
+            lines.append(json.dumps(task, ensure_ascii=False))
+        yield "\n".join(lines) + "\n"
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи в файл."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _stream_csv(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for chunk in chunks:
+        yield "".join(
+            writer.writerow(
+                [
+                    task["id"],
+                    task["title"],
+                    task["description"],
+                    task["created_at"].isoformat(),
+                    task["due_date"].isoformat(),
+                    task["is_completed"],
+                    CSV_CATEGORY_SEPARATOR.join(task["categories"]),
+                ]
+            )
+            for task in chunk
+        )
+
+
+def ics_escape(value: str) -> str:
+    """Экранирует текстовое значение по RFC 5545."""
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _ics_fold(line: str) -> str:
+    """Переносит строку длиннее 75 октетов (RFC 5545, 3.1)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICS_LINE_LIMIT:
+        return line + "\r\n"
+    parts = []
+    limit = ICS_LINE_LIMIT
+    while encoded:
+        cut = min(limit, len(encoded))
+        # не режем многобайтовый символ UTF-8 посередине
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = ICS_LINE_LIMIT - 1
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime(ICS_DATETIME_FORMAT)
+
+
+def _stream_ics(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Telegram ToDo//Export//RU\r\n"
+    for chunk in chunks:
+        lines = []
+        for task in chunk:
+            lines.append("BEGIN:VTODO\r\n")
+            lines.append(_ics_fold(f"UID:{task['id']}@telegram-todo"))
+            lines.append(f"DTSTAMP:{_ics_datetime(task['created_at'])}\r\n")
+            lines.append(f"CREATED:{_ics_datetime(task['created_at'])}\r\n")
+            lines.append(f"DUE:{_ics_datetime(task['due_date'])}\r\n")
+            lines.append(_ics_fold(f"SUMMARY:{ics_escape(task['title'])}"))
+            if task["description"]:
+                lines.append(_ics_fold(f"DESCRIPTION:{ics_escape(task['description'])}"))
+            if task["categories"]:
+                lines.append(_ics_fold("CATEGORIES:" + ",".join(ics_escape(name) for name in task["categories"])))
+            lines.append("STATUS:COMPLETED\r\n" if task["is_completed"] else "STATUS:NEEDS-ACTION\r\n")
+            lines.append("END:VTODO\r\n")
+        yield "".join(lines)
+    yield "END:VCALENDAR\r\n"
+
+
+EXPORT_WRITERS: Dict[str, Callable[[Iterator[List[Dict[str, Any]]]], Iterator[str]]] = {
+    NDJSONRenderer.format: _stream_ndjson,
+    CSVRenderer.format: _stream_csv,
+    ICalendarRenderer.format: _stream_ics,
+}
+
+
+def stream_tasks(queryset: QuerySet, export_format: str) -> Iterator[bytes]:
+    """Возвращает генератор байтов с задачами в выбранном формате."""
+    writer = EXPORT_WRITERS[export_format]
+    for part in writer(iter_task_chunks(queryset)):
+        yield part.encode("utf-8")
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from redis.exceptions import RedisError
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+KEY_MAX_LENGTH = 255
+PENDING = "pending"
+DONE = "done"
+
+
+def _error(detail: str, status: int) -> JsonResponse:
+    return JsonResponse({"detail": detail}, status=status, json_dumps_params={"ensure_ascii": False})
+
+
+class IdempotentPostMixin:
+    """
+    Поддержка заголовка Idempotency-Key для POST-запросов.
+
+    Первый ответ 2xx сохраняется в Redis на IDEMPOTENCY_KEY_TTL секунд и отдаётся повторно
+    на запросы с тем же ключом, не доходя до аутентификации, сериализатора и БД.
+    Ключ привязан к X-Telegram-User-Id и пути запроса.
+
+    - Пока первый запрос выполняется, повтор получает 409.
+    - Тот же ключ с другим телом запроса — 422.
+    - Ответы с ошибкой не сохраняются, запрос можно повторить с тем же ключом.
+    - Если Redis недоступен, запрос выполняется как обычно.
+
+    Для вьюсетов ограничивается действиями из `idempotent_actions`.
+    """
+
+    idempotent_actions = ("create",)
+
+    def _is_idempotent(self, request) -> bool:
+        if request.method != "POST":
+            return False
+        action_map = getattr(self, "action_map", None)
+        if action_map is None:
+            return True
+        return action_map.get("post") in self.idempotent_actions
+
+    def dispatch(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        telegram_user_id = request.META.get("HTTP_X_TELEGRAM_USER_ID")
+        if not key or not telegram_user_id or not self._is_idempotent(request):
+            return super().dispatch(request, *args, **kwargs)
+        if len(key) > KEY_MAX_LENGTH:
+            return _error("Idempotency-Key слишком длинный", 400)
+
+        redis_key = f"idem:{telegram_user_id}:{request.path}:{key}"
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        try:
+            conflict = self._acquire(redis_key, fingerprint)
+        except RedisError as exc:
+            logger.warning("Idempotency-Key не проверен, Redis недоступен: %s", exc)
+            return super().dispatch(request, *args, **kwargs)
+        if conflict is not None:
+            return conflict
+
+        response = super().dispatch(request, *args, **kwargs)
+        try:
+            self._store(redis_key, fingerprint, response)
+        except RedisError as exc:
+            logger.warning("Ответ для Idempotency-Key не сохранён: %s", exc)
+        return response
+
+    def _acquire(self, redis_key: str, fingerprint: str) -> Optional[HttpResponse]:
+        """Ставит метку «в работе»; если ключ уже есть — возвращает повтор или ошибку."""
+        client = get_redis()
+        pending = json.dumps({"state": PENDING, "fingerprint": fingerprint})
+        if client.set(redis_key, pending, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL):
+            return None
+
+        raw = client.get(redis_key)
+        if raw is None:
+            # запись истекла между SET и GET — считаем, что первый запрос ещё выполняется
+            return _error("Запрос с этим Idempotency-Key ещё выполняется", 409)
+        stored: Dict[str, Any] = json.loads(raw)
+        if stored["fingerprint"] != fingerprint:
+            return _error("Idempotency-Key уже использован с другим телом запроса", 422)
+        if stored["state"] == PENDING:
+            return _error("Запрос с этим Idempotency-Key ещё выполняется", 409)
+
+        replay = HttpResponse(stored["body"], status=stored["status"], content_type=stored["content_type"])
+        replay[REPLAYED_HEADER] = "true"
+        return replay
+
+    def _store(self, redis_key: str, fingerprint: str, response) -> None:
+        client = get_redis()
+        if not 200 <= response.status_code < 300:
+            client.delete(redis_key)
+            return
+        if hasattr(response, "render") and not response.is_rendered:
+            response.render()
+        stored = {
+            "state": DONE,
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "content_type": response.get("Content-Type", "application/json"),
+            "body": response.content.decode(response.charset or "utf-8"),
+        }
+        client.set(redis_key, json.dumps(stored), ex=settings.IDEMPOTENCY_KEY_TTL)
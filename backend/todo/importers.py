@@ -0,0 +1,241 @@
+import csv
+import io
+import json
+from datetime import datetime, time, timezone as dt_timezone
+from typing import Any, Dict, Iterator, List, Optional, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .exporters import CSV_CATEGORY_SEPARATOR, CSVRenderer, ICalendarRenderer, NDJSONRenderer
+
+IMPORT_FORMATS = [NDJSONRenderer.format, CSVRenderer.format, ICalendarRenderer.format]
+TITLE_MAX_LENGTH = 255
+CATEGORY_MAX_LENGTH = 100
+TRUE_VALUES = {"1", "true", "yes", "y", "да", "completed"}
+
+
+class ImportRowError(ValueError):
+    """Строку файла не удалось разобрать; импорт продолжается со следующей."""
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Определяет формат по расширению файла."""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    aliases = {"jsonl": NDJSONRenderer.format, "ical": ICalendarRenderer.format}
+    extension = aliases.get(extension, extension)
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def _parse_iso(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = parse_datetime(str(value).strip())
+    if parsed is None:
+        raise ImportRowError(f"Некорректная дата: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in TRUE_VALUES
+
+
+def _record(
+    title: Any,
+    description: Any,
+    due_date: Optional[datetime],
+    created_at: Optional[datetime],
+    is_completed: bool,
+    categories: List[str],
+) -> Dict[str, Any]:
+    title = str(title or "").strip()[:TITLE_MAX_LENGTH]
+    if not title:
+        raise ImportRowError("Пустое название задачи")
+    if due_date is None:
+        raise ImportRowError("Не указан due_date")
+    names = []
+    for name in categories:
+        name = str(name).strip()[:CATEGORY_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return {
+        "title": title,
+        "description": str(description or ""),
+        "due_date": due_date,
+        "created_at": created_at,
+        "is_completed": is_completed,
+        "categories": names,
+    }
+
+
+def _iter_csv(stream: io.TextIOBase) -> Iterator[Union[Dict[str, Any], ImportRowError]]:
+    for row in csv.DictReader(stream):
+        try:
+            yield _record(
+                row.get("title"),
+                row.get("description"),
+                _parse_iso(row.get("due_date")),
+                _parse_iso(row.get("created_at")),
+                _parse_bool(row.get("is_completed")),
+                (row.get("categories") or "").split(CSV_CATEGORY_SEPARATOR),
+            )
+        except ImportRowError as exc:
+            yield exc
+
+
+def _parse_ndjson_line(line: str) -> Dict[str, Any]:
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ImportRowError(f"Некорректный JSON: {exc}") from exc
+    if not isinstance(item, dict):
+        raise ImportRowError("Ожидался JSON-объект")
+    categories = [
+        category.get("name", "") if isinstance(category, dict) else category
+        for category in item.get("categories") or []
+    ]
+    return _record(
+        item.get("title"),
+        item.get("description"),
+        _parse_iso(item.get("due_date")),
+        _parse_iso(item.get("created_at")),
+        _parse_bool(item.get("is_completed")),
+        categories,
+    )
+
+
+def _iter_ndjson(stream: io.TextIOBase) -> Iterator[Union[Dict[str, Any], ImportRowError]]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield _parse_ndjson_line(line)
+        except ImportRowError as exc:
+            yield exc
+
+
+def _ics_unescape(value: str) -> str:
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            result.append("\n" if escaped in ("n", "N") else escaped)
+        else:
+            result.append(char)
+    return "".join(result)
+
+
+def _ics_split_list(value: str) -> List[str]:
+    """Разбивает список CATEGORIES по неэкранированным запятым."""
+    items, current, escaped = [], [], False
+    for char in value:
+        if escaped:
+            current.append("\\" + char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == ",":
+            items.append(_ics_unescape("".join(current)))
+            current = []
+        else:
+            current.append(char)
+    items.append(_ics_unescape("".join(current)))
+    return items
+
+
+def _ics_datetime(value: str, params: Dict[str, str]) -> datetime:
+    value = value.strip()
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            parsed = datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time(9, 0))
+            return timezone.make_aware(parsed)
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=dt_timezone.utc)
+        parsed = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    except ValueError as exc:
+        raise ImportRowError(f"Некорректная дата iCalendar: {value}") from exc
+    if "TZID" in params:
+        try:
+            return parsed.replace(tzinfo=ZoneInfo(params["TZID"]))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.make_aware(parsed)
+
+
+def _iter_ics_lines(stream: io.TextIOBase) -> Iterator[str]:
+    """Склеивает перенесённые строки (RFC 5545, 3.1) без чтения файла целиком."""
+    current: Optional[str] = None
+    for raw in stream:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _iter_ics(stream: io.TextIOBase) -> Iterator[Union[Dict[str, Any], ImportRowError]]:
+    component: Optional[Dict[str, Any]] = None
+    for line in _iter_ics_lines(stream):
+        if line in ("BEGIN:VTODO", "BEGIN:VEVENT"):
+            component = {"categories": []}
+            continue
+        if component is None:
+            continue
+        if line in ("END:VTODO", "END:VEVENT"):
+            item, component = component, None
+            try:
+                yield _record(
+                    item.get("SUMMARY"),
+                    item.get("DESCRIPTION"),
+                    item.get("DUE") or item.get("DTSTART"),
+                    item.get("CREATED"),
+                    item.get("STATUS") == "COMPLETED",
+                    item["categories"],
+                )
+            except ImportRowError as exc:
+                yield exc
+            continue
+
+        head, _, value = line.partition(":")
+        name, *raw_params = head.split(";")
+        name = name.upper()
+        params = dict(param.split("=", 1) for param in raw_params if "=" in param)
+        if name in ("SUMMARY", "DESCRIPTION"):
+            component[name] = _ics_unescape(value)
+        elif name == "STATUS":
+            component[name] = value.strip().upper()
+        elif name == "CATEGORIES":
+            component["categories"].extend(_ics_split_list(value))
+        elif name in ("DUE", "DTSTART", "CREATED"):
+            try:
+                component[name] = _ics_datetime(value, params)
+            except ImportRowError:
+                component[name] = None
+
+
+PARSERS = {
+    NDJSONRenderer.format: _iter_ndjson,
+    CSVRenderer.format: _iter_csv,
+    ICalendarRenderer.format: _iter_ics,
+}
+
+
+def iter_records(stream: io.TextIOBase, import_format: str) -> Iterator[Union[Dict[str, Any], ImportRowError]]:
+    """
+    Потоково разбирает файл импорта.
+
+    Выдаёт словари задач; для строк, которые не удалось разобрать, выдаёт ImportRowError
+    вместо исключения, чтобы одна плохая строка не прерывала весь импорт.
+    """
+    return PARSERS[import_format](stream)
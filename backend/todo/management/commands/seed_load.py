@@ -0,0 +1,215 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from todo.models import Category, Task, TaskReminder, UserProfile, build_task_pk
+
+User = get_user_model()
+
+CATEGORY_POOL = [
+    "Работа",
+    "Дом",
+    "Учёба",
+    "Здоровье",
+    "Покупки",
+    "Финансы",
+    "Семья",
+    "Спорт",
+    "Путешествия",
+    "Хобби",
+    "Документы",
+    "Машина",
+]
+VERBS = ["Купить", "Позвонить", "Написать", "Проверить", "Оплатить", "Подготовить", "Отправить", "Забрать"]
+NOUNS = ["отчёт", "счёт", "подарок", "документы", "продукты", "билеты", "презентацию", "письмо"]
+
+PROGRESS_EVERY = 1_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетический набор данных (пользователи, профили, категории, задачи, связи M2M) "
+        "и загружает его через PostgreSQL COPY. Результат детерминирован при одинаковом --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Количество пользователей")
+        parser.add_argument("--tasks", type=int, default=100_000, help="Общее количество задач")
+        parser.add_argument("--categories", type=int, default=5, help="Категорий на пользователя")
+        parser.add_argument("--seed", type=int, default=42, help="Зерно генератора")
+        parser.add_argument(
+            "--telegram-id-base",
+            type=int,
+            default=9_000_000_000,
+            help="Начало диапазона синтетических Telegram user/chat id",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("seed_load работает только с PostgreSQL (используется COPY).")
+        if not 0 <= options["categories"] <= len(CATEGORY_POOL):
+            raise CommandError(f"--categories должен быть в диапазоне 0..{len(CATEGORY_POOL)}")
+
+        self.seed = options["seed"]
+        self.now = timezone.now()
+        started = time.monotonic()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            raw = cursor.cursor
+            raw.execute("SET LOCAL synchronous_commit = off")
+            for model in (User, UserProfile, Category):
+                raw.execute(f'LOCK TABLE "{model._meta.db_table}" IN EXCLUSIVE MODE')
+
+            user_ids = self._load_users(raw, options["users"], options["telegram_id_base"])
+            category_ids = self._load_categories(raw, user_ids, options["categories"])
+            task_counts = self._split_tasks(options["tasks"], len(user_ids))
+            self._load_tasks(raw, user_ids, task_counts)
+            self._load_task_categories(raw, user_ids, task_counts, category_ids)
+            self._load_task_reminders(raw, user_ids, task_counts)
+
+            for model in (User, UserProfile, Category, TaskReminder):
+                self._reset_sequence(raw, model)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено: {len(user_ids)} пользователей, {sum(task_counts)} задач "
+                f"за {time.monotonic() - started:.1f} с"
+            )
+        )
+
+    # ----------------------------- loaders ----------------------------- #
+
+    def _next_id(self, raw, model) -> int:
+        raw.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM "{model._meta.db_table}"')
+        return raw.fetchone()[0]
+
+    def _reset_sequence(self, raw, model) -> None:
+        table = model._meta.db_table
+        raw.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f'(SELECT COALESCE(MAX(id), 1) FROM "{table}"))'
+        )
+
+    def _load_users(self, raw, count: int, telegram_id_base: int) -> List[int]:
+        first_user_id = self._next_id(raw, User)
+        first_profile_id = self._next_id(raw, UserProfile)
+        user_ids = list(range(first_user_id, first_user_id + count))
+
+        with raw.copy(
+            f'COPY "{User._meta.db_table}" (id, password, is_superuser, username, first_name, last_name, '
+            "email, is_staff, is_active, date_joined) FROM STDIN"
+        ) as copy:
+            for idx, user_id in enumerate(user_ids):
+                username = f"tg_{telegram_id_base + idx}"
+                copy.write_row((user_id, "!", False, username, "", "", "", False, True, self.now))
+
+        with raw.copy(
+            f'COPY "{UserProfile._meta.db_table}" (id, user_id, telegram_user_id, telegram_chat_id) FROM STDIN'
+        ) as copy:
+            for idx, user_id in enumerate(user_ids):
+                telegram_id = telegram_id_base + idx
+                copy.write_row((first_profile_id + idx, user_id, telegram_id, telegram_id))
+
+        self.stdout.write(f"Пользователи и профили: {count}")
+        return user_ids
+
+    def _load_categories(self, raw, user_ids: List[int], per_user: int) -> List[List[int]]:
+        """Возвращает id категорий для каждого пользователя (в порядке user_ids)."""
+        next_id = self._next_id(raw, Category)
+        result: List[List[int]] = []
+        with raw.copy(f'COPY "{Category._meta.db_table}" (id, user_id, name) FROM STDIN') as copy:
+            for idx, user_id in enumerate(user_ids):
+                names = random.Random(f"{self.seed}:categories:{idx}").sample(CATEGORY_POOL, per_user)
+                ids = []
+                for name in names:
+                    copy.write_row((next_id, user_id, name))
+                    ids.append(next_id)
+                    next_id += 1
+                result.append(ids)
+        self.stdout.write(f"Категории: {sum(len(ids) for ids in result)}")
+        return result
+
+    def _split_tasks(self, total: int, users: int) -> List[int]:
+        """Распределяет задачи между пользователями по степенному закону (немного «тяжёлых» пользователей)."""
+        if not users:
+            return []
+        rng = random.Random(f"{self.seed}:split")
+        weights = [rng.paretovariate(1.2) for _ in range(users)]
+        scale = total / sum(weights)
+        counts = [int(weight * scale) for weight in weights]
+        for idx in range(total - sum(counts)):
+            counts[idx % users] += 1
+        return counts
+
+    def _iter_tasks(self, user_index: int, user_id: int, count: int) -> Iterator[Tuple]:
+        """Детерминированно генерирует задачи пользователя; повторный вызов даёт те же строки."""
+        rng = random.Random(f"{self.seed}:tasks:{user_index}")
+        for number in range(1, count + 1):
+            created_at = self.now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+            due_date = self._pick_due_date(rng, created_at)
+            title = f"{rng.choice(VERBS)} {rng.choice(NOUNS)} #{number}"
+            overdue = due_date <= self.now
+            is_completed = overdue and rng.random() < 0.8
+            pk = build_task_pk(user_id, title, due_date, created_at)
+            links = 0 if rng.random() < 0.3 else (1 if rng.random() < 0.7 else 2)
+            yield pk, title, created_at, due_date, is_completed, overdue, links, rng.random()
+
+    def _pick_due_date(self, rng: random.Random, created_at: datetime) -> datetime:
+        """30% — дедлайн вскоре после создания, 50% — ближайший месяц, 20% — до года вперёд."""
+        roll = rng.random()
+        if roll < 0.3:
+            due_date = created_at + timedelta(hours=rng.uniform(1, 14 * 24))
+        elif roll < 0.8:
+            due_date = self.now + timedelta(days=min(rng.expovariate(1 / 3), 30))
+        else:
+            due_date = self.now + timedelta(days=rng.uniform(30, 365))
+        return max(due_date, created_at + timedelta(minutes=5)).replace(microsecond=0)
+
+    def _load_tasks(self, raw, user_ids: List[int], task_counts: List[int]) -> None:
+        loaded = 0
+        with raw.copy(
+            f'COPY "{Task._meta.db_table}" (id, user_id, title, description, created_at, due_date, '
+            "is_completed, notification_sent, recurrence) FROM STDIN"
+        ) as copy:
+            for user_index, (user_id, count) in enumerate(zip(user_ids, task_counts)):
+                for pk, title, created_at, due_date, is_completed, overdue, _, _ in self._iter_tasks(
+                    user_index, user_id, count
+                ):
+                    copy.write_row((pk, user_id, title, "", created_at, due_date, is_completed, overdue, ""))
+                    loaded += 1
+                    if loaded % PROGRESS_EVERY == 0:
+                        self.stdout.write(f"Задачи: {loaded}")
+        self.stdout.write(f"Задачи: {loaded}")
+
+    def _load_task_categories(
+        self, raw, user_ids: List[int], task_counts: List[int], category_ids: List[List[int]]
+    ) -> None:
+        through = Task.categories.through
+        with raw.copy(f'COPY "{through._meta.db_table}" (task_id, category_id) FROM STDIN') as copy:
+            for user_index, (user_id, count) in enumerate(zip(user_ids, task_counts)):
+                user_categories = category_ids[user_index]
+                if not user_categories:
+                    continue
+                for pk, *_, links, pick in self._iter_tasks(user_index, user_id, count):
+                    links = min(links, len(user_categories))
+                    start = int(pick * len(user_categories))
+                    for offset in range(links):
+                        copy.write_row((pk, user_categories[(start + offset) % len(user_categories)]))
+
+    def _load_task_reminders(self, raw, user_ids: List[int], task_counts: List[int]) -> None:
+        """Напоминание в момент дедлайна у каждой задачи; по просроченным оно уже отправлено."""
+        first_id = next_id = self._next_id(raw, TaskReminder)
+        with raw.copy(
+            f'COPY "{TaskReminder._meta.db_table}" (id, task_id, offset_minutes, fire_at, sent_at) FROM STDIN'
+        ) as copy:
+            for user_index, (user_id, count) in enumerate(zip(user_ids, task_counts)):
+                for pk, _, _, due_date, _, overdue, _, _ in self._iter_tasks(user_index, user_id, count):
+                    copy.write_row((next_id, pk, 0, due_date, due_date if overdue else None))
+                    next_id += 1
+        self.stdout.write(f"Напоминания: {next_id - first_id}")
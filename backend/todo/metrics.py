@@ -0,0 +1,128 @@
+import os
+import time
+from typing import Dict, Tuple
+
+from celery.signals import task_failure, task_postrun, task_prerun, worker_ready
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 30, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    "todo_http_request_duration_seconds",
+    "Время обработки HTTP-запроса.",
+    ["view", "action", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "todo_http_request_db_queries",
+    "Количество SQL-запросов на один HTTP-запрос.",
+    ["view", "action"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "todo_http_request_db_duration_seconds",
+    "Суммарное время SQL-запросов на один HTTP-запрос.",
+    ["view", "action"],
+)
+
+CELERY_TASK_LATENCY = Histogram(
+    "todo_celery_task_duration_seconds",
+    "Время выполнения Celery-задачи.",
+    ["task", "state"],
+)
+CELERY_TASK_FAILURES = Counter(
+    "todo_celery_task_failures_total",
+    "Количество упавших Celery-задач.",
+    ["task"],
+)
+
+NOTIFICATION_TICK_LATENCY = Histogram(
+    "todo_notification_tick_duration_seconds",
+    "Длительность одного прохода send_task_due_notifications.",
+)
+NOTIFICATIONS_SENT = Counter("todo_notifications_sent_total", "Отправленные уведомления о дедлайнах.")
+NOTIFICATIONS_FAILED = Counter("todo_notifications_failed_total", "Неудачные отправки уведомлений о дедлайнах.")
+NOTIFICATION_BACKLOG = Gauge(
+    "todo_notification_backlog",
+    "Количество задач с наступившим дедлайном, найденных в последнем проходе.",
+    multiprocess_mode="mostrecent",
+)
+THROTTLED_REQUESTS = Counter(
+    "todo_http_throttled_total",
+    "Запросы, отклонённые ограничением частоты (429).",
+    ["scope"],
+)
+TELEGRAM_SEND_LATENCY = Histogram(
+    "todo_telegram_send_duration_seconds",
+    "Время вызова sendMessage Telegram Bot API.",
+    ["result"],
+)
+CHANGE_EVENTS_PUBLISHED = Counter(
+    "todo_change_events_published_total",
+    "События изменений, опубликованные в Redis Stream.",
+    ["entity", "kind"],
+)
+CHANGE_EVENTS_FAILED = Counter(
+    "todo_change_events_failed_total",
+    "События изменений, потерянные из-за недоступности Redis.",
+)
+
+# task_id -> время старта (perf_counter) для task_prerun/task_postrun
+_task_started: Dict[str, float] = {}
+
+
+def view_labels(view_func, method: str) -> Tuple[str, str]:
+    """Возвращает метки (view, action) для DRF-вьюсета, APIView или обычной Django-вьюхи."""
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    view = view_class.__name__ if view_class else getattr(view_func, "__name__", "unknown")
+    actions = getattr(view_func, "actions", None) or {}
+    return view, actions.get(method.lower(), method.lower())
+
+
+def get_registry() -> CollectorRegistry:
+    """Реестр метрик с учётом multiprocess-режима (gunicorn, prefork-воркеры Celery)."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Отдаёт метрики в текстовом формате Prometheus."""
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id=None, **kwargs) -> None:
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs) -> None:
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_LATENCY.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+@task_failure.connect
+def _on_task_failure(sender=None, **kwargs) -> None:
+    CELERY_TASK_FAILURES.labels(sender.name if sender else "unknown").inc()
+
+
+@worker_ready.connect
+def _on_worker_ready(**kwargs) -> None:
+    """Поднимает HTTP-эндпоинт метрик воркера, если задан CELERY_METRICS_PORT."""
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=get_registry())
@@ -0,0 +1,51 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import REQUEST_DB_TIME, REQUEST_LATENCY, REQUEST_QUERIES, view_labels
+
+
+class QueryCounter:
+    """execute_wrapper, считающий количество и суммарное время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Собирает латентность, число SQL-запросов и время в БД по каждой вьюхе и action."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view, action = getattr(request, "_metrics_labels", ("unmatched", request.method.lower()))
+        REQUEST_LATENCY.labels(view, action, f"{response.status_code // 100}xx").observe(elapsed)
+        REQUEST_QUERIES.labels(view, action).observe(counter.count)
+        REQUEST_DB_TIME.labels(view, action).observe(counter.duration)
+        if settings.METRICS_QUERY_COUNT_HEADER:
+            response["X-DB-Query-Count"] = str(counter.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = view_labels(view_func, request.method)
+        return None
@@ -0,0 +1,31 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в большую таблицу задач
+    atomic = False
+
+    dependencies = [
+        ("todo", "0002_import_job"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(fields=["-created_at", "-id"], name="todo_task_created_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(fields=["due_date"], name="todo_task_due_date_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector("title", "description", config="simple"),
+                name="todo_task_search_idx",
+            ),
+        ),
+    ]
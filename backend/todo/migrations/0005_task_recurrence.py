@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todo", "0004_task_user_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="recurrence",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="series_start",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="TaskOccurrence",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("occurrence_at", models.DateTimeField()),
+                ("completed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="occurrences", to="todo.task"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["occurrence_at"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("task", "occurrence_at"), name="todo_occurrence_task_at_uniq")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Каждой существующей задаче — напоминание в момент дедлайна с прежним состоянием notification_sent.
+# Один INSERT ... SELECT на стороне БД, без выборки задач в Python.
+COPY_NOTIFICATIONS_SQL = """
+INSERT INTO todo_taskreminder (task_id, offset_minutes, fire_at, sent_at)
+SELECT id, 0, due_date, CASE WHEN notification_sent THEN due_date END
+FROM todo_task
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todo", "0005_task_recurrence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskReminder",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("offset_minutes", models.PositiveIntegerField(default=0)),
+                ("fire_at", models.DateTimeField()),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="reminders", to="todo.task"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["fire_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("sent_at__isnull", True)),
+                        fields=["fire_at"],
+                        name="todo_reminder_unsent_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(fields=("task", "offset_minutes"), name="todo_reminder_task_offset_uniq")
+                ],
+            },
+        ),
+        migrations.RunSQL(COPY_NOTIFICATIONS_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+import todo.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todo", "0006_task_reminder"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="task",
+            name="recurrence",
+            field=models.CharField(blank=True, max_length=255, validators=[todo.models.validate_recurrence]),
+        ),
+    ]
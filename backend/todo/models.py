@@ -1,9 +1,91 @@
 import hashlib
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from dateutil.rrule import rrule, rrulestr
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 
+# Выражение полнотекстового поиска по задачам; должно совпадать в индексе и в запросах
+TASK_SEARCH_VECTOR = SearchVector("title", "description", config="simple")
+SEARCH_TOKEN_RE = re.compile(r"\w+")
+# Допустимые частоты RRULE: SECONDLY и MINUTELY дали бы миллионы повторений на серию
+RECURRENCE_FREQUENCIES = {"HOURLY", "DAILY", "WEEKLY", "MONTHLY", "YEARLY"}
+# Напоминания задаются в минутах до due_date; по умолчанию — одно, в момент дедлайна
+DEFAULT_REMINDER_OFFSETS = [0]
+REMINDER_MAX_COUNT = 5
+REMINDER_MAX_OFFSET = 30 * 24 * 60
+
+
+def task_prefix_query(term: str) -> Optional[SearchQuery]:
+    """Запрос «все слова терма как префиксы» (`слово:* & ...`) для TASK_SEARCH_VECTOR; None, если слов нет."""
+    tokens = SEARCH_TOKEN_RE.findall(term)
+    if not tokens:
+        return None
+    return SearchQuery(" & ".join(f"{token}:*" for token in tokens), search_type="raw", config="simple")
+
+
+def build_task_pk_source(user_id: int, title: str, due_date: datetime, created_at: datetime) -> str:
+    """Формирует строку-основание для детерминированного PK задачи."""
+    created_ts = int(created_at.timestamp())
+    return f"{user_id}:{title}:{due_date.isoformat()}:{created_ts}"
+
+
+def build_task_pk(user_id: int, title: str, due_date: datetime, created_at: datetime) -> str:
+    """Возвращает PK задачи: первые 32 символа SHA-256 от строки-основания.
+
+    Используется и в `Task.save`, и при массовой загрузке в обход ORM.
+    """
+    source = build_task_pk_source(user_id, title, due_date, created_at)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+
+
+def normalize_recurrence(value: str) -> str:
+    """
+    Приводит правило повторения к виду `FREQ=...;...` (RRULE из RFC 5545 без префикса `RRULE:`).
+
+    Начало серии задаётся отдельно (Task.series_start), поэтому DTSTART и несколько строк
+    не допускаются. Бросает ValueError, если правило некорректно.
+    """
+    rule = value.strip().upper()
+    if rule.startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+    if not rule:
+        return ""
+    if "\n" in rule or "DTSTART" in rule:
+        raise ValueError("Ожидается одно правило RRULE без DTSTART.")
+    parts = dict(part.partition("=")[::2] for part in rule.split(";") if part)
+    if parts.get("FREQ") not in RECURRENCE_FREQUENCIES:
+        raise ValueError(f"FREQ должен быть одним из: {', '.join(sorted(RECURRENCE_FREQUENCIES))}.")
+    # часы и минуты берутся из начала серии, разбор проверяет остальное (в т.ч. UNTIL в UTC)
+    parse_recurrence(rule, timezone.now())
+    return rule
+
+
+def validate_recurrence(value: str) -> None:
+    """Валидатор Task.recurrence: правило сохраняется из админки и ORM только в том же виде, что из API."""
+    try:
+        normalize_recurrence(value)
+    except ValueError as exc:
+        raise ValidationError(str(exc)) from exc
+
+
+def parse_recurrence(rule: str, start: datetime) -> rrule:
+    """
+    Разбирает правило повторения от начала серии.
+
+    Повторения считаются в часовом поясе проекта: еженедельная задача на 09:00 остаётся
+    на 09:00 по местному времени и после перехода на летнее время. RRULE не хранит долей
+    секунды, поэтому микросекунды начала серии отбрасываются.
+    """
+    return rrulestr(rule, dtstart=timezone.localtime(start).replace(microsecond=0))
+
 
 class Category(models.Model):
     """Категория задач, привязанная к конкретному пользователю."""
@@ -31,28 +113,223 @@ class Task(models.Model):
     is_completed = models.BooleanField(default=False)
     categories = models.ManyToManyField(Category, related_name="tasks", blank=True)
     notification_sent = models.BooleanField(default=False)
+    # Регулярная задача — одна строка на серию: due_date указывает на ближайшее повторение,
+    # остальные повторения вычисляются по правилу и в таблице не хранятся
+    recurrence = models.CharField(max_length=255, blank=True, validators=[validate_recurrence])
+    series_start = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Смещения напоминаний, которые применит ближайший save(); None — прежние (у новой задачи — по умолчанию)
+    pending_reminder_offsets: Optional[List[int]] = None
+    # Значения из БД, от которых зависят напоминания и серия (см. from_db и save)
+    _loaded: Dict[str, Any] = {}
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="todo_task_created_id_idx"),
+            models.Index(fields=["user", "-created_at", "-id"], name="todo_task_user_created_idx"),
+            models.Index(fields=["due_date"], name="todo_task_due_date_idx"),
+            GinIndex(TASK_SEARCH_VECTOR, name="todo_task_search_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} ({self.user})"
 
     def _build_pk_source(self) -> str:
         """Формирует строку-основание для детерминированного PK."""
-        created_ts = int(self.created_at.timestamp())
-        return f"{self.user_id}:{self.title}:{self.due_date.isoformat()}:{created_ts}"
+        return build_task_pk_source(self.user_id, self.title, self.due_date, self.created_at)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        task._remember_loaded()
+        return task
+
+    def _remember_loaded(self) -> None:
+        # отложенные (only/defer) поля не загружаем ради этого отдельным запросом
+        self._loaded = {name: self.__dict__.get(name) for name in ("due_date", "is_completed", "recurrence")}
+
+    def clean(self) -> None:
+        """
+        Как и API, начинает серию заново при смене правила или due_date регулярной задачи.
+
+        Вызывается формами (админка): series_start — начало серии, due_date — первое повторение
+        не раньше введённой даты.
+        """
+        super().clean()
+        if not self.recurrence:
+            self.series_start = None
+            return
+        unchanged = self.due_date == self._loaded.get("due_date") and self.recurrence == self._loaded.get("recurrence")
+        if self.due_date is None or (self.series_start is not None and unchanged):
+            return
+        try:
+            self.recurrence = normalize_recurrence(self.recurrence)
+        except ValueError:
+            # ошибку показывает валидатор поля
+            return
+        start = self.due_date.replace(microsecond=0)
+        first = parse_recurrence(self.recurrence, start).after(start, inc=True)
+        if first is None:
+            raise ValidationError({"recurrence": "Правило не даёт ни одного повторения."})
+        self.series_start = start
+        self.due_date = first
 
     def save(self, *args, **kwargs) -> None:
-        """Генерирует PK на основе SHA-256 и сохраняет задачу."""
+        """
+        Генерирует PK на основе SHA-256 и сохраняет задачу.
+
+        Напоминания следуют за задачей при любом сохранении через ORM (API, админка,
+        Task.objects.create): новая задача получает напоминания по умолчанию, смена due_date
+        пересчитывает время напоминаний, а повторно открытая задача получает заново
+        напоминания, которые проверка дедлайнов закрыла у выполненной.
+        """
+        adding = self._state.adding
         if not self.created_at:
             self.created_at = timezone.now()
         if not self.id:
-            source = self._build_pk_source()
-            digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
-            self.id = digest[:32]
+            self.id = build_task_pk(self.user_id, self.title, self.due_date, self.created_at)
         super().save(*args, **kwargs)
 
+        offsets = self.pending_reminder_offsets
+        if adding and offsets is None:
+            offsets = DEFAULT_REMINDER_OFFSETS
+        if offsets is not None or self._schedule_changed(kwargs.get("update_fields")):
+            self.schedule_reminders(offsets)
+        self.pending_reminder_offsets = None
+        self._remember_loaded()
+
+    def _schedule_changed(self, update_fields: Optional[Iterable[str]]) -> bool:
+        fields = {"due_date", "is_completed"} if update_fields is None else set(update_fields)
+        loaded_due_date = self._loaded.get("due_date")
+        if "due_date" in fields and loaded_due_date is not None and self.due_date != loaded_due_date:
+            return True
+        return "is_completed" in fields and self._loaded.get("is_completed") is True and not self.is_completed
+
+    def recurrence_rule(self, near: Optional[datetime] = None) -> Optional[rrule]:
+        """
+        Правило повторения; None у обычной задачи.
+
+        Без near правило разворачивается от начала серии. С near, если due_date не позже near,
+        — от due_date: это повторение серии, и перебор не проходит заново все прошедшие
+        повторения (у ежечасной серии за год — почти 9000 шагов). COUNT считается от начала
+        серии, поэтому такие правила всегда разворачиваются от него.
+        """
+        if not self.recurrence:
+            return None
+        start = self.series_start or self.due_date
+        if (
+            near is not None
+            and self.series_start is not None
+            and self.series_start <= self.due_date <= near
+            and "COUNT=" not in self.recurrence.upper()
+        ):
+            start = self.due_date
+        return parse_recurrence(self.recurrence, start)
+
+    def iter_occurrences(self, start: datetime, end: datetime) -> Iterator[datetime]:
+        """Лениво перечисляет повторения в окне [start, end) по возрастанию."""
+        rule = self.recurrence_rule(near=start)
+        if rule is None:
+            if start <= self.due_date < end:
+                yield self.due_date
+            return
+        for occurrence in rule.xafter(start, inc=True):
+            if occurrence >= end:
+                return
+            yield occurrence
+
+    def next_occurrence(self, after: datetime) -> Optional[datetime]:
+        """
+        Ближайшее повторение позже after, ещё не отмеченное выполненным.
+
+        None — у обычной задачи или если серия закончилась (COUNT/UNTIL).
+        """
+        rule = self.recurrence_rule(near=after)
+        if rule is None:
+            return None
+        completed = set(self.occurrences.filter(occurrence_at__gt=after).values_list("occurrence_at", flat=True))
+        for occurrence in rule.xafter(after):
+            if occurrence not in completed:
+                return occurrence
+        return None
+
+    @property
+    def reminder_offsets(self) -> List[int]:
+        """Смещения напоминаний в минутах до due_date (использует prefetch_related("reminders"))."""
+        return sorted(reminder.offset_minutes for reminder in self.reminders.all())
+
+    def schedule_reminders(self, offsets: Optional[Iterable[int]] = None, now: Optional[datetime] = None) -> None:
+        """
+        Пересоздаёт напоминания под текущий due_date одним bulk_create.
+
+        offsets=None — оставить прежние смещения. Напоминания, время которых уже прошло,
+        сразу считаются отправленными: «за сутки» к задаче на через час не приходит.
+        """
+        if offsets is None:
+            offsets = self.reminders.values_list("offset_minutes", flat=True)
+        offsets = sorted(set(offsets))
+        now = now or timezone.now()
+        self.reminders.all().delete()
+        TaskReminder.objects.bulk_create(TaskReminder.build(self.pk, offset, self.due_date, now) for offset in offsets)
+        getattr(self, "_prefetched_objects_cache", {}).pop("reminders", None)
+
+
+class TaskOccurrence(models.Model):
+    """
+    Выполненное повторение регулярной задачи.
+
+    Строки есть только у отмеченных повторений, поэтому таблица растёт с действиями
+    пользователя, а не с числом будущих повторений серии.
+    """
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="occurrences")
+    occurrence_at = models.DateTimeField()
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["occurrence_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["task", "occurrence_at"], name="todo_occurrence_task_at_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.task_id} @ {self.occurrence_at:%Y-%m-%d %H:%M}"
+
+
+class TaskReminder(models.Model):
+    """
+    Напоминание о задаче за offset_minutes минут до due_date.
+
+    Планировщик выбирает неотправленные напоминания по частичному индексу на fire_at,
+    поэтому стоимость проверки зависит от числа ожидающих напоминаний, а не от размера
+    таблицы задач или истории уже отправленных напоминаний.
+    """
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="reminders")
+    offset_minutes = models.PositiveIntegerField(default=0)
+    fire_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["fire_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["task", "offset_minutes"], name="todo_reminder_task_offset_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["fire_at"], name="todo_reminder_unsent_idx", condition=models.Q(sent_at__isnull=True)),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.task_id} −{self.offset_minutes} мин"
+
+    @classmethod
+    def build(cls, task_id: str, offset_minutes: int, due_date: datetime, now: datetime) -> "TaskReminder":
+        """Напоминание под due_date; если его время уже прошло, оно сразу считается отправленным."""
+        fire_at = due_date - timedelta(minutes=offset_minutes)
+        sent_at = now if fire_at <= now else None
+        return cls(task_id=task_id, offset_minutes=offset_minutes, fire_at=fire_at, sent_at=sent_at)
+
 
 class UserProfile(models.Model):
     """Профиль для связи Django-пользователя с Telegram."""
@@ -64,3 +341,29 @@ class UserProfile(models.Model):
     def __str__(self) -> str:
         return f"Profile for {self.user}"
 
+
+class ImportJob(models.Model):
+    """Фоновый импорт задач пользователя из файла (CSV, NDJSON, iCalendar)."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Завершён"
+        FAILED = "failed", "Ошибка"
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="import_jobs")
+    format = models.CharField(max_length=10)
+    file = models.FileField(upload_to="imports/", blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"Import #{self.pk} ({self.user}, {self.status})"
@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация списка задач по (created_at, id), от новых к старым.
+
+    Включается параметром ?page_size=N: без него список отдаётся целиком, как раньше.
+    Страница читается по индексу (user, -created_at, -id) без OFFSET, поэтому её цена
+    не зависит от количества задач пользователя и номера страницы.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 100
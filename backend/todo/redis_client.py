@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> redis.Redis:
+    """
+    Общий клиент Redis процесса (троттлинг и другие прямые обращения к Redis).
+
+    Пул соединений создаётся один раз; таймауты короткие, чтобы недоступный Redis
+    не держал HTTP-запросы.
+    """
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30,
+    )
@@ -0,0 +1,132 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Алиас БД для чтений в текущем контексте; None — читаем из primary
+_read_alias: ContextVar[Optional[str]] = ContextVar("read_alias", default=None)
+
+# alias -> (время проверки по monotonic, отставание в секундах или None при ошибке)
+_lag_cache: Dict[str, Tuple[float, Optional[float]]] = {}
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """Разрешает чтение с реплики внутри блока (запись всегда идёт в primary)."""
+    token = enable_replica_reads()
+    try:
+        yield
+    finally:
+        disable_replica_reads(token)
+
+
+def enable_replica_reads():
+    """
+    Выбирает реплику для чтений текущего контекста и возвращает токен для `disable_replica_reads`.
+
+    Реплика выбирается один раз, чтобы все запросы одного HTTP-запроса видели один снимок данных.
+    """
+    return _read_alias.set(choose_read_alias())
+
+
+def disable_replica_reads(token) -> None:
+    _read_alias.reset(token)
+
+
+def _pin_key(user_id: int) -> str:
+    return f"db:pin-primary:{user_id}"
+
+
+def pin_to_primary(user_id: int) -> None:
+    """Закрепляет чтения пользователя за primary на окно read-your-writes."""
+    if not settings.DATABASE_REPLICAS:
+        return
+    cache.set(_pin_key(user_id), 1, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def is_pinned_to_primary(user_id: int) -> bool:
+    if not settings.DATABASE_REPLICAS:
+        return False
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def replica_lag(alias: str) -> Optional[float]:
+    """
+    Возвращает отставание реплики в секундах.
+
+    Значение кешируется на DATABASE_REPLICA_LAG_CHECK_INTERVAL секунд в рамках процесса,
+    чтобы не добавлять лишний запрос к каждому чтению. None — реплика недоступна.
+    """
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+        return cached[1]
+
+    lag: Optional[float]
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            row = cursor.fetchone()
+        lag = float(row[0]) if row and row[0] is not None else 0.0
+    except DatabaseError as exc:
+        logger.warning("Не удалось получить отставание реплики %s: %s", alias, exc)
+        lag = None
+
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas() -> List[str]:
+    """Реплики, отставание которых не превышает DATABASE_REPLICA_MAX_LAG."""
+    result: List[str] = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= settings.DATABASE_REPLICA_MAX_LAG:
+            result.append(alias)
+    return result
+
+
+def choose_read_alias() -> str:
+    """Случайная здоровая реплика или primary, если реплик нет или все отстают."""
+    if not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS
+    replicas = healthy_replicas()
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    return random.choice(replicas)
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер primary/replica.
+
+    Чтения уходят на реплику только внутри `replica_reads()` (списки во вьюсетах,
+    скан уведомлений) и только если реплика не отстаёт. Всё остальное — в primary.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name=None, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
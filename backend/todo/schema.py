@@ -1,5 +1,21 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import yaml
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
-from drf_spectacular.plumbing import build_bearer_security_scheme
+
+logger = logging.getLogger(__name__)
+
+YAML_CONTENT_TYPE = "application/vnd.oai.openapi; charset=utf-8"
+JSON_CONTENT_TYPE = "application/vnd.oai.openapi+json; charset=utf-8"
+JSON_FORMATS = {"json", "openapi-json"}
 
 
 class TelegramUserAuthenticationScheme(OpenApiAuthenticationExtension):
@@ -22,3 +38,79 @@ class TelegramUserAuthenticationScheme(OpenApiAuthenticationExtension):
         }
 
 
+class SchemaArtifact:
+    """
+    Готовая схема OpenAPI в памяти процесса.
+
+    Файл (YAML, `manage.py spectacular --file`) читается один раз и перечитывается только
+    при смене mtime; JSON-вариант и ETag обоих вариантов считаются тогда же. Если файла нет
+    (локальный запуск без шага генерации), схема один раз строится в процессе.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[int] = None
+        self._variants: Dict[str, Tuple[bytes, str]] = {}
+
+    def get(self, fmt: str) -> Tuple[bytes, str]:
+        """Возвращает содержимое и ETag схемы в формате yaml или json."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if not self._variants or mtime != self._mtime:
+            self._load(mtime)
+        return self._variants[fmt]
+
+    def _load(self, mtime: Optional[int]) -> None:
+        if mtime is None:
+            if self._variants:
+                return
+            logger.warning("Файл схемы %s не найден, схема сгенерирована в процессе", self.path)
+            content = _generate_yaml()
+        else:
+            with open(self.path, "rb") as schema_file:
+                content = schema_file.read()
+        as_json = json.dumps(yaml.safe_load(content), ensure_ascii=False, indent=2).encode("utf-8")
+        self._variants = {"yaml": (content, _etag(content)), "json": (as_json, _etag(as_json))}
+        self._mtime = mtime
+
+
+def _etag(content: bytes) -> str:
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def _generate_yaml() -> bytes:
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return OpenApiYamlRenderer().render(generator.get_schema(request=None, public=True), renderer_context={})
+
+
+schema_artifact = SchemaArtifact(settings.API_SCHEMA_FILE)
+
+
+def _requested_format(request: HttpRequest) -> str:
+    if request.GET.get("format") in JSON_FORMATS:
+        return "json"
+    return "json" if "json" in request.headers.get("Accept", "") else "yaml"
+
+
+@require_safe
+def schema_view(request: HttpRequest) -> HttpResponse:
+    """
+    Отдаёт готовую схему OpenAPI вместо генерации на каждый запрос, как SpectacularAPIView.
+
+    По умолчанию YAML, с `?format=json` или `Accept: ...json` — JSON. Ответ кешируется клиентами
+    на API_SCHEMA_CACHE_SECONDS, а повторный запрос с If-None-Match получает 304 без тела.
+    """
+    fmt = _requested_format(request)
+    content, etag = schema_artifact.get(fmt)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=JSON_CONTENT_TYPE if fmt == "json" else YAML_CONTENT_TYPE)
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.API_SCHEMA_CACHE_SECONDS)
+    patch_vary_headers(response, ["Accept"])
+    return response
@@ -3,7 +3,19 @@ from typing import List
 from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Category, Task, UserProfile
+from .importers import IMPORT_FORMATS, detect_format
+from .models import (
+    DEFAULT_REMINDER_OFFSETS,
+    REMINDER_MAX_COUNT,
+    REMINDER_MAX_OFFSET,
+    Category,
+    ImportJob,
+    Task,
+    UserProfile,
+    normalize_recurrence,
+    parse_recurrence,
+)
+from .pagination import TaskCursorPagination
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -40,7 +52,9 @@ class TaskSerializer(serializers.ModelSerializer):
     - создавать задачи с привязкой к категориям (по id или по имени);
     - читать детальную информацию о задаче;
     - обновлять поля, включая статус выполнения;
-    - видеть технические поля (created_at, notification_sent).
+    - задавать повторение правилом RRULE (due_date — ближайшее повторение серии);
+    - задавать напоминания за N минут до дедлайна (reminder_offsets);
+    - видеть технические поля (created_at, notification_sent, series_start).
     """
 
     categories = CategorySerializer(many=True, read_only=True)
@@ -57,6 +71,15 @@ class TaskSerializer(serializers.ModelSerializer):
         write_only=True,
         help_text="Названия категорий; будут созданы при отсутствии",
     )
+    reminder_offsets = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=REMINDER_MAX_OFFSET),
+        max_length=REMINDER_MAX_COUNT,
+        required=False,
+        help_text=(
+            "За сколько минут до due_date напомнить, например [1440, 60, 0]; "
+            f"по умолчанию {DEFAULT_REMINDER_OFFSETS}"
+        ),
+    )
 
     class Meta:
         model = Task
@@ -68,11 +91,17 @@ class TaskSerializer(serializers.ModelSerializer):
             "due_date",
             "is_completed",
             "notification_sent",
+            "recurrence",
+            "series_start",
+            "reminder_offsets",
             "categories",
             "category_ids",
             "category_names",
         ]
-        read_only_fields = ["id", "created_at", "notification_sent"]
+        read_only_fields = ["id", "created_at", "notification_sent", "series_start"]
+        extra_kwargs = {
+            "recurrence": {"help_text": "Правило повторения RRULE (RFC 5545), например FREQ=WEEKLY;BYDAY=MO"},
+        }
 
     def _get_or_create_categories(self, names: List[str]) -> List[Category]:
         user = self.context["request"].user
@@ -97,12 +126,42 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("due_date должен быть в будущем.")
         return value
 
+    def validate_recurrence(self, value: str) -> str:
+        try:
+            return normalize_recurrence(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate(self, attrs: dict) -> dict:
+        """Начинает серию заново, если изменились правило повторения или due_date регулярной задачи."""
+        instance = self.instance
+        recurrence = attrs.get("recurrence", instance.recurrence if instance else "")
+        if not recurrence:
+            attrs["series_start"] = None
+            return attrs
+        start = attrs.get("due_date", instance.due_date if instance else None)
+        if instance and recurrence == instance.recurrence and start == instance.due_date:
+            return attrs
+        # повторения RRULE идут с точностью до секунды (см. parse_recurrence): без усечения
+        # первое совпадение с start оказалось бы раньше start и потерялось бы при after(inc=True)
+        start = start.replace(microsecond=0)
+        # due_date становится первым повторением не раньше указанной даты
+        first = parse_recurrence(recurrence, start).after(start, inc=True)
+        if first is None:
+            raise serializers.ValidationError({"recurrence": "Правило не даёт ни одного повторения."})
+        attrs["series_start"] = start
+        attrs["due_date"] = first
+        return attrs
+
     def create(self, validated_data: dict) -> Task:
         user = self.context["request"].user
         category_ids = validated_data.pop("category_ids", [])
         category_names = validated_data.pop("category_names", [])
+        reminder_offsets = validated_data.pop("reminder_offsets", DEFAULT_REMINDER_OFFSETS)
 
-        task = Task.objects.create(user=user, **validated_data)
+        task = Task(user=user, **validated_data)
+        task.pending_reminder_offsets = reminder_offsets
+        task.save(force_insert=True)
 
         categories = list(category_ids)
         if category_names:
@@ -115,9 +174,15 @@ class TaskSerializer(serializers.ModelSerializer):
     def update(self, instance: Task, validated_data: dict) -> Task:
         category_ids = validated_data.pop("category_ids", None)
         category_names = validated_data.pop("category_names", None)
+        reminder_offsets = validated_data.pop("reminder_offsets", None)
+        due_date_changed = validated_data.get("due_date", instance.due_date) != instance.due_date
+        if due_date_changed:
+            instance.notification_sent = False
 
         for field, value in validated_data.items():
             setattr(instance, field, value)
+        # напоминания под новый due_date пересоздаёт Task.save
+        instance.pending_reminder_offsets = reminder_offsets
         instance.save()
 
         categories_to_set = []
@@ -132,6 +197,33 @@ class TaskSerializer(serializers.ModelSerializer):
         return instance
 
 
+class TaskOccurrenceSerializer(serializers.Serializer):
+    """Отметка о выполнении одного повторения регулярной задачи."""
+
+    occurrence_at = serializers.DateTimeField(help_text="Дата и время повторения, как в списке повторений")
+    is_completed = serializers.BooleanField(default=True, help_text="false снимает отметку")
+
+
+class OccurrenceWindowSerializer(serializers.Serializer):
+    """Окно, в котором разворачиваются повторения задач."""
+
+    max_days = 366
+    max_limit = 1000
+
+    start = serializers.DateTimeField(help_text="Начало окна (включительно)")
+    end = serializers.DateTimeField(help_text="Конец окна (не включительно)")
+    limit = serializers.IntegerField(
+        min_value=1, max_value=max_limit, default=max_limit, help_text="Максимум повторений в ответе"
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        if attrs["end"] <= attrs["start"]:
+            raise serializers.ValidationError({"end": "end должен быть позже start."})
+        if (attrs["end"] - attrs["start"]).days > self.max_days:
+            raise serializers.ValidationError({"end": f"Окно не может быть длиннее {self.max_days} дней."})
+        return attrs
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Сериализатор профиля Telegram <-> Django."""
 
@@ -140,3 +232,63 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ["telegram_user_id", "telegram_chat_id"]
 
 
+class TelegramBootstrapSerializer(serializers.Serializer):
+    """Параметры составного запроса бота: регистрация, категории и задачи за один вызов."""
+
+    telegram_chat_id = serializers.IntegerField()
+    tasks = serializers.ChoiceField(
+        choices=["page", "counts"],
+        default="page",
+        help_text="page — первая страница задач, counts — только количество задач",
+    )
+    page_size = serializers.IntegerField(
+        min_value=1, max_value=TaskCursorPagination.max_page_size, default=5, help_text="Задач на первой странице"
+    )
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Сериализатор фонового импорта задач.
+
+    При создании принимает файл и (необязательно) формат; если формат не указан,
+    он определяется по расширению файла. Остальные поля отражают прогресс задания.
+    """
+
+    file = serializers.FileField(write_only=True)
+    format = serializers.ChoiceField(choices=IMPORT_FORMATS, required=False)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "file",
+            "format",
+            "status",
+            "total_rows",
+            "processed_rows",
+            "failed_rows",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = [
+            "id",
+            "status",
+            "total_rows",
+            "processed_rows",
+            "failed_rows",
+            "error",
+            "created_at",
+            "finished_at",
+        ]
+
+    def validate(self, attrs: dict) -> dict:
+        if not attrs.get("format"):
+            detected = detect_format(attrs["file"].name)
+            if not detected:
+                raise serializers.ValidationError({"format": "Не удалось определить формат файла, укажите format."})
+            attrs["format"] = detected
+        return attrs
+
+    def create(self, validated_data: dict) -> ImportJob:
+        user = self.context["request"].user
+        return ImportJob.objects.create(user=user, **validated_data)
@@ -1,51 +1,132 @@
+import io
 import logging
-from typing import List
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
 
 import httpx
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
-from .models import Task
+from . import events
+from .importers import ImportRowError, iter_records
+from .metrics import (
+    NOTIFICATION_BACKLOG,
+    NOTIFICATION_TICK_LATENCY,
+    NOTIFICATIONS_FAILED,
+    NOTIFICATIONS_SENT,
+    TELEGRAM_SEND_LATENCY,
+)
+from .models import DEFAULT_REMINDER_OFFSETS, Category, ImportJob, Task, TaskReminder, UserProfile, build_task_pk
+from .routers import replica_reads
 
 logger = logging.getLogger(__name__)
 
+IMPORT_BATCH_SIZE = 5000
+
 
 @shared_task
 def send_task_due_notifications() -> int:
     """
-    Проверяет задачи с наступившим дедлайном и отправляет уведомления в Telegram.
+    Проверяет наступившие напоминания о задачах и отправляет уведомления в Telegram.
 
-    Возвращает количество обработанных задач.
+    Возвращает количество отправленных уведомлений.
     """
 
+    with NOTIFICATION_TICK_LATENCY.time():
+        return _send_due_notifications()
+
+
+def _send_due_notifications() -> int:
     now = timezone.now()
-    tasks: List[Task] = (
-        Task.objects.filter(is_completed=False, notification_sent=False, due_date__lte=now)
-        .select_related("user", "user__profile")
-        .prefetch_related("categories")
-    )
+    with replica_reads():
+        # частичный индекс todo_reminder_unsent_idx: в выборку попадают только ожидающие напоминания
+        reminders: List[TaskReminder] = list(
+            TaskReminder.objects.filter(sent_at__isnull=True, fire_at__lte=now)
+            .select_related("task", "task__user", "task__user__profile")
+            .prefetch_related("task__categories")
+            .order_by("fire_at")
+        )
+
+    NOTIFICATION_BACKLOG.set(len(reminders))
+
+    # Из нескольких наступивших напоминаний задачи (планировщик простаивал) отправляется
+    # только последнее, остальные и напоминания завершённых задач просто закрываются
+    latest: Dict[str, TaskReminder] = {}
+    skipped: List[int] = []
+    for reminder in reminders:
+        if reminder.task.is_completed:
+            skipped.append(reminder.pk)
+            continue
+        previous = latest.get(reminder.task_id)
+        if previous is not None:
+            skipped.append(previous.pk)
+        latest[reminder.task_id] = reminder
+    if skipped:
+        TaskReminder.objects.filter(pk__in=skipped).update(sent_at=now)
 
     sent = 0
-    for task in tasks:
+    for reminder in latest.values():
+        task = reminder.task
         profile = getattr(task.user, "profile", None)
         if not profile or not profile.telegram_chat_id:
             continue
 
-        message = _format_message(task)
+        message = _format_message(task, reminder.offset_minutes)
         if _send_telegram_message(profile.telegram_chat_id, message):
-            task.notification_sent = True
-            task.save(update_fields=["notification_sent"])
+            _mark_sent(reminder, now)
             sent += 1
+            NOTIFICATIONS_SENT.inc()
+        else:
+            NOTIFICATIONS_FAILED.inc()
     return sent
 
 
-def _format_message(task: Task) -> str:
-    """Формирует текст уведомления о задаче."""
+def _mark_sent(reminder: TaskReminder, now: datetime) -> None:
+    """
+    Отмечает напоминание отправленным; после последнего напоминания — и задачу.
+
+    У регулярной задачи после последнего напоминания due_date переходит на следующее
+    повторение, и напоминания пересоздаются под него: в индексе всегда лежат напоминания
+    только ближайшего повторения серии. Повторения, пропущенные, пока планировщик не работал,
+    не догоняются.
+    """
+    reminder.sent_at = now
+    reminder.save(update_fields=["sent_at"])
+    task = reminder.task
+    if TaskReminder.objects.filter(task_id=task.pk, sent_at__isnull=True).exists():
+        return
+    try:
+        next_due = task.next_occurrence(max(task.due_date, now)) if task.recurrence else None
+    except ValueError:
+        # правило, записанное в обход валидации, не должно прерывать рассылку остальным задачам
+        logger.exception("Некорректное правило повторения задачи %s", task.pk)
+        next_due = None
+    if next_due is None:
+        task.notification_sent = True
+        task.save(update_fields=["notification_sent"])
+        return
+    task.due_date = next_due
+    # напоминания под новое повторение пересоздаёт Task.save
+    task.save(update_fields=["due_date"])
+
+
+def _format_offset(minutes: int) -> str:
+    days, rest = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(rest, 60)
+    parts = [f"{value} {unit}" for value, unit in ((days, "д"), (hours, "ч"), (minutes, "мин")) if value]
+    return " ".join(parts)
+
+
+def _format_message(task: Task, offset_minutes: int = 0) -> str:
+    """Формирует текст уведомления о задаче: о дедлайне или напоминание за offset_minutes до него."""
     tz = timezone.get_current_timezone()
     due_local = task.due_date.astimezone(tz).strftime("%Y-%m-%d %H:%M")
-    categories = ", ".join(task.categories.values_list("name", flat=True)) or "без категории"
-    return f"⏰ Дедлайн задачи\nНазвание: {task.title}\nКатегории: {categories}\nДедлайн: {due_local}"
+    categories = ", ".join(category.name for category in task.categories.all()) or "без категории"
+    header = f"🔔 До дедлайна {_format_offset(offset_minutes)}" if offset_minutes else "⏰ Дедлайн задачи"
+    return f"{header}\nНазвание: {task.title}\nКатегории: {categories}\nДедлайн: {due_local}"
 
 
 def _send_telegram_message(chat_id: int, text: str) -> bool:
@@ -59,14 +140,144 @@ def _send_telegram_message(chat_id: int, text: str) -> bool:
     payload = {"chat_id": chat_id, "text": text}
     timeout = settings.TELEGRAM_REQUEST_TIMEOUT
 
+    start = time.perf_counter()
+    result = "error"
     try:
         with httpx.Client(timeout=timeout) as client:
             response = client.post(url, json=payload)
             if response.status_code == 200:
+                result = "ok"
                 return True
+            result = str(response.status_code)
             logger.error("Не удалось отправить сообщение в Telegram: %s", response.text)
     except Exception as exc:  # noqa: BLE001
         logger.exception("Ошибка отправки Telegram сообщения: %s", exc)
+    finally:
+        TELEGRAM_SEND_LATENCY.labels(result).observe(time.perf_counter() - start)
     return False
 
 
+@shared_task
+def import_tasks(job_id: int) -> int:
+    """
+    Импортирует задачи из файла, загруженного через /api/tasks/import/.
+
+    Файл читается потоково в два прохода: первый считает строки и собирает названия
+    категорий (они создаются одним set-based upsert), второй грузит задачи пачками
+    через bulk_create. Возвращает количество обработанных строк.
+    """
+
+    job = ImportJob.objects.select_related("user").get(pk=job_id)
+    ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.Status.RUNNING)
+    try:
+        names, total = _scan_import(job)
+        ImportJob.objects.filter(pk=job.pk).update(total_rows=total)
+        category_ids = _upsert_categories(job.user, names)
+        telegram_user_id = (
+            UserProfile.objects.filter(user_id=job.user_id).values_list("telegram_user_id", flat=True).first()
+        )
+        processed = _load_import(job, category_ids, telegram_user_id)
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Ошибка импорта задач (job %s): %s", job.pk, exc)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.Status.FAILED, error=str(exc), finished_at=timezone.now()
+        )
+        return 0
+    finally:
+        job.file.delete(save=False)
+
+    ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.Status.DONE, finished_at=timezone.now())
+    return processed
+
+
+def _open_import(job: ImportJob) -> io.TextIOWrapper:
+    return io.TextIOWrapper(job.file.open("rb"), encoding="utf-8-sig", newline="")
+
+
+def _scan_import(job: ImportJob) -> Tuple[Set[str], int]:
+    """Первый проход: количество строк и все названия категорий из файла."""
+    names: Set[str] = set()
+    total = 0
+    with _open_import(job) as stream:
+        for record in iter_records(stream, job.format):
+            total += 1
+            if not isinstance(record, ImportRowError):
+                names.update(record["categories"])
+    return names, total
+
+
+def _upsert_categories(user, names: Set[str]) -> Dict[str, int]:
+    """Создаёт недостающие категории одним запросом и возвращает отображение имя -> id."""
+    if not names:
+        return {}
+    Category.objects.bulk_create(
+        [Category(user=user, name=name) for name in names], ignore_conflicts=True, batch_size=IMPORT_BATCH_SIZE
+    )
+    return dict(Category.objects.filter(user=user, name__in=names).values_list("name", "id"))
+
+
+def _load_import(job: ImportJob, category_ids: Dict[str, int], telegram_user_id: Optional[int] = None) -> int:
+    """Второй проход: загрузка задач пачками с обновлением прогресса задания."""
+    now = timezone.now()
+    processed = failed = 0
+    batch: List[dict] = []
+    with _open_import(job) as stream:
+        for record in iter_records(stream, job.format):
+            processed += 1
+            if isinstance(record, ImportRowError):
+                failed += 1
+                continue
+            batch.append(record)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _insert_batch(job.user_id, batch, category_ids, now, telegram_user_id)
+                batch = []
+                ImportJob.objects.filter(pk=job.pk).update(processed_rows=processed, failed_rows=failed)
+    if batch:
+        _insert_batch(job.user_id, batch, category_ids, now, telegram_user_id)
+    ImportJob.objects.filter(pk=job.pk).update(processed_rows=processed, failed_rows=failed)
+    return processed
+
+
+def _insert_batch(
+    user_id: int,
+    batch: List[dict],
+    category_ids: Dict[str, int],
+    now: datetime,
+    telegram_user_id: Optional[int] = None,
+) -> None:
+    """
+    Вставляет пачку задач, их связи с категориями и напоминания по умолчанию.
+
+    PK считается так же, как в Task.save; уже существующие задачи (повторный импорт) пропускаются.
+    Уведомления и напоминания с прошедшим временем считаются отправленными. bulk_create не шлёт
+    сигналы и не сообщает, какие строки вставлены, поэтому после фиксации пачки публикуется одно
+    событие «данные пользователя изменились» — и категории, и задачи; поток не забивается
+    записью на каждую строку.
+    """
+    tasks: Dict[str, Task] = {}
+    links = []
+    reminders = []
+    through = Task.categories.through
+    for record in batch:
+        created_at = record["created_at"] or now
+        pk = build_task_pk(user_id, record["title"], record["due_date"], created_at)
+        if pk in tasks:
+            continue
+        tasks[pk] = Task(
+            id=pk,
+            user_id=user_id,
+            title=record["title"],
+            description=record["description"],
+            created_at=created_at,
+            due_date=record["due_date"],
+            is_completed=record["is_completed"],
+            notification_sent=record["due_date"] <= now,
+        )
+        links.extend(through(task_id=pk, category_id=category_ids[name]) for name in record["categories"])
+        reminders.extend(TaskReminder.build(pk, offset, record["due_date"], now) for offset in DEFAULT_REMINDER_OFFSETS)
+
+    with transaction.atomic():
+        Task.objects.bulk_create(tasks.values(), ignore_conflicts=True)
+        through.objects.bulk_create(links, ignore_conflicts=True)
+        TaskReminder.objects.bulk_create(reminders, ignore_conflicts=True)
+        events.publish([events.user_event(user_id, telegram_user_id)])
@@ -0,0 +1,123 @@
+"""
+Поток событий об изменениях (todo.events) на InMemoryBackend.
+
+Запуск: `python manage.py test todo` (нужна тестовая БД Postgres, как в docker-compose).
+"""
+
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from todo import events
+from todo.events import CREATED, DELETED, UPDATED, ChangeEvent, EventConsumer, InMemoryBackend
+
+
+def _event(entity_id: str = "1", kind: str = UPDATED) -> ChangeEvent:
+    return ChangeEvent("task", kind, 7, entity_id, telegram_user_id=42)
+
+
+class ChangeEventTest(SimpleTestCase):
+    def test_all_fields_round_trip(self):
+        event = ChangeEvent("task", CREATED, 7, "123", 42, "2025-01-01T09:00:00+00:00", True)
+        self.assertEqual(ChangeEvent.from_fields(event.to_fields()), event)
+
+    def test_optional_fields_are_omitted(self):
+        event = ChangeEvent("category", DELETED, 7, "5")
+        self.assertEqual(event.to_fields(), {"e": "category", "k": DELETED, "u": "7", "id": "5"})
+        self.assertEqual(ChangeEvent.from_fields(event.to_fields()), event)
+
+    def test_not_completed_round_trip(self):
+        event = ChangeEvent("task", UPDATED, 7, "1", is_completed=False)
+        self.assertIs(ChangeEvent.from_fields(event.to_fields()).is_completed, False)
+
+    def test_bytes_fields_from_redis(self):
+        fields = {key.encode(): value.encode() for key, value in _event().to_fields().items()}
+        self.assertEqual(ChangeEvent.from_fields(fields), _event())
+
+
+class PublishTest(TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        patcher = mock.patch.object(events, "get_backend", return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_published_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish([_event()])
+            self.assertEqual(self.backend.entries, [])
+        self.assertEqual([event for _, event in self.backend.entries], [_event()])
+
+    def test_rolled_back_events_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    events.publish([_event()])
+                    raise RuntimeError("rollback")
+        self.assertEqual(self.backend.entries, [])
+
+
+class EventConsumerTest(SimpleTestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+
+    def consumer(self, name: str = "worker-1", **kwargs) -> EventConsumer:
+        kwargs.setdefault("claim_idle_ms", 0)
+        return EventConsumer("reminders", name, self.backend, **kwargs)
+
+    def test_new_group_skips_earlier_events(self):
+        self.backend.publish([_event("1")])
+        consumer = self.consumer()
+        self.backend.publish([_event("2")])
+        self.assertEqual([event.entity_id for _, event in consumer.poll(block_ms=None)], ["2"])
+
+    def test_each_event_goes_to_one_consumer_of_group(self):
+        first = self.consumer("worker-1", claim_idle_ms=60000)
+        second = self.consumer("worker-2", claim_idle_ms=60000)
+        self.backend.publish([_event("1"), _event("2")])
+        self.assertEqual(len(first.poll(count=1, block_ms=None)), 1)
+        self.assertEqual(len(second.poll(block_ms=None)), 1)
+        self.assertEqual(first.poll(block_ms=None), [])
+
+    def test_handled_events_are_acked(self):
+        consumer = self.consumer()
+        self.backend.publish([_event("1"), _event("2")])
+        handled = []
+        consumer.run(handled.append, max_batches=2, block_ms=None)
+        self.assertEqual([event.entity_id for event in handled], ["1", "2"])
+        self.assertEqual(self.backend.delivery_count("reminders", "1-0"), 0)
+
+    def test_failed_event_is_redelivered(self):
+        consumer = self.consumer()
+        self.backend.publish([_event()])
+        calls = []
+
+        def handler(event: ChangeEvent) -> None:
+            calls.append(event)
+            if len(calls) == 1:
+                raise RuntimeError("handler failed")
+
+        with self.assertLogs("todo.events", "ERROR"):
+            consumer.run(handler, max_batches=2, block_ms=None)
+        self.assertEqual(calls, [_event(), _event()])
+        self.assertEqual(self.backend.delivery_count("reminders", "1-0"), 0)
+        self.assertEqual(self.backend.dead, [])
+
+    def test_failed_event_waits_for_claim_idle(self):
+        consumer = self.consumer(claim_idle_ms=60000)
+        self.backend.publish([_event()])
+        with self.assertLogs("todo.events", "ERROR"):
+            consumer.run(mock.Mock(side_effect=RuntimeError("handler failed")), max_batches=1, block_ms=None)
+        self.assertEqual(consumer.poll(block_ms=None), [])
+        self.assertEqual(self.backend.delivery_count("reminders", "1-0"), 1)
+
+    def test_event_is_dead_lettered_after_max_deliveries(self):
+        consumer = self.consumer(max_deliveries=3)
+        self.backend.publish([_event()])
+        handler = mock.Mock(side_effect=RuntimeError("handler failed"))
+        with self.assertLogs("todo.events", "ERROR"):
+            consumer.run(handler, max_batches=5, block_ms=None)
+        self.assertEqual(handler.call_count, 3)
+        self.assertEqual(self.backend.dead, [("reminders", "1-0", _event())])
+        self.assertEqual(self.backend.delivery_count("reminders", "1-0"), 0)
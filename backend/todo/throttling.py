@@ -0,0 +1,119 @@
+import logging
+import math
+from typing import Optional, Tuple
+
+from django.conf import settings
+from redis.exceptions import RedisError
+from rest_framework import permissions
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import THROTTLED_REQUESTS
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Token bucket: ёмкость = N запросов, пополнение N токенов за период.
+# Время берётся из Redis, чтобы расхождение часов между процессами не влияло на лимит.
+# Возвращает {разрешено (0/1), сколько миллисекунд ждать следующего токена}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait_ms = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, wait_ms}
+"""
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Разбирает ставку в формате DRF ("30/min") в (запросов, секунд)."""
+    if not rate:
+        return None
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class TelegramUserRateThrottle(BaseThrottle):
+    """
+    Ограничение частоты запросов на Telegram-пользователя (token bucket в Redis).
+
+    Ключ — пользователь, найденный TelegramUserAuthentication; для анонимных запросов — IP.
+    Скоуп берётся из атрибута вьюхи `throttle_scope`, иначе `read` для безопасных методов
+    и `write` для остальных. Ставки — REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"].
+
+    Проверка — один вызов EVALSHA. Если Redis недоступен, запрос пропускается.
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+    _script = None
+
+    def __init__(self):
+        self.wait_seconds: Optional[float] = None
+
+    @classmethod
+    def get_script(cls):
+        if cls._script is None:
+            cls._script = get_redis().register_script(TOKEN_BUCKET_LUA)
+        return cls._script
+
+    def get_scope(self, request, view) -> str:
+        scope = getattr(view, "throttle_scope", None)
+        if scope:
+            return scope
+        return "read" if request.method in permissions.SAFE_METHODS else "write"
+
+    def get_cache_key(self, request, view, scope: str) -> str:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            ident = f"user:{user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return self.cache_format % {"scope": scope, "ident": ident}
+
+    def allow_request(self, request, view) -> bool:
+        scope = self.get_scope(request, view)
+        parsed = parse_rate(settings.REST_FRAMEWORK.get("DEFAULT_THROTTLE_RATES", {}).get(scope))
+        if parsed is None:
+            return True
+        num_requests, duration = parsed
+        # токенов в миллисекунду
+        rate = num_requests / (duration * 1000)
+
+        try:
+            allowed, wait_ms = self.get_script()(
+                keys=[self.get_cache_key(request, view, scope)], args=[num_requests, rate]
+            )
+        except RedisError as exc:
+            logger.warning("Троттлинг пропущен, Redis недоступен: %s", exc)
+            return True
+
+        if allowed:
+            return True
+        self.wait_seconds = math.ceil(int(wait_ms) / 1000)
+        THROTTLED_REQUESTS.labels(scope=scope).inc()
+        return False
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
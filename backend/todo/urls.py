@@ -1,14 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import CategoryViewSet, TaskViewSet, TelegramRegisterView
+from .views import CategoryViewSet, ImportJobViewSet, TaskViewSet, TelegramBootstrapView, TelegramRegisterView
 
 router = DefaultRouter()
 router.register("tasks", TaskViewSet, basename="task")
 router.register("categories", CategoryViewSet, basename="category")
+router.register("imports", ImportJobViewSet, basename="import-job")
 
 urlpatterns = [
     path("telegram/register/", TelegramRegisterView.as_view(), name="telegram-register"),
+    path("telegram/bootstrap/", TelegramBootstrapView.as_view(), name="telegram-bootstrap"),
     path("", include(router.urls)),
 ]
 
@@ -1,13 +1,92 @@
-from typing import Any, Dict
+import heapq
+import logging
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, Iterator, Tuple
 
 from django.db import transaction
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse
-from rest_framework import permissions, status, viewsets
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import Category, Task, UserProfile
-from .serializers import CategorySerializer, TaskSerializer, UserProfileSerializer
+from . import events
+from .exporters import CSVRenderer, ICalendarRenderer, NDJSONRenderer, stream_tasks
+from .idempotency import IdempotentPostMixin
+from .models import TASK_SEARCH_VECTOR, Category, ImportJob, Task, TaskOccurrence, UserProfile, task_prefix_query
+from .pagination import TaskCursorPagination
+from .routers import disable_replica_reads, enable_replica_reads, is_pinned_to_primary, pin_to_primary
+from .serializers import (
+    CategorySerializer,
+    ImportJobSerializer,
+    OccurrenceWindowSerializer,
+    TaskOccurrenceSerializer,
+    TaskSerializer,
+    TelegramBootstrapSerializer,
+    UserProfileSerializer,
+)
+from .tasks import import_tasks
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    "Idempotency-Key",
+    OpenApiTypes.STR,
+    OpenApiParameter.HEADER,
+    description="Ключ повтора: запрос с тем же ключом вернёт сохранённый первый ответ, не создавая дубликат",
+)
+
+
+def _series_occurrences(task: Task, start: datetime, end: datetime) -> Iterator[Tuple[datetime, Task]]:
+    try:
+        for occurrence in task.iter_occurrences(start, end):
+            yield occurrence, task
+    except ValueError:
+        # правило, записанное в обход валидации (QuerySet.update, SQL), не должно ломать весь календарь
+        logger.exception("Некорректное правило повторения задачи %s", task.pk)
+
+
+class ReplicaReadMixin:
+    """
+    Направляет безопасные запросы вьюсета на реплику.
+
+    После успешной записи пользователь на DATABASE_REPLICA_STICKY_SECONDS закрепляется
+    за primary, чтобы не увидеть устаревший список сразу после изменения.
+    """
+
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS and not is_pinned_to_primary(request.user.pk):
+            self._replica_token = enable_replica_reads()
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # не в finalize_response: тот не вызывается, если исключение пробрасывается дальше DRF
+            if self._replica_token is not None:
+                disable_replica_reads(self._replica_token)
+                self._replica_token = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in permissions.SAFE_METHODS and response.status_code < 400:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
 
 
 @extend_schema_view(
@@ -18,6 +97,7 @@ from .serializers import CategorySerializer, TaskSerializer, UserProfileSerializ
     create=extend_schema(
         summary="Создать категорию",
         description="Создаёт новую категорию для текущего пользователя.",
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
     ),
     retrieve=extend_schema(
         summary="Получить категорию",
@@ -37,7 +117,7 @@ from .serializers import CategorySerializer, TaskSerializer, UserProfileSerializ
         responses={204: OpenApiResponse(description="Категория удалена")},
     ),
 )
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(IdempotentPostMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """CRUD для категорий текущего пользователя."""
 
     serializer_class = CategorySerializer
@@ -51,11 +131,23 @@ class CategoryViewSet(viewsets.ModelViewSet):
 @extend_schema_view(
     list=extend_schema(
         summary="Список задач",
-        description="Возвращает список задач, принадлежащих текущему пользователю.",
+        description=(
+            "Возвращает список задач, принадлежащих текущему пользователю.\n\n"
+            "С параметром page_size ответ постраничный: {next, previous, results}, "
+            "следующая страница — по ссылке next (курсор).\n\n"
+            "С окном start/end ответ такой же, как у /api/tasks/occurrences/: задачи с дедлайном в окне "
+            "по возрастанию дедлайна, регулярные задачи развёрнуты в отдельные повторения (page_size не действует)."
+        ),
+        parameters=[
+            OpenApiParameter("start", OpenApiTypes.DATETIME, description="Начало окна повторений (включительно)"),
+            OpenApiParameter("end", OpenApiTypes.DATETIME, description="Конец окна повторений (не включительно)"),
+            OpenApiParameter("limit", OpenApiTypes.INT, description="Максимум повторений в окне"),
+        ],
     ),
     create=extend_schema(
         summary="Создать задачу",
         description="Создаёт новую задачу для текущего пользователя с указанием дедлайна и категорий.",
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
     ),
     retrieve=extend_schema(
         summary="Получить задачу",
@@ -75,23 +167,239 @@ class CategoryViewSet(viewsets.ModelViewSet):
         responses={204: OpenApiResponse(description="Задача удалена")},
     ),
 )
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(IdempotentPostMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """CRUD для задач текущего пользователя."""
 
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
         """Возвращает queryset задач текущего пользователя с оптимизированными связями."""
         return (
             Task.objects.filter(user=self.request.user)
             .select_related("user")
-            .prefetch_related("categories")
+            .prefetch_related("categories", "reminders")
             .order_by("-created_at")
         )
 
+    def list(self, request, *args, **kwargs):
+        if "start" in request.query_params or "end" in request.query_params:
+            return self._occurrence_window(request)
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        summary="Поиск задач",
+        description=(
+            "Ищет задачи текущего пользователя по началу слов в названии и описании "
+            "(полнотекстовый индекс) и по началу названия категории. Без q возвращает последние задачи."
+        ),
+        parameters=[
+            OpenApiParameter("q", OpenApiTypes.STR, description="Строка поиска"),
+            OpenApiParameter(
+                "limit", OpenApiTypes.INT, description=f"Максимум результатов (по умолчанию {SEARCH_DEFAULT_LIMIT})"
+            ),
+        ],
+        responses={200: TaskSerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"], url_path="search", pagination_class=None)
+    def search(self, request):
+        term = request.query_params.get("q", "").strip()
+        try:
+            limit = min(int(request.query_params.get("limit", SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "limit должен быть числом"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        if term:
+            categories = Category.objects.filter(user=request.user, name__istartswith=term)
+            links = Task.categories.through.objects.filter(category__in=categories).values("task_id")
+            condition = Q(pk__in=links)
+            query = task_prefix_query(term)
+            if query is not None:
+                condition |= Q(search=query)
+            queryset = queryset.alias(search=TASK_SEARCH_VECTOR).filter(condition)
+        serializer = self.get_serializer(queryset[: max(limit, 1)], many=True)
+        return Response(serializer.data)
+
+    @extend_schema(
+        summary="Повторения задач в окне",
+        description=(
+            "Возвращает задачи текущего пользователя с дедлайном в окне [start, end), упорядоченные по "
+            "дедлайну. Регулярные задачи разворачиваются по правилу recurrence: каждое повторение — "
+            "отдельный элемент с due_date повторения и его собственным is_completed.\n\n"
+            "Повторения вычисляются на лету и не хранятся, окно ограничено "
+            f"{OccurrenceWindowSerializer.max_days} днями."
+        ),
+        parameters=[OccurrenceWindowSerializer],
+        responses={200: TaskSerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"], url_path="occurrences", pagination_class=None)
+    def occurrences(self, request):
+        return self._occurrence_window(request)
+
+    def _occurrence_window(self, request) -> Response:
+        """Задачи с дедлайном в окне start/end с развёрнутыми повторениями (общая часть list и occurrences)."""
+        params = OccurrenceWindowSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start, end, limit = (params.validated_data[key] for key in ("start", "end", "limit"))
+
+        queryset = self.get_queryset().order_by()
+        # обычных задач в окне может быть много — берём сразу не больше limit ближайших
+        single = queryset.filter(recurrence="", due_date__gte=start, due_date__lt=end).order_by("due_date")[:limit]
+        # завершённая серия (is_completed) больше не повторяется
+        series = list(queryset.exclude(recurrence="").filter(series_start__lt=end, is_completed=False))
+        completed = set(
+            TaskOccurrence.objects.filter(task__in=series, occurrence_at__gte=start, occurrence_at__lt=end)
+            .values_list("task_id", "occurrence_at")
+        )
+
+        merged = heapq.merge(
+            ((task.due_date, task) for task in single),
+            *(_series_occurrences(task, start, end) for task in series),
+            key=itemgetter(0),
+        )
+        serialized: Dict[str, Dict[str, Any]] = {}
+        due_field = serializers.DateTimeField()
+        results = []
+        for occurrence, task in islice(merged, limit):
+            if task.pk not in serialized:
+                serialized[task.pk] = self.get_serializer(task).data
+            results.append(
+                {
+                    **serialized[task.pk],
+                    "due_date": due_field.to_representation(occurrence),
+                    "is_completed": task.is_completed or (task.pk, occurrence) in completed,
+                }
+            )
+        return Response(results)
+
+    @extend_schema(
+        summary="Отметить повторение",
+        description=(
+            "Отмечает выполненным (или снимает отметку) одно повторение регулярной задачи.\n\n"
+            "Если это текущее повторение (due_date задачи), due_date переходит на следующее невыполненное, "
+            "а когда повторений больше нет — задача завершается."
+        ),
+        request=TaskOccurrenceSerializer,
+        responses={200: TaskSerializer},
+    )
+    @action(detail=True, methods=["post"], url_path="occurrences", serializer_class=TaskOccurrenceSerializer)
+    def mark_occurrence(self, request, pk=None):
+        task = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        occurrence = serializer.validated_data["occurrence_at"]
+        rule = task.recurrence_rule(near=occurrence)
+        if rule is None:
+            return Response({"detail": "Задача не повторяется"}, status=status.HTTP_400_BAD_REQUEST)
+        if rule.after(occurrence, inc=True) != occurrence:
+            return Response({"occurrence_at": ["Это не повторение задачи."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            if serializer.validated_data["is_completed"]:
+                TaskOccurrence.objects.get_or_create(task=task, occurrence_at=occurrence)
+                if occurrence == task.due_date:
+                    self._advance_series(task, occurrence)
+            else:
+                TaskOccurrence.objects.filter(task=task, occurrence_at=occurrence).delete()
+                if timezone.now() < occurrence < task.due_date:
+                    task.due_date = occurrence
+                    task.notification_sent = False
+                    task.save(update_fields=["due_date", "notification_sent"])
+        return Response(TaskSerializer(task, context=self.get_serializer_context()).data)
+
+    @staticmethod
+    def _advance_series(task: Task, after: datetime) -> None:
+        next_due = task.next_occurrence(after)
+        if next_due is None:
+            task.is_completed = True
+            task.save(update_fields=["is_completed"])
+            return
+        task.due_date = next_due
+        task.notification_sent = False
+        task.save(update_fields=["due_date", "notification_sent"])
+
+    @extend_schema(
+        summary="Экспорт задач",
+        description=(
+            "Потоково выгружает все задачи текущего пользователя в NDJSON, CSV или iCalendar (VTODO).\n\n"
+            "Данные читаются серверным курсором пачками, поэтому объём памяти не зависит от количества задач."
+        ),
+        parameters=[
+            OpenApiParameter(
+                "format",
+                OpenApiTypes.STR,
+                enum=[NDJSONRenderer.format, CSVRenderer.format, ICalendarRenderer.format],
+                description="Формат выгрузки (по умолчанию ndjson)",
+            )
+        ],
+        responses={200: OpenApiResponse(response=OpenApiTypes.BINARY, description="Файл с задачами")},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        renderer_classes=[NDJSONRenderer, CSVRenderer, ICalendarRenderer],
+    )
+    def export(self, request):
+        queryset = Task.objects.filter(user=request.user).order_by("-created_at")
+        # Фиксируем БД сейчас: поток читается уже после finalize_response, когда контекст реплики сброшен
+        queryset = queryset.using(queryset.db)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_tasks(queryset, renderer.format),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = f'attachment; filename="tasks.{renderer.format}"'
+        return response
 
-class TelegramRegisterView(APIView):
+    @extend_schema(
+        summary="Импорт задач",
+        description=(
+            "Принимает файл CSV, NDJSON или iCalendar и ставит фоновое задание на импорт.\n\n"
+            "Прогресс задания доступен по /api/imports/{id}/."
+        ),
+        request={"multipart/form-data": ImportJobSerializer},
+        responses={202: ImportJobSerializer},
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[MultiPartParser, FormParser],
+        serializer_class=ImportJobSerializer,
+    )
+    def bulk_import(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save()
+        transaction.on_commit(lambda: import_tasks.delay(job.pk))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="Список импортов",
+        description="Возвращает задания импорта текущего пользователя.",
+    ),
+    retrieve=extend_schema(
+        summary="Статус импорта",
+        description="Возвращает статус и прогресс задания импорта.",
+    ),
+)
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Просмотр статуса фоновых импортов текущего пользователя."""
+
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        """Возвращает задания импорта текущего пользователя."""
+        return ImportJob.objects.filter(user=self.request.user)
+
+
+class TelegramRegisterView(IdempotentPostMixin, APIView):
     """
     Регистрирует или обновляет связь Telegram-пользователя с Django-пользователем.
 
@@ -101,6 +409,7 @@ class TelegramRegisterView(APIView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "register"
 
     @extend_schema(
         summary="Регистрация Telegram-пользователя",
@@ -109,6 +418,7 @@ class TelegramRegisterView(APIView):
             "Используется Telegram-ботом для последующей отправки уведомлений."
         ),
         request=UserProfileSerializer,
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
         responses={200: UserProfileSerializer},
     )
     def post(self, request, *args, **kwargs):
@@ -138,3 +448,94 @@ class TelegramRegisterView(APIView):
         return Response(payload, status=status.HTTP_200_OK)
 
 
+class TelegramBootstrapView(APIView):
+    """
+    Составной запрос бота: регистрация, категории и первая страница задач (или счётчики).
+
+    Заменяет цепочку register -> categories -> tasks одним обращением к backend.
+    Число SQL-запросов фиксировано и не зависит от данных пользователя: профиль берётся
+    из аутентификации и перезаписывается одним upsert только при изменении chat id,
+    дальше — запрос категорий и страница задач с prefetch категорий и напоминаний (или один агрегат).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    # повторный вызов без изменений ничего не пишет — лимитируем как чтение, а не как регистрацию
+    throttle_scope = "read"
+
+    @extend_schema(
+        summary="Bootstrap Telegram-пользователя",
+        description=(
+            "Идемпотентно регистрирует пользователя (как /api/telegram/register/) и в том же ответе "
+            "возвращает профиль, категории и первую страницу задач (tasks=page) или только количество "
+            "задач (tasks=counts).\n\n"
+            "Ссылка next страницы указывает на /api/tasks/ с курсором — дальше список листается там."
+        ),
+        request=TelegramBootstrapSerializer,
+        responses={200: OpenApiResponse(description="user_id, username, profile, categories и tasks или counts")},
+    )
+    def post(self, request, *args, **kwargs):
+        params = TelegramBootstrapSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        telegram_chat_id = params.validated_data["telegram_chat_id"]
+
+        profile = self._register(request, telegram_chat_id)
+        if profile is None:
+            return Response({"detail": "Не найден Telegram user id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        payload: Dict[str, Any] = {
+            "user_id": request.user.id,
+            "username": request.user.username,
+            "profile": UserProfileSerializer(profile).data,
+            "categories": CategorySerializer(
+                Category.objects.filter(user=request.user).order_by("name"), many=True
+            ).data,
+        }
+        tasks = Task.objects.filter(user=request.user)
+        if params.validated_data["tasks"] == "counts":
+            payload["counts"] = tasks.aggregate(
+                total=Count("pk"), completed=Count("pk", filter=Q(is_completed=True))
+            )
+            payload["counts"]["active"] = payload["counts"]["total"] - payload["counts"]["completed"]
+        else:
+            payload["tasks"] = self._first_page(request, tasks, params.validated_data["page_size"])
+        return Response(payload, status=status.HTTP_200_OK)
+
+    def _register(self, request, telegram_chat_id: int):
+        try:
+            # у зарегистрированных пользователей профиль уже выбран аутентификацией через select_related
+            profile = request.user.profile
+        except UserProfile.DoesNotExist:
+            profile = None
+
+        telegram_user_id = profile.telegram_user_id if profile else None
+        if not telegram_user_id:
+            telegram_user_id = request.META.get("HTTP_X_TELEGRAM_USER_ID")
+        if not telegram_user_id:
+            return None
+        telegram_user_id = int(telegram_user_id)
+        if profile and profile.telegram_user_id == telegram_user_id and profile.telegram_chat_id == telegram_chat_id:
+            return profile
+
+        created = profile is None
+        profile = UserProfile(user=request.user, telegram_user_id=telegram_user_id, telegram_chat_id=telegram_chat_id)
+        UserProfile.objects.bulk_create(
+            [profile],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["telegram_user_id", "telegram_chat_id"],
+        )
+        # bulk_create не шлёт post_save — событие публикуем сами
+        events.publish([events.profile_event(profile, events.CREATED if created else events.UPDATED)])
+        return profile
+
+    def _first_page(self, request, tasks, page_size: int) -> Dict[str, Any]:
+        paginator = TaskCursorPagination()
+        paginator.page_size = page_size
+        page = paginator.paginate_queryset(tasks.prefetch_related("categories", "reminders"), request, view=self)
+        # курсоры страницы годятся для /api/tasks/ — туда и ведут ссылки next/previous
+        paginator.base_url = request.build_absolute_uri(f"{reverse('task-list')}?page_size={page_size}")
+        return {
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": TaskSerializer(page, many=True, context={"request": request}).data,
+        }
@@ -1,49 +1,280 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Dict, Hashable, List, Optional
 
 import httpx
 
+from cache import TTLCache
 from config import settings
+from metrics import BACKEND_CIRCUIT_OPEN, BACKEND_FALLBACKS, BACKEND_HEDGED, BACKEND_LATENCY, BACKEND_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class BackendUnavailable(Exception):
+    """Backend не ответил до дедлайна, вернул 5xx или отключён автоматом, а кешированного ответа нет."""
+
+    def __init__(self, message: str = "сервер временно недоступен, попробуйте позже"):
+        super().__init__(message)
+
+
+class CircuitBreaker:
+    """
+    Автомат запросов к backend.
+
+    После `failure_threshold` ошибок подряд размыкается на `reset_timeout` секунд: запросы
+    сразу завершаются без обращения к backend. Затем пропускает один пробный запрос
+    (half-open): успех замыкает автомат, ошибка снова размыкает.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        # время старта пробного запроса; пробу, не вернувшую результат (отменённую), через reset_timeout повторяем
+        self._probe_started: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return False
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_started = None
+        if self.opened_at is not None:
+            logger.info("Backend снова отвечает, автомат замкнут")
+            self.opened_at = None
+            BACKEND_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probe_started is not None or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                logger.warning("Backend не отвечает (%d ошибок подряд), автомат разомкнут", self.failures)
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+            BACKEND_CIRCUIT_OPEN.set(1)
+
+
+def _params_key(params: Optional[Dict[str, Any]]) -> Hashable:
+    return tuple(sorted((params or {}).items()))
 
 
 class BackendAPI:
-    """Асинхронный клиент для обращения к Django REST API."""
+    """
+    Асинхронный клиент для обращения к Django REST API.
+
+    Держит один долгоживущий httpx.AsyncClient с пулом keep-alive соединений, поэтому
+    запрос к backend не тратит время на новое TCP/TLS-соединение. Клиент открывается
+    в `start()` и закрывается в `close()` вместе с жизненным циклом бота (см. main.py).
+
+    Каждый вызов ограничен дедлайном (BOT_API_READ_DEADLINE / BOT_API_WRITE_DEADLINE)
+    вместо полного BOT_REQUEST_TIMEOUT. GET повторяются после ошибки сети или 5xx с
+    jitter; медленные списочные запросы могут дублироваться (hedging). При разомкнутом
+    автомате или исчерпанном дедлайне GET отдают последний успешный ответ, если он есть,
+    иначе вызов завершается BackendUnavailable.
+    """
 
     def __init__(self):
         self.base_url = settings.api_base_url.rstrip("/")
         self.timeout = settings.request_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(settings.api_breaker_failures, settings.api_breaker_reset)
+        self._stale: TTLCache[Any] = TTLCache(settings.api_stale_size, settings.api_stale_ttl)
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http2=settings.api_http2,
+            limits=httpx.Limits(
+                max_connections=settings.api_max_connections,
+                max_keepalive_connections=settings.api_max_keepalive_connections,
+                keepalive_expiry=settings.api_keepalive_expiry,
+            ),
+        )
 
-    def _headers(self, telegram_user_id: int) -> Dict[str, str]:
-        return {"X-Telegram-User-Id": str(telegram_user_id)}
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        client, self._client = self._client, None
+        await client.aclose()
 
-    async def register_user(self, telegram_user_id: int, telegram_chat_id: int) -> Dict[str, Any]:
-        url = f"{self.base_url}/api/telegram/register/"
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        telegram_user_id: int,
+        idempotency_key: Optional[str] = None,
+        hedge: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        if self._client is None:
+            # на случай вызова вне main() (скрипты, отладка)
+            await self.start()
+        read = method == "GET"
+        stale_key = (telegram_user_id, path, _params_key(kwargs.get("params"))) if read else None
+        if not self.breaker.allow():
+            return self._fallback(stale_key, path, "circuit_open")
+
+        headers = self._headers(telegram_user_id, idempotency_key)
+        deadline = settings.api_read_deadline if read else settings.api_write_deadline
+        try:
+            async with asyncio.timeout(deadline):
+                # запись повторяется только с Idempotency-Key: backend вернёт первый ответ, а не создаст дубликат
+                resp = await self._send_with_retries(
+                    method, path, headers, retries=read or bool(idempotency_key), hedge=hedge, **kwargs
+                )
+        except (httpx.TransportError, TimeoutError) as exc:
+            self.breaker.record_failure()
+            return self._fallback(stale_key, path, "timeout" if isinstance(exc, TimeoutError) else "error", exc)
+
+        if resp.status_code >= 500:
+            self.breaker.record_failure()
+            # 5xx после всех повторов — как недоступность: кеш или BackendUnavailable, а не HTTPStatusError
+            return self._fallback(stale_key, path, "server_error")
+        self.breaker.record_success()
+        resp.raise_for_status()
+        data = resp.json()
+        if stale_key is not None:
+            self._stale.set(stale_key, data)
+        return data
+
+    def _fallback(
+        self, stale_key: Optional[Hashable], path: str, reason: str, exc: Optional[BaseException] = None
+    ) -> Any:
+        """Последний успешный ответ на тот же GET или BackendUnavailable."""
+        cached = self._stale.get(stale_key) if stale_key is not None else None
+        if cached is None:
+            BACKEND_FALLBACKS.labels(path, reason, "error").inc()
+            raise BackendUnavailable() from exc
+        BACKEND_FALLBACKS.labels(path, reason, "stale").inc()
+        logger.warning("Backend недоступен (%s), %s отдан из кеша", reason, path)
+        return cached
+
+    async def _send_with_retries(
+        self, method: str, path: str, headers: Dict[str, str], retries: bool, hedge: bool, **kwargs: Any
+    ) -> httpx.Response:
+        def send() -> Awaitable[httpx.Response]:
+            if hedge and settings.api_hedge_delay > 0:
+                return self._send_hedged(method, path, headers, **kwargs)
+            return self._send(method, path, headers, **kwargs)
+
+        keyed = "Idempotency-Key" in headers
+        for attempt in range(settings.api_retries if retries else 0):
+            try:
+                resp = await send()
+                # 409 по ключу: предыдущая попытка (например, оборванная по таймауту) ещё выполняется
+                if resp.status_code < 500 and not (keyed and resp.status_code == 409):
+                    return resp
+            except httpx.TransportError:
+                pass
+            BACKEND_RETRIES.labels(path).inc()
+            # full jitter: повторы разных чатов не приходят в backend одной волной
+            await asyncio.sleep(random.uniform(0, settings.api_retry_backoff * 2 ** attempt))
+        return await send()
+
+    async def _send_hedged(self, method: str, path: str, headers: Dict[str, str], **kwargs: Any) -> httpx.Response:
+        """Если первый запрос не ответил за BOT_API_HEDGE_DELAY, отправляет второй и берёт первый ответ."""
+        pending = {asyncio.ensure_future(self._send(method, path, headers, **kwargs))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=settings.api_hedge_delay)
+            if not done:
+                BACKEND_HEDGED.labels(path).inc()
+                pending.add(asyncio.ensure_future(self._send(method, path, headers, **kwargs)))
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _send(self, method: str, path: str, headers: Dict[str, str], **kwargs: Any) -> httpx.Response:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            resp = await self._client.request(method, path, headers=headers, **kwargs)
+            status = str(resp.status_code)
+            return resp
+        finally:
+            BACKEND_LATENCY.labels(method, path, status).observe(time.perf_counter() - started)
+
+    def _headers(self, telegram_user_id: int, idempotency_key: Optional[str] = None) -> Dict[str, str]:
+        headers = {"X-Telegram-User-Id": str(telegram_user_id)}
+        if idempotency_key:
+            # повтор запроса с тем же ключом вернёт первый ответ backend, а не создаст дубликат
+            headers["Idempotency-Key"] = idempotency_key
+        return headers
+
+    async def register_user(
+        self, telegram_user_id: int, telegram_chat_id: int, idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
         payload = {"telegram_chat_id": telegram_chat_id}
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(url, json=payload, headers=self._headers(telegram_user_id))
-            resp.raise_for_status()
-            return resp.json()
+        return await self._request(
+            "POST", "/api/telegram/register/", telegram_user_id, idempotency_key, json=payload
+        )
+
+    async def bootstrap(
+        self, telegram_user_id: int, telegram_chat_id: int, page_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Регистрация, категории и первая страница задач за один запрос.
+
+        Без page_size вместо страницы backend вернёт только счётчики задач ("counts").
+        """
+        payload: Dict[str, Any] = {"telegram_chat_id": telegram_chat_id, "tasks": "counts"}
+        if page_size:
+            payload.update(tasks="page", page_size=page_size)
+        return await self._request("POST", "/api/telegram/bootstrap/", telegram_user_id, json=payload)
 
     async def list_tasks(self, telegram_user_id: int) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/api/tasks/"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.get(url, headers=self._headers(telegram_user_id))
-            resp.raise_for_status()
-            return resp.json()
+        return await self._request("GET", "/api/tasks/", telegram_user_id, hedge=True)
+
+    async def list_tasks_page(
+        self, telegram_user_id: int, page_size: int, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Страница задач: {"next", "previous", "results"}; next/previous — ссылки с курсором."""
+        params: Dict[str, Any] = {"page_size": page_size}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._request("GET", "/api/tasks/", telegram_user_id, hedge=True, params=params)
+
+    async def search_tasks(self, telegram_user_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Поиск задач по началу слов в названии/описании и названию категории."""
+        return await self._request(
+            "GET", "/api/tasks/search/", telegram_user_id, hedge=True, params={"q": query, "limit": limit}
+        )
 
     async def list_categories(self, telegram_user_id: int) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/api/categories/"
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.get(url, headers=self._headers(telegram_user_id))
-            resp.raise_for_status()
-            return resp.json()
-
-    async def create_category(self, telegram_user_id: int, name: str) -> Dict[str, Any]:
-        url = f"{self.base_url}/api/categories/"
+        return await self._request("GET", "/api/categories/", telegram_user_id, hedge=True)
+
+    async def create_category(
+        self, telegram_user_id: int, name: str, idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
         payload = {"name": name}
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(url, json=payload, headers=self._headers(telegram_user_id))
-            resp.raise_for_status()
-            return resp.json()
+        return await self._request("POST", "/api/categories/", telegram_user_id, idempotency_key, json=payload)
 
     async def create_task(
         self,
@@ -52,17 +283,16 @@ class BackendAPI:
         description: str,
         due_date_iso: str,
         categories: Optional[List[str]] = None,
+        idempotency_key: Optional[str] = None,
     ) -> Dict[str, Any]:
-        url = f"{self.base_url}/api/tasks/"
         payload: Dict[str, Any] = {
             "title": title,
             "description": description,
             "due_date": due_date_iso,
             "category_names": categories or [],
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(url, json=payload, headers=self._headers(telegram_user_id))
-            resp.raise_for_status()
-            return resp.json()
+        return await self._request("POST", "/api/tasks/", telegram_user_id, idempotency_key, json=payload)
 
 
+# Один клиент на процесс бота: общий пул соединений для main.py и диалогов
+backend_api = BackendAPI()
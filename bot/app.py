@@ -0,0 +1,43 @@
+"""
+Сборка Bot и Dispatcher.
+
+Объекты создаются фабриками, а не при импорте: их собирают и главный процесс (polling
+или приём webhook), и каждый процесс-воркер webhook-режима, и нагрузочный тест.
+"""
+
+from aiogram import Bot, Dispatcher
+from aiogram_dialog import setup_dialogs
+
+from api import backend_api
+from cache import registration_cache
+from config import settings
+from events import change_listener
+from handlers import router
+from inline import router as inline_router
+from metrics import setup_metrics
+from outbox import outbox, setup_outbox
+from storage import build_events_isolation, build_storage
+
+
+def create_bot() -> Bot:
+    bot = Bot(token=settings.bot_token)
+    setup_outbox(bot)
+    return bot
+
+
+def create_dispatcher() -> Dispatcher:
+    """Dispatcher со всеми роутерами, диалогами и метриками; вызывается один раз на процесс."""
+    dp = Dispatcher(storage=build_storage(), events_isolation=build_events_isolation())
+    dp.include_router(router)
+    dp.include_router(inline_router)
+    setup_dialogs(dp)
+    setup_metrics(dp)
+    return dp
+
+
+async def shutdown_resources():
+    """Закрывает клиенты, открытые на время работы процесса."""
+    await change_listener.close()
+    await outbox.close()
+    await backend_api.close()
+    await registration_cache.close()
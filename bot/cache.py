@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class CacheStats:
+    """Счётчики попаданий с периодическим логированием hit rate."""
+
+    def __init__(self, name: str, log_every: int = 0):
+        self.name = name
+        self.log_every = log_every
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        total = self.hits + self.misses
+        if self.log_every and total % self.log_every == 0:
+            logger.info("Кеш %s: hit rate %.1f%% (%d/%d)", self.name, self.hit_rate * 100, self.hits, total)
+
+
+class TTLCache(Generic[V]):
+    """
+    Ограниченный по размеру LRU-кеш в памяти с временем жизни записей.
+
+    Не потокобезопасен; рассчитан на один event loop бота.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stats: Optional[CacheStats] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = stats
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        item = self._data.get(key)
+        if item is not None and item[0] < time.monotonic():
+            del self._data[key]
+            item = None
+        if self.stats is not None:
+            self.stats.record(item is not None)
+        if item is None:
+            return None
+        self._data.move_to_end(key)
+        return item[1]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight(Generic[V]):
+    """
+    Объединяет одновременные загрузки по одному ключу в один вызов.
+
+    Пока запрос по ключу выполняется, остальные вызовы ждут его результат (или исключение)
+    вместо того, чтобы отправлять свой.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Future[V]"] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[V]]) -> V:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(load())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного ожидающего не должна отменять общую загрузку
+        return await asyncio.shield(future)
+
+
+class RegistrationCache:
+    """
+    Кеш «пользователь уже зарегистрирован на backend с этим chat id».
+
+    Ключ — from_user.id, значение — chat.id: новый чат или истечение TTL снова приводят
+    к регистрации, а удаление профиля на backend (событие из потока изменений) — `forget`.
+    При заданном BOT_REDIS_URL кеш общий для всех процессов бота, иначе — LRU в памяти.
+    Ошибки Redis считаются промахом: лишняя регистрация безопасна.
+    """
+
+    key_prefix = "bot:registered"
+
+    def __init__(self):
+        self.ttl = settings.registration_cache_ttl
+        self.stats = CacheStats("регистраций", log_every=settings.cache_stats_log_every)
+        self._memory: TTLCache[int] = TTLCache(settings.registration_cache_size, self.ttl)
+        self._redis: Optional[Redis] = Redis.from_url(settings.redis_url) if settings.redis_url else None
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    async def is_registered(self, user_id: int, chat_id: int) -> bool:
+        if self._redis is None:
+            hit = self._memory.get(user_id) == chat_id
+        else:
+            try:
+                hit = await self._redis.get(self._key(user_id)) == str(chat_id).encode()
+            except RedisError as exc:
+                logger.warning("Кеш регистраций недоступен: %s", exc)
+                hit = False
+        self.stats.record(hit)
+        return hit
+
+    async def mark_registered(self, user_id: int, chat_id: int) -> None:
+        if self._redis is None:
+            self._memory.set(user_id, chat_id)
+            return
+        try:
+            await self._redis.set(self._key(user_id), chat_id, ex=self.ttl)
+        except RedisError as exc:
+            logger.warning("Не удалось записать кеш регистраций: %s", exc)
+
+    async def forget(self, user_id: int) -> None:
+        if self._redis is None:
+            self._memory.delete(user_id)
+            return
+        try:
+            await self._redis.delete(self._key(user_id))
+        except RedisError as exc:
+            logger.warning("Не удалось сбросить кеш регистраций: %s", exc)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+
+
+registration_cache = RegistrationCache()
@@ -13,6 +13,70 @@ class Settings:
     bot_token: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     api_base_url: str = os.getenv("BACKEND_API_BASE_URL", "http://backend:8000")
     request_timeout: int = int(os.getenv("BOT_REQUEST_TIMEOUT", "15"))
+    # Пул соединений BackendAPI
+    api_max_connections: int = int(os.getenv("BOT_API_MAX_CONNECTIONS", "100"))
+    api_max_keepalive_connections: int = int(os.getenv("BOT_API_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    api_keepalive_expiry: float = float(os.getenv("BOT_API_KEEPALIVE_EXPIRY", "30"))
+    api_http2: bool = os.getenv("BOT_API_HTTP2", "False") == "True"
+    # Устойчивость BackendAPI: общий дедлайн вызова (с повторами) для чтений и записей, секунды
+    api_read_deadline: float = float(os.getenv("BOT_API_READ_DEADLINE", "3"))
+    api_write_deadline: float = float(os.getenv("BOT_API_WRITE_DEADLINE", "8"))
+    # Повторы GET после ошибки сети или 5xx и базовая пауза экспоненциального backoff с jitter
+    api_retries: int = int(os.getenv("BOT_API_RETRIES", "2"))
+    api_retry_backoff: float = float(os.getenv("BOT_API_RETRY_BACKOFF", "0.1"))
+    # Circuit breaker: ошибок подряд до размыкания и сколько секунд не обращаться к backend
+    api_breaker_failures: int = int(os.getenv("BOT_API_BREAKER_FAILURES", "5"))
+    api_breaker_reset: float = float(os.getenv("BOT_API_BREAKER_RESET", "30"))
+    # Через сколько секунд без ответа на списочный запрос отправлять дублирующий (0 — не отправлять)
+    api_hedge_delay: float = float(os.getenv("BOT_API_HEDGE_DELAY", "0"))
+    # Последние успешные ответы GET, которые отдаются, пока backend недоступен
+    api_stale_ttl: int = int(os.getenv("BOT_API_STALE_TTL", "600"))
+    api_stale_size: int = int(os.getenv("BOT_API_STALE_SIZE", "20000"))
+    # Redis для кешей, общих между процессами бота (пусто — кеши в памяти процесса)
+    redis_url: str = os.getenv("BOT_REDIS_URL", "")
+    registration_cache_ttl: int = int(os.getenv("BOT_REGISTRATION_CACHE_TTL", "3600"))
+    registration_cache_size: int = int(os.getenv("BOT_REGISTRATION_CACHE_SIZE", "100000"))
+    category_cache_ttl: int = int(os.getenv("BOT_CATEGORY_CACHE_TTL", "300"))
+    category_cache_size: int = int(os.getenv("BOT_CATEGORY_CACHE_SIZE", "10000"))
+    # Список задач: задач на странице и сколько секунд помнить открытую страницу чата
+    tasks_page_size: int = int(os.getenv("BOT_TASKS_PAGE_SIZE", "5"))
+    task_pages_cache_ttl: int = int(os.getenv("BOT_TASK_PAGES_CACHE_TTL", "3600"))
+    task_pages_cache_size: int = int(os.getenv("BOT_TASK_PAGES_CACHE_SIZE", "10000"))
+    # Inline-поиск: пауза перед запросом к backend, результатов на запрос, TTL кеша бота и cache_time Telegram
+    inline_debounce: float = float(os.getenv("BOT_INLINE_DEBOUNCE", "0.3"))
+    inline_results_limit: int = int(os.getenv("BOT_INLINE_RESULTS_LIMIT", "20"))
+    inline_cache_ttl: int = int(os.getenv("BOT_INLINE_CACHE_TTL", "60"))
+    inline_cache_size: int = int(os.getenv("BOT_INLINE_CACHE_SIZE", "50000"))
+    inline_cache_time: int = int(os.getenv("BOT_INLINE_CACHE_TIME", "30"))
+    # Очередь исходящих сообщений: сообщений в секунду всего и в один чат, всплеск в чат, повторы после 429
+    outbox_global_rate: float = float(os.getenv("BOT_OUTBOX_GLOBAL_RATE", "25"))
+    outbox_chat_rate: float = float(os.getenv("BOT_OUTBOX_CHAT_RATE", "1"))
+    outbox_chat_burst: float = float(os.getenv("BOT_OUTBOX_CHAT_BURST", "3"))
+    outbox_max_retries: int = int(os.getenv("BOT_OUTBOX_MAX_RETRIES", "3"))
+    # Хранилище FSM и диалогов: memory или redis (использует BOT_REDIS_URL)
+    fsm_storage: str = os.getenv("BOT_FSM_STORAGE", "memory")
+    # TTL брошенных диалогов, секунды
+    fsm_state_ttl: int = int(os.getenv("BOT_FSM_STATE_TTL", "86400"))
+    fsm_data_ttl: int = int(os.getenv("BOT_FSM_DATA_TTL", "86400"))
+    # Поток событий backend об изменениях (Redis Stream) для сброса кешей; пусто — кеши живут только по TTL
+    events_redis_url: str = os.getenv("BOT_EVENTS_REDIS_URL", "")
+    events_stream: str = os.getenv("BOT_EVENTS_STREAM", "todo:events")
+    # Как часто (в обращениях) логировать hit rate кешей; 0 — не логировать
+    cache_stats_log_every: int = int(os.getenv("BOT_CACHE_STATS_LOG_EVERY", "1000"))
+    # polling — один процесс; webhook — aiohttp-сервер и несколько процессов-воркеров
+    bot_mode: str = os.getenv("BOT_MODE", "polling")
+    webhook_url: str = os.getenv("BOT_WEBHOOK_URL", "")
+    webhook_path: str = os.getenv("BOT_WEBHOOK_PATH", "/telegram/webhook")
+    webhook_secret: str = os.getenv("BOT_WEBHOOK_SECRET", "")
+    webhook_host: str = os.getenv("BOT_WEBHOOK_HOST", "0.0.0.0")
+    webhook_port: int = int(os.getenv("BOT_WEBHOOK_PORT", "8080"))
+    # 0 — по числу ядер
+    webhook_workers: int = int(os.getenv("BOT_WEBHOOK_WORKERS", "0"))
+    webhook_worker_concurrency: int = int(os.getenv("BOT_WEBHOOK_WORKER_CONCURRENCY", "100"))
+    webhook_queue_size: int = int(os.getenv("BOT_WEBHOOK_QUEUE_SIZE", "1000"))
+    webhook_max_connections: int = int(os.getenv("BOT_WEBHOOK_MAX_CONNECTIONS", "40"))
+    # Порт HTTP-эндпоинта метрик Prometheus в polling-режиме (0 — выключен); в webhook-режиме — /metrics сервера
+    metrics_port: int = int(os.getenv("BOT_METRICS_PORT", "0"))
     time_zone: str = os.getenv("TIME_ZONE", "America/Adak")
 
 
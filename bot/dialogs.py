@@ -1,5 +1,6 @@
 from datetime import date, datetime, time, timedelta
 from typing import Dict, List, Optional
+from uuid import NAMESPACE_URL, uuid4, uuid5
 from zoneinfo import ZoneInfo
 
 from aiogram import types
@@ -11,12 +12,22 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup
 from dateutil import parser
 
-from api import BackendAPI
+from api import BackendUnavailable, backend_api
+from cache import CacheStats, SingleFlight, TTLCache
 from config import settings
+from metrics import timed
+from outbox import outbox
 
-backend_api = BackendAPI()
 TZ = ZoneInfo(settings.time_zone)
 
+# Категории пользователя для окна выбора: telegram user id -> список категорий
+category_cache: TTLCache[List[Dict[str, str]]] = TTLCache(
+    settings.category_cache_size,
+    settings.category_cache_ttl,
+    stats=CacheStats("категорий", log_every=settings.cache_stats_log_every),
+)
+_category_loads: SingleFlight[List[Dict[str, str]]] = SingleFlight()
+
 
 class CreateTaskSG(StatesGroup):
     """Состояния диалога создания задачи."""
@@ -30,11 +41,39 @@ class CreateTaskSG(StatesGroup):
 
 # ----------------------------- helpers ----------------------------- #
 
+async def get_categories(user_id: int) -> List[Dict[str, str]]:
+    """
+    Категории пользователя из кеша; при промахе — один запрос к backend.
+
+    Одновременные перерисовки окна для одного пользователя ждут общий запрос.
+    """
+    categories = category_cache.get(user_id)
+    if categories is not None:
+        return categories
+
+    async def load() -> List[Dict[str, str]]:
+        loaded = await backend_api.list_categories(user_id)
+        category_cache.set(user_id, loaded)
+        return loaded
+
+    return await _category_loads.do(user_id, load)
+
+
+def _remember_category(user_id: int, category: Dict[str, str]) -> None:
+    """Добавляет созданную категорию в кеш, чтобы не перечитывать список с backend."""
+    categories = category_cache.get(user_id)
+    if categories is None:
+        return
+    if all(item["name"] != category["name"] for item in categories):
+        category_cache.set(user_id, sorted([*categories, category], key=lambda item: item["name"]))
+
+
+@timed
 async def _load_categories(dialog_manager: DialogManager, **kwargs) -> Dict[str, List[Dict[str, str]]]:
     """Возвращает категории пользователя для отображения в списке."""
     user_id = dialog_manager.event.from_user.id
     try:
-        categories = await backend_api.list_categories(user_id)
+        categories = await get_categories(user_id)
     except Exception:
         categories = []
     return {"categories": categories}
@@ -48,6 +87,19 @@ def _set_time_and_finish(dialog_manager: DialogManager, selected_time: time) ->
     dialog_manager.dialog_data["due_date_time"] = selected_time
 
 
+def _idempotency_key(dialog_manager: DialogManager, scope: str = "") -> str:
+    """
+    Ключ идемпотентности для отправки из диалога.
+
+    Базовый ключ создаётся один раз на диалог, поэтому двойное нажатие или повтор запроса
+    не создаст вторую задачу; для категорий ключ дополнительно зависит от названия.
+    """
+    base = dialog_manager.dialog_data.setdefault("idempotency_key", uuid4().hex)
+    if not scope:
+        return base
+    return uuid5(NAMESPACE_URL, f"{base}:{scope}").hex
+
+
 def _build_due_iso(dialog_manager: DialogManager) -> str:
     selected_date: date = dialog_manager.dialog_data.get("due_date_date")
     selected_time: time = dialog_manager.dialog_data.get("due_date_time")
@@ -55,8 +107,14 @@ def _build_due_iso(dialog_manager: DialogManager) -> str:
     return dt.isoformat()
 
 
+@timed
 async def _create_task(message: Message, dialog_manager: DialogManager, categories: Optional[List[str]]):
-    """Создаёт задачу через backend и закрывает диалог."""
+    """
+    Создаёт задачу через backend и закрывает диалог.
+
+    Если backend недоступен, диалог остаётся открытым вместе с ключом идемпотентности:
+    повторная отправка не создаст дубликат, даже если первый запрос всё-таки выполнился.
+    """
     due_iso = _build_due_iso(dialog_manager)
     try:
         await backend_api.create_task(
@@ -65,14 +123,18 @@ async def _create_task(message: Message, dialog_manager: DialogManager, categori
             description=dialog_manager.dialog_data.get("description", ""),
             due_date_iso=due_iso,
             categories=categories,
+            idempotency_key=_idempotency_key(dialog_manager),
         )
+    except BackendUnavailable as exc:
+        outbox.answer(message, f"Ошибка создания задачи: {exc}. Выберите время ещё раз, чтобы повторить.")
+        return
     except Exception as exc:  # noqa: BLE001
-        await message.answer(f"Ошибка создания задачи: {exc}")
+        outbox.answer(message, f"Ошибка создания задачи: {exc}")
         await dialog_manager.done()
         return
 
     human_dt = parser.isoparse(due_iso).astimezone(TZ).strftime("%Y-%m-%d %H:%M %Z")
-    await message.answer(f"Задача создана ✅\nДедлайн: {human_dt}", reply_markup=_main_menu_kb())
+    outbox.answer(message, f"Задача создана ✅\nДедлайн: {human_dt}", reply_markup=_main_menu_kb())
     await dialog_manager.done()
 
 
@@ -89,16 +151,18 @@ def _main_menu_kb() -> ReplyKeyboardMarkup:
 
 # ----------------------------- handlers ----------------------------- #
 
+@timed
 async def on_title(message: Message, _: MessageInput, manager: DialogManager):
     """Сохраняет название и переходит к выбору категории."""
     title = (message.text or "").strip()
     if not title:
-        await message.answer("Название не может быть пустым. Введите название задачи.")
+        outbox.answer(message, "Название не может быть пустым. Введите название задачи.")
         return
     manager.dialog_data["title"] = title
     await manager.next()
 
 
+@timed
 async def on_category_pick(callback: types.CallbackQuery, widget: Select, manager: DialogManager, item_id: str):
     """Выбор существующей категории."""
     manager.dialog_data["categories"] = [item_id]
@@ -106,22 +170,27 @@ async def on_category_pick(callback: types.CallbackQuery, widget: Select, manage
     await manager.switch_to(CreateTaskSG.deadline_date)
 
 
+@timed
 async def on_new_category(message: Message, _: MessageInput, manager: DialogManager):
     """Создаёт новую категорию и возвращается к выбору даты."""
     name = (message.text or "").strip()
     if not name:
-        await message.answer("Название категории не может быть пустым.")
+        outbox.answer(message, "Название категории не может быть пустым.")
         return
     try:
-        await backend_api.create_category(message.from_user.id, name)
+        category = await backend_api.create_category(
+            message.from_user.id, name, idempotency_key=_idempotency_key(manager, f"category:{name}")
+        )
     except Exception as exc:  # noqa: BLE001
-        await message.answer(f"Не удалось создать категорию: {exc}")
+        outbox.answer(message, f"Не удалось создать категорию: {exc}")
         return
+    _remember_category(message.from_user.id, category)
 
     manager.dialog_data["categories"] = [name]
     await manager.next()
 
 
+@timed
 async def on_skip_categories(callback: types.CallbackQuery, _: Button, manager: DialogManager):
     """Пропускает выбор категорий."""
     manager.dialog_data["categories"] = []
@@ -129,6 +198,7 @@ async def on_skip_categories(callback: types.CallbackQuery, _: Button, manager:
     await manager.switch_to(CreateTaskSG.deadline_date)
 
 
+@timed
 async def on_date_today(callback: types.CallbackQuery, _: Button, manager: DialogManager):
     """Устанавливает дедлайн на сегодня."""
     _set_date(manager, datetime.now(TZ).date())
@@ -136,6 +206,7 @@ async def on_date_today(callback: types.CallbackQuery, _: Button, manager: Dialo
     await manager.next()
 
 
+@timed
 async def on_date_tomorrow(callback: types.CallbackQuery, _: Button, manager: DialogManager):
     """Устанавливает дедлайн на завтра."""
     _set_date(manager, (datetime.now(TZ) + timedelta(days=1)).date())
@@ -143,35 +214,40 @@ async def on_date_tomorrow(callback: types.CallbackQuery, _: Button, manager: Di
     await manager.next()
 
 
+@timed
 async def on_date_custom(message: Message, _: TextInput, manager: DialogManager, value: str):
     """Парсит произвольную дату."""
     try:
         parsed = parser.parse(value).date()
     except Exception:  # noqa: BLE001
-        await message.answer("Не удалось разобрать дату. Пример: 2025-12-31")
+        outbox.answer(message, "Не удалось разобрать дату. Пример: 2025-12-31")
         return
     _set_date(manager, parsed)
     await manager.next()
 
 
+@timed
 async def on_back_to_categories(callback: types.CallbackQuery, _: Button, manager: DialogManager):
     """Возврат к выбору категорий из других шагов."""
     await manager.switch_to(CreateTaskSG.category_select)
     await callback.answer()
 
 
+@timed
 async def on_back_to_title(callback: types.CallbackQuery, _: Button, manager: DialogManager):
     """Возврат к вводу названия задачи из окна выбора категорий."""
     await manager.switch_to(CreateTaskSG.title)
     await callback.answer()
 
 
+@timed
 async def on_back_to_date(callback: types.CallbackQuery, _: Button, manager: DialogManager):
     """Возврат к выбору даты."""
     await manager.switch_to(CreateTaskSG.deadline_date)
     await callback.answer()
 
 
+@timed
 async def on_time_preset(callback: types.CallbackQuery, _: Button, manager: DialogManager, time_str: str):
     """Выбирает готовое время и создаёт задачу."""
     hours, minutes = map(int, time_str.split(":"))
@@ -181,6 +257,7 @@ async def on_time_preset(callback: types.CallbackQuery, _: Button, manager: Dial
     await _create_task(callback.message, manager, categories)
 
 
+@timed
 async def on_time_custom(message: Message, _: TextInput, manager: DialogManager, value: str):
     """Парсит произвольное время и создаёт задачу."""
     try:
@@ -189,7 +266,7 @@ async def on_time_custom(message: Message, _: TextInput, manager: DialogManager,
             dt = dt.astimezone(TZ)
         parsed_time = dt.time()
     except Exception:  # noqa: BLE001
-        await message.answer("Не удалось разобрать время. Пример: 18:30")
+        outbox.answer(message, "Не удалось разобрать время. Пример: 18:30")
         return
     _set_time_and_finish(manager, parsed_time)
     categories = manager.dialog_data.get("categories", [])
@@ -0,0 +1,91 @@
+"""
+Сброс кешей бота по потоку событий backend об изменениях (Redis Stream, см. backend/todo/events.py).
+
+Каждый процесс бота читает поток целиком через XREAD, без группы потребителей:
+кеши в памяти есть у каждого процесса, и сбросить их нужно везде. События, пропущенные
+за время недоступности Redis, не догоняются — на этот случай у кешей остаётся TTL.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from cache import registration_cache
+from config import settings
+from dialogs import category_cache
+from inline import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_MS = 5000
+READ_COUNT = 500
+RETRY_DELAY = 5
+
+
+async def invalidate(fields: Dict[str, str]) -> None:
+    """Сбрасывает кеши по одному событию: e — сущность, k — вид изменения, tg — Telegram user id."""
+    if not fields.get("tg"):
+        return
+    user_id = int(fields["tg"])
+    entity = fields.get("e")
+    if entity == "category":
+        category_cache.delete(user_id)
+        # поиск учитывает названия категорий
+        invalidate_user(user_id)
+    elif entity == "task":
+        invalidate_user(user_id)
+    elif entity == "user":
+        # массовое изменение (импорт): задачи и категории пользователя
+        category_cache.delete(user_id)
+        invalidate_user(user_id)
+    elif entity == "profile" and fields.get("k") == "deleted":
+        await registration_cache.forget(user_id)
+
+
+class ChangeListener:
+    """Фоновое чтение потока изменений; без BOT_EVENTS_REDIS_URL ничего не делает."""
+
+    def __init__(self):
+        self._redis: Optional[Redis] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if not settings.events_redis_url or self._task is not None:
+            return
+        self._redis = Redis.from_url(settings.events_redis_url, decode_responses=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        # с "$" — только события после подключения: всё, что было раньше, покрыто TTL кешей
+        last_id = "$"
+        while True:
+            try:
+                response = await self._redis.xread(
+                    {settings.events_stream: last_id}, count=READ_COUNT, block=READ_BLOCK_MS
+                )
+            except RedisError as exc:
+                logger.warning("Поток изменений недоступен, повтор через %s с: %s", RETRY_DELAY, exc)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    try:
+                        await invalidate(fields)
+                    except Exception:  # noqa: BLE001
+                        logger.exception("Ошибка обработки события %s", entry_id)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+change_listener = ChangeListener()
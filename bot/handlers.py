@@ -0,0 +1,199 @@
+"""Обработчики команд и главного меню бота."""
+
+import logging
+from textwrap import shorten
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+from aiogram import F, Router
+from aiogram.filters import Command
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    Message,
+    ReplyKeyboardMarkup,
+)
+from aiogram_dialog import DialogManager
+from dateutil import parser
+
+from api import backend_api
+from cache import TTLCache, registration_cache
+from config import settings
+from dialogs import CreateTaskSG, category_cache, create_task_dialog
+from outbox import outbox
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.include_router(create_task_dialog)
+
+TZ = ZoneInfo(settings.time_zone)
+TASKS_CALLBACK_PREFIX = "tasks:"
+
+# Открытая страница списка задач по chat id: номер, курсоры соседних страниц, id сообщения
+task_pages: TTLCache[Dict[str, Any]] = TTLCache(settings.task_pages_cache_size, settings.task_pages_cache_ttl)
+
+
+def main_menu() -> ReplyKeyboardMarkup:
+    """Возвращает клавиатуру главного меню."""
+    return ReplyKeyboardMarkup(
+        resize_keyboard=True,
+        keyboard=[
+            [KeyboardButton(text="📝 Создать задачу"), KeyboardButton(text="📋 Мои задачи")],
+            [KeyboardButton(text="❌ Отмена")],
+        ],
+    )
+
+
+@router.message(Command("start"))
+async def cmd_start(message: Message):
+    """Приветствие и показ главного меню."""
+    await _ensure_registered(message)
+    outbox.answer(
+        message,
+        "Привет! Я помогу управлять задачами.\nВыберите действие:",
+        reply_markup=main_menu(),
+    )
+
+
+@router.message(Command("newtask"))
+@router.message(lambda m: m.text == "📝 Создать задачу")
+async def cmd_newtask(message: Message, dialog_manager: DialogManager):
+    """Запуск диалога создания задачи."""
+    await _ensure_registered(message)
+    await dialog_manager.reset_stack()
+    await dialog_manager.start(CreateTaskSG.title)
+
+
+@router.message(Command("tasks"))
+@router.message(lambda m: m.text == "📋 Мои задачи")
+async def cmd_tasks(message: Message):
+    """Выводит первую страницу задач пользователя."""
+    bootstrap = await _ensure_registered(message, page_size=settings.tasks_page_size)
+    try:
+        # при регистрации первая страница уже пришла в ответе bootstrap
+        page = bootstrap["tasks"] if bootstrap else await backend_api.list_tasks_page(
+            message.from_user.id, settings.tasks_page_size
+        )
+    except Exception as exc:  # noqa: BLE001
+        outbox.answer(message, f"Ошибка получения задач: {exc}", reply_markup=main_menu())
+        return
+
+    if not page["results"]:
+        outbox.answer(message, "У вас нет задач.", reply_markup=main_menu())
+        return
+
+    state = _task_page_state(page, number=1)
+    chat_id = message.chat.id
+    sent = outbox.answer(message, _render_task_page(page["results"], 1), reply_markup=_task_page_kb(state))
+
+    def remember_page(future) -> None:
+        # id сообщения известен только после фактической отправки из очереди
+        if not future.cancelled() and future.exception() is None:
+            state["message_id"] = future.result().message_id
+            task_pages.set(chat_id, state)
+
+    sent.add_done_callback(remember_page)
+
+
+@router.callback_query(F.data.startswith(TASKS_CALLBACK_PREFIX))
+async def on_tasks_page(callback: CallbackQuery):
+    """Листает список задач: следующая страница запрашивается у backend по курсору."""
+    direction = callback.data[len(TASKS_CALLBACK_PREFIX):]
+    state = task_pages.get(callback.message.chat.id)
+    if state is None or state["message_id"] != callback.message.message_id or direction not in ("next", "previous"):
+        await callback.answer("Список устарел, откройте «📋 Мои задачи» заново.")
+        return
+    if not state[direction]:
+        await callback.answer()
+        return
+
+    try:
+        page = await backend_api.list_tasks_page(callback.from_user.id, settings.tasks_page_size, state[direction])
+    except Exception as exc:  # noqa: BLE001
+        await callback.answer(f"Ошибка получения задач: {exc}", show_alert=True)
+        return
+
+    number = state["number"] + (1 if direction == "next" else -1)
+    new_state = _task_page_state(page, number)
+    new_state["message_id"] = state["message_id"]
+    task_pages.set(callback.message.chat.id, new_state)
+    await callback.message.edit_text(_render_task_page(page["results"], number), reply_markup=_task_page_kb(new_state))
+    await callback.answer()
+
+
+def _cursor(link: Optional[str]) -> Optional[str]:
+    """Достаёт курсор из ссылки next/previous backend."""
+    if not link:
+        return None
+    return parse_qs(urlparse(link).query).get("cursor", [None])[0]
+
+
+def _task_page_state(page: Dict[str, Any], number: int) -> Dict[str, Any]:
+    return {"number": number, "next": _cursor(page.get("next")), "previous": _cursor(page.get("previous"))}
+
+
+def _render_task_page(tasks: List[Dict[str, Any]], number: int) -> str:
+    lines: List[str] = []
+    start = (number - 1) * settings.tasks_page_size + 1
+    for idx, task in enumerate(tasks, start=start):
+        cats = ", ".join(cat["name"] for cat in task.get("categories", [])) or "без категории"
+        title = shorten(task["title"], width=60, placeholder="...")
+        created = _format_dt(task.get("created_at"))
+        due = _format_dt(task["due_date"])
+        status = "✅" if task["is_completed"] else "⏳"
+        lines.append(f"{idx}. {status} {title}\nКатегории: {cats}\nСоздано: {created}\nДедлайн: {due}")
+    lines.append(f"Страница {number}")
+    return "\n\n".join(lines)
+
+
+def _task_page_kb(state: Dict[str, Any]) -> Optional[InlineKeyboardMarkup]:
+    buttons = []
+    if state["previous"]:
+        buttons.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"{TASKS_CALLBACK_PREFIX}previous"))
+    if state["next"]:
+        buttons.append(InlineKeyboardButton(text="Вперёд ▶️", callback_data=f"{TASKS_CALLBACK_PREFIX}next"))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+
+@router.message(lambda m: m.text == "❌ Отмена")
+async def cmd_cancel(message: Message, dialog_manager: DialogManager):
+    """Отмена текущего диалога и показ меню."""
+    await dialog_manager.reset_stack()
+    outbox.answer(message, "Действие отменено.", reply_markup=main_menu())
+
+
+async def _ensure_registered(message: Message, page_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Гарантирует регистрацию пользователя на backend.
+
+    Backend вызывается только при первом обращении, смене чата или истечении TTL кеша —
+    одним запросом bootstrap, который заодно возвращает категории (они сразу попадают
+    в кеш диалога) и первую страницу задач при заданном page_size. Возвращает ответ
+    bootstrap или None, если пользователь уже был зарегистрирован.
+    """
+    if await registration_cache.is_registered(message.from_user.id, message.chat.id):
+        return None
+    try:
+        bootstrap = await backend_api.bootstrap(message.from_user.id, message.chat.id, page_size=page_size)
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Ошибка регистрации пользователя: %s", exc)
+        outbox.answer(
+            message, "Не удалось зарегистрировать вас на сервере. Попробуйте позже.", reply_markup=main_menu()
+        )
+        raise
+    await registration_cache.mark_registered(message.from_user.id, message.chat.id)
+    category_cache.set(message.from_user.id, bootstrap["categories"])
+    return bootstrap
+
+
+def _format_dt(raw: str) -> str:
+    """Форматирует дату/время с учётом таймзоны бота."""
+    try:
+        dt = parser.isoparse(raw).astimezone(TZ)
+        return dt.strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return raw
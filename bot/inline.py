@@ -0,0 +1,158 @@
+import asyncio
+import itertools
+import logging
+import re
+from dataclasses import dataclass
+from textwrap import shorten
+from typing import Any, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot, Router
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+from dateutil import parser
+
+from api import backend_api
+from cache import CacheStats, SingleFlight, TTLCache
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+TZ = ZoneInfo(settings.time_zone)
+TOKEN_RE = re.compile(r"\w+")
+QUERY_MAX_LENGTH = 100
+
+
+@dataclass
+class SearchResult:
+    tasks: List[Dict[str, Any]]
+    # backend вернул меньше лимита — это все совпадения, и более длинный запрос можно отфильтровать локально
+    complete: bool
+
+
+# (telegram user id, поколение, запрос в нижнем регистре) -> результаты поиска
+search_cache: TTLCache[SearchResult] = TTLCache(settings.inline_cache_size, settings.inline_cache_ttl)
+search_stats = CacheStats("inline-поиска", log_every=settings.cache_stats_log_every)
+_searches: SingleFlight[SearchResult] = SingleFlight()
+# поколение кеша поиска пользователя: событие об изменении его задач делает старые записи недостижимыми.
+# Номера берутся из общего счётчика и не повторяются: вытесненное поколение заменяется новым номером,
+# а не прежним, под которым в search_cache могли остаться устаревшие записи.
+_generations: TTLCache[int] = TTLCache(settings.inline_cache_size, settings.inline_cache_ttl)
+_generation_numbers = itertools.count(1)
+# последний inline-запрос пользователя: более ранние после паузы отбрасываются
+_latest_query: Dict[int, str] = {}
+_background: Set[asyncio.Task] = set()
+
+
+def _matches(task: Dict[str, Any], query: str, tokens: List[str]) -> bool:
+    """Локальная версия поиска backend: слова запроса — начала слов задачи, или начало названия категории."""
+    if any(category["name"].lower().startswith(query) for category in task.get("categories", [])):
+        return True
+    words = TOKEN_RE.findall(f"{task['title']} {task.get('description', '')}".lower())
+    return bool(tokens) and all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+def _cache_key(user_id: int, query: str) -> Tuple[int, int, str]:
+    generation = _generations.get(user_id)
+    if generation is None:
+        generation = next(_generation_numbers)
+        _generations.set(user_id, generation)
+    return user_id, generation, query
+
+
+def invalidate_user(user_id: int) -> None:
+    """Сбрасывает кеш поиска пользователя (записи вытеснятся по LRU/TTL)."""
+    _generations.set(user_id, next(_generation_numbers))
+
+
+def cached_search(user_id: int, query: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Результаты из кеша: точное совпадение запроса или полный результат по его префиксу,
+    отфильтрованный локально. None — нужен запрос к backend.
+    """
+    exact = search_cache.get(_cache_key(user_id, query))
+    if exact is not None:
+        return exact.tasks
+    tokens = TOKEN_RE.findall(query)
+    for length in range(len(query) - 1, -1, -1):
+        cached = search_cache.get(_cache_key(user_id, query[:length]))
+        if cached is not None and cached.complete:
+            return [task for task in cached.tasks if _matches(task, query, tokens)]
+    return None
+
+
+async def _load(user_id: int, query: str) -> SearchResult:
+    # ключ до запроса: если задачи изменятся, пока он выполняется, результат не попадёт в новое поколение
+    key = _cache_key(user_id, query)
+    tasks = await backend_api.search_tasks(user_id, query, settings.inline_results_limit)
+    result = SearchResult(tasks, complete=len(tasks) < settings.inline_results_limit)
+    search_cache.set(key, result)
+    return result
+
+
+def _format_dt(raw: str) -> str:
+    try:
+        return parser.isoparse(raw).astimezone(TZ).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return raw
+
+
+def _article(task: Dict[str, Any]) -> InlineQueryResultArticle:
+    status = "✅" if task["is_completed"] else "⏳"
+    cats = ", ".join(category["name"] for category in task.get("categories", [])) or "без категории"
+    due = _format_dt(task["due_date"])
+    return InlineQueryResultArticle(
+        id=task["id"],
+        title=f"{status} {shorten(task['title'], width=60, placeholder='...')}",
+        description=f"Дедлайн: {due} · {cats}",
+        input_message_content=InputTextMessageContent(
+            message_text=f"{status} {task['title']}\nКатегории: {cats}\nДедлайн: {due}"
+        ),
+    )
+
+
+async def _answer(bot: Bot, inline_query_id: str, tasks: List[Dict[str, Any]]) -> None:
+    await bot.answer_inline_query(
+        inline_query_id,
+        results=[_article(task) for task in tasks[: settings.inline_results_limit]],
+        cache_time=settings.inline_cache_time,
+        is_personal=True,
+    )
+
+
+async def _debounced_search(bot: Bot, user_id: int, inline_query_id: str, query: str) -> None:
+    await asyncio.sleep(settings.inline_debounce)
+    if _latest_query.get(user_id) != inline_query_id:
+        # пользователь продолжил печатать — ответим уже на новый запрос
+        return
+    del _latest_query[user_id]
+    try:
+        result = await _searches.do((user_id, query), lambda: _load(user_id, query))
+        await _answer(bot, inline_query_id, result.tasks)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Inline-поиск для %s не выполнен: %s", user_id, exc)
+
+
+@router.inline_query()
+async def on_inline_query(inline_query: InlineQuery, bot: Bot):
+    """
+    Поиск задач через @бот <запрос>.
+
+    Из кеша (в т.ч. по префиксу запроса) отвечаем сразу. Иначе запрос к backend уходит
+    после паузы BOT_INLINE_DEBOUNCE, и только если за это время пользователь не набрал
+    следующий символ. Ожидание идёт в фоне, чтобы не держать обработку апдейтов.
+    """
+    user_id = inline_query.from_user.id
+    query = inline_query.query.strip().lower()[:QUERY_MAX_LENGTH]
+
+    tasks = cached_search(user_id, query)
+    search_stats.record(tasks is not None)
+    if tasks is not None:
+        _latest_query.pop(user_id, None)
+        await _answer(bot, inline_query.id, tasks)
+        return
+
+    _latest_query[user_id] = inline_query.id
+    task = asyncio.create_task(_debounced_search(bot, user_id, inline_query.id, query))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
@@ -0,0 +1,617 @@
+"""
+Офлайн-бенчмарк Dispatcher бота: без Telegram и без backend.
+
+Виртуальные пользователи проходят сценарии главного меню, диалога создания задачи
+и списка задач: синтетические Update подаются прямо в `dp.feed_update`, ответы бота
+принимает фейковая сессия Bot, а запросы BackendAPI обслуживает заглушка в памяти.
+Задержки Telegram и backend настраиваются.
+
+    python loadtest.py --users 200 --conversations 5 --output bot-bench.json
+    python loadtest.py --output bot-baseline.json
+    python loadtest.py --output bot-bench.json --baseline bot-baseline.json
+
+Baseline в репозитории не хранится: сначала сохраните прогон на своём окружении (вторая команда).
+Код возврата 1 — найдена регрессия относительно baseline, 2 — файл baseline не найден.
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from aiogram.client.session.base import BaseSession
+from aiogram.types import InlineKeyboardMarkup, Message, Update
+
+FAKE_TOKEN = "123456:loadtest"
+CATEGORY_NAMES = ["Работа", "Дом", "Учёба", "Покупки", "Здоровье"]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 3) if value is not None else None
+
+
+def _latency_summary(values: List[float], errors: int = 0) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "errors": errors,
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+    }
+
+
+class LatencyRecorder:
+    """Подменяет Histogram из metrics.py: хранит сырые значения, чтобы посчитать перцентили."""
+
+    def __init__(self):
+        self.values: Dict[Tuple[str, ...], List[float]] = defaultdict(list)
+
+    def labels(self, *labels: str) -> SimpleNamespace:
+        return SimpleNamespace(observe=self.values[labels].append)
+
+
+# ----------------------------- Telegram ----------------------------- #
+
+class ChatLog:
+    """Сообщения бота в одном чате, как их видит пользователь."""
+
+    def __init__(self):
+        self.messages: Dict[int, Dict[str, Any]] = {}
+        self.last_id = 0
+        self.changed = asyncio.Condition()
+
+    def next_id(self) -> int:
+        self.last_id += 1
+        return self.last_id
+
+    def find(self, predicate: Callable[[Dict[str, Any]], bool], after: int = 0) -> Optional[Dict[str, Any]]:
+        """Последнее сообщение с id больше `after`, подходящее под условие."""
+        for message_id in sorted(self.messages, reverse=True):
+            if message_id <= after:
+                break
+            if predicate(self.messages[message_id]):
+                return self.messages[message_id]
+        return None
+
+    async def wait_for(
+        self, predicate: Callable[[Dict[str, Any]], bool], after: int, timeout: float
+    ) -> Optional[Dict[str, Any]]:
+        async with self.changed:
+            try:
+                await asyncio.wait_for(self.changed.wait_for(lambda: self.find(predicate, after)), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.find(predicate, after)
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия Bot без сети: отвечает на методы Bot API после задержки `latency`.
+
+    Отправленные и отредактированные сообщения запоминаются по чатам, чтобы виртуальный
+    пользователь мог нажимать кнопки inline-клавиатур.
+    """
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.chats: Dict[int, ChatLog] = defaultdict(ChatLog)
+        self.calls: Counter = Counter()
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        name = type(method).__name__
+        self.calls[name] += 1
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not hasattr(method, "reply_markup"):
+            if name == "DeleteMessage" and chat_id is not None:
+                self.chats[chat_id].messages.pop(method.message_id, None)
+            return True
+
+        chat = self.chats[chat_id]
+        message_id = getattr(method, "message_id", None)
+        raw = chat.messages.get(message_id) if message_id else None
+        if raw is None:
+            raw = {
+                "message_id": chat.next_id(),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": bot.id, "is_bot": True, "first_name": "ToDo"},
+            }
+        if getattr(method, "text", None) is not None:
+            raw["text"] = method.text
+        markup = method.reply_markup
+        if isinstance(markup, InlineKeyboardMarkup):
+            raw["reply_markup"] = markup.model_dump(mode="json", exclude_none=True)
+        elif message_id is not None or markup is None:
+            raw.pop("reply_markup", None)
+        chat.messages[raw["message_id"]] = raw
+        async with chat.changed:
+            chat.changed.notify_all()
+        return Message.model_validate(raw, context={"bot": bot})
+
+    def stream_content(self, *args, **kwargs):
+        raise NotImplementedError("FakeSession не скачивает файлы")
+
+    async def close(self) -> None:
+        pass
+
+
+# ----------------------------- backend ----------------------------- #
+
+class StubBackend:
+    """Заглушка REST API backend для BackendAPI (через httpx.MockTransport)."""
+
+    def __init__(self, latency: float, seed_tasks: int):
+        self.latency = latency
+        self.seed_tasks = seed_tasks
+        self.tasks: Dict[int, List[Dict[str, Any]]] = {}
+        self.categories: Dict[int, List[Dict[str, Any]]] = {}
+
+    def _user_data(self, user_id: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        if user_id not in self.tasks:
+            self.categories[user_id] = [{"id": str(uuid.uuid4()), "name": name} for name in CATEGORY_NAMES[:3]]
+            self.tasks[user_id] = []
+            for idx in range(self.seed_tasks):
+                self._add_task(user_id, f"Задача из синтетики #{idx}", [], datetime.now(timezone.utc).isoformat())
+        return self.tasks[user_id], self.categories[user_id]
+
+    def _add_task(self, user_id: int, title: str, category_names: List[str], due_date: str) -> Dict[str, Any]:
+        task = {
+            "id": str(uuid.uuid4()),
+            "title": title,
+            "description": "",
+            "due_date": due_date,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "is_completed": False,
+            "categories": [{"id": str(uuid.uuid4()), "name": name} for name in category_names],
+        }
+        self.tasks[user_id].insert(0, task)
+        return task
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        user_id = int(request.headers["X-Telegram-User-Id"])
+        tasks, categories = self._user_data(user_id)
+        route = (request.method, request.url.path)
+        body = json.loads(request.content) if request.content else {}
+
+        if route == ("POST", "/api/telegram/register/"):
+            return httpx.Response(200, json={"telegram_id": user_id, "telegram_chat_id": body["telegram_chat_id"]})
+        if route == ("POST", "/api/telegram/bootstrap/"):
+            payload = {
+                "profile": {"telegram_user_id": user_id, "telegram_chat_id": body["telegram_chat_id"]},
+                "categories": categories,
+            }
+            if body.get("tasks") == "page":
+                request.url = request.url.copy_with(path="/api/tasks/", params={"page_size": body["page_size"]})
+                payload["tasks"] = self._page(request, tasks)
+            else:
+                done = sum(task["is_completed"] for task in tasks)
+                payload["counts"] = {"total": len(tasks), "completed": done, "active": len(tasks) - done}
+            return httpx.Response(200, json=payload)
+        if route == ("GET", "/api/categories/"):
+            return httpx.Response(200, json=categories)
+        if route == ("POST", "/api/categories/"):
+            category = {"id": str(uuid.uuid4()), "name": body["name"]}
+            categories.append(category)
+            categories.sort(key=lambda item: item["name"])
+            return httpx.Response(201, json=category)
+        if route == ("POST", "/api/tasks/"):
+            task = self._add_task(user_id, body["title"], body.get("category_names", []), body["due_date"])
+            return httpx.Response(201, json=task)
+        if route == ("GET", "/api/tasks/"):
+            return httpx.Response(200, json=self._page(request, tasks))
+        if route == ("GET", "/api/tasks/search/"):
+            query = request.url.params.get("q", "").lower()
+            limit = int(request.url.params.get("limit", 20))
+            return httpx.Response(200, json=[task for task in tasks if query in task["title"].lower()][:limit])
+        return httpx.Response(404, json={"detail": "Not found."})
+
+    @staticmethod
+    def _page(request: httpx.Request, tasks: List[Dict[str, Any]]) -> Any:
+        if "page_size" not in request.url.params:
+            return tasks
+        # курсор заглушки — просто смещение; бот передаёт его обратно как есть
+        size = int(request.url.params["page_size"])
+        offset = int(request.url.params.get("cursor", 0))
+        has_next = offset + size < len(tasks)
+        return {
+            "next": str(request.url.copy_set_param("cursor", offset + size)) if has_next else None,
+            "previous": str(request.url.copy_set_param("cursor", max(offset - size, 0))) if offset else None,
+            "results": tasks[offset:offset + size],
+        }
+
+
+# ----------------------------- сценарии ----------------------------- #
+
+class VirtualUser:
+    """Пользователь Telegram, который пишет боту в личный чат и нажимает кнопки."""
+
+    def __init__(self, harness: "BotLoadTest", user_id: int, rng: random.Random):
+        self.harness = harness
+        self.user_id = user_id
+        self.rng = rng
+        self.chat = harness.session.chats[user_id]
+        self.created = 0
+
+    @property
+    def _from(self) -> Dict[str, Any]:
+        return {"id": self.user_id, "is_bot": False, "first_name": f"Load{self.user_id}"}
+
+    async def send_text(self, step: str, text: str) -> None:
+        message = {
+            "message_id": self.chat.next_id(),
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": self._from,
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        await self.harness.feed(step, {"message": message})
+
+    def _buttons(self, message: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if message is None:
+            return []
+        rows = message.get("reply_markup", {}).get("inline_keyboard", [])
+        return [button for row in rows for button in row if "callback_data" in button]
+
+    def _window(self) -> Optional[Dict[str, Any]]:
+        return self.chat.find(lambda message: bool(self._buttons(message)))
+
+    async def click(
+        self, step: str, predicate: Callable[[str], bool], message: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Нажимает первую подходящую кнопку в сообщении (по умолчанию — в последнем окне диалога)."""
+        message = message or self._window()
+        buttons = [button for button in self._buttons(message) if predicate(button["text"])]
+        if not buttons:
+            self.harness.missing[step] += 1
+            return False
+        callback_query = {
+            "id": str(next(self.harness.ids)),
+            "from": self._from,
+            "chat_instance": str(self.user_id),
+            "message": message,
+            "data": self.rng.choice(buttons)["callback_data"],
+        }
+        await self.harness.feed(step, {"callback_query": callback_query})
+        return True
+
+    async def wait_reply(self, step: str, fragment: str, after: int) -> Optional[Dict[str, Any]]:
+        """Ждёт ответ бота, отправленный через очередь исходящих сообщений."""
+        reply = await self.chat.wait_for(
+            lambda message: fragment in message.get("text", ""), after, self.harness.args.reply_timeout
+        )
+        if reply is None:
+            self.harness.missing[step] += 1
+        return reply
+
+    async def think(self) -> None:
+        if self.harness.args.think:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.harness.args.think))
+
+    async def open_dialog(self) -> None:
+        """Открывает диалог и вводит название — пользователь остаётся на выборе категории."""
+        await self.send_text("menu_new_task", "📝 Создать задачу")
+        await self.think()
+        self.created += 1
+        await self.send_text("dialog_title", f"Нагрузочная задача {self.user_id}-{self.created}")
+
+    async def create_task(self) -> None:
+        await self.open_dialog()
+        await self.think()
+
+        choice = self.rng.random()
+        if choice < 0.6 and await self.click("dialog_category", lambda text: text.startswith("📂 ")):
+            pass
+        elif choice < 0.8:
+            await self.click("dialog_skip_category", lambda text: text == "Пропустить")
+        else:
+            await self.click("dialog_new_category_button", lambda text: text == "➕ Новая категория")
+            await self.think()
+            await self.send_text("dialog_new_category", self.rng.choice(CATEGORY_NAMES))
+        await self.think()
+
+        mark = self.chat.last_id
+        choice = self.rng.random()
+        if choice < 0.7:
+            await self.click("dialog_date_button", lambda text: text in ("Сегодня", "Завтра"))
+        else:
+            due = datetime.now(timezone.utc) + timedelta(days=self.rng.randint(2, 60))
+            await self.send_text("dialog_date_text", due.strftime("%Y-%m-%d"))
+        await self.think()
+
+        if self.rng.random() < 0.7:
+            await self.click("dialog_time_button", lambda text: text[:2].isdigit() and ":" in text)
+        else:
+            await self.send_text("dialog_time_text", f"{self.rng.randint(8, 22)}:30")
+        await self.wait_reply("task_created_reply", "Задача создана", mark)
+
+    async def list_tasks(self) -> None:
+        mark = self.chat.last_id
+        await self.send_text("menu_tasks", "📋 Мои задачи")
+        page = await self.wait_reply("tasks_reply", "Страница", mark)
+        if page is not None and self.rng.random() < 0.5:
+            await self.think()
+            await self.click("tasks_next_page", lambda text: text.startswith("Вперёд"), message=page)
+
+    async def run(self, conversations: int) -> None:
+        await self.send_text("start", "/start")
+        for _ in range(conversations):
+            await self.think()
+            await self.create_task()
+            await self.think()
+            await self.list_tasks()
+
+
+class BotLoadTest:
+    def __init__(self, args: argparse.Namespace):
+        # Импорт здесь: модули бота читают настройки из окружения при импорте (см. _configure_env)
+        import api
+        import app
+        import metrics
+        from aiogram import Bot
+        from outbox import outbox, setup_outbox
+
+        # aiogram и httpx логируют каждый апдейт и запрос на INFO
+        for name in ("aiogram", "httpx"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        self.args = args
+        self.dp = app.create_dispatcher()
+        self.outbox = outbox
+        self.session = FakeSession(args.telegram_latency)
+        self.bot = Bot(token=FAKE_TOKEN, session=self.session)
+        setup_outbox(self.bot)
+        self.backend = StubBackend(args.backend_latency, args.seed_tasks)
+        self.backend_api = api.backend_api
+        self.handlers = LatencyRecorder()
+        self.backend_calls = LatencyRecorder()
+        metrics.HANDLER_LATENCY = self.handlers
+        api.BACKEND_LATENCY = self.backend_calls
+
+        self.ids = itertools.count(1)
+        self.steps: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.missing: Counter = Counter()
+
+    async def feed(self, step: str, payload: Dict[str, Any]) -> None:
+        update = Update.model_validate({"update_id": next(self.ids), **payload}, context={"bot": self.bot})
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:  # noqa: BLE001
+            self.errors[step] += 1
+            logging.getLogger(__name__).exception("Ошибка обработки шага %s", step)
+        self.steps[step].append(time.perf_counter() - started)
+
+    async def run(self) -> Dict[str, Any]:
+        self.backend_api._client = httpx.AsyncClient(
+            base_url=self.backend_api.base_url, transport=httpx.MockTransport(self.backend.handle)
+        )
+        await self.dp.emit_startup(bot=self.bot)
+        try:
+            users = [
+                VirtualUser(self, self.args.telegram_id_base + idx, random.Random(f"{self.args.seed}:{idx}"))
+                for idx in range(self.args.users)
+            ]
+            started = time.perf_counter()
+            await asyncio.gather(*(user.run(self.args.conversations) for user in users))
+            await self.outbox.close()
+            report = self._report(time.perf_counter() - started)
+            # замер памяти — после отчёта, чтобы его апдейты не попали в латентности
+            if self.args.memory_dialogs:
+                report["memory"]["bytes_per_dialog"] = round(await self._dialog_memory(self.args.memory_dialogs))
+        finally:
+            await self.dp.emit_shutdown(bot=self.bot)
+            await self.backend_api.close()
+        return report
+
+    async def _dialog_memory(self, count: int) -> float:
+        """Сколько памяти добавляет один открытый диалог нового пользователя (без структур самого бенчмарка)."""
+        base = self.args.telegram_id_base + self.args.users
+        users = [VirtualUser(self, base + idx, random.Random(idx)) for idx in range(count)]
+        for user in users:
+            # чаты и сообщения фейковой сессии — память бенчмарка, создаём их до замера
+            self.session.chats[user.user_id].next_id()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for user in users:
+            await user.open_dialog()
+        await self.outbox.close()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        ignore = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "filename")
+        growth = sum(stat.size_diff for stat in diff)
+        return growth / count
+
+    def _report(self, elapsed: float) -> Dict[str, Any]:
+        total = sum(len(values) for values in self.steps.values())
+        handlers: Dict[str, List[float]] = defaultdict(list)
+        handler_errors: Counter = Counter()
+        for (name, result), values in self.handlers.values.items():
+            handlers[name].extend(values)
+            if result != "ok":
+                handler_errors[name] += len(values)
+        backend: Dict[str, List[float]] = defaultdict(list)
+        backend_errors: Counter = Counter()
+        for (method, endpoint, status), values in self.backend_calls.values.items():
+            backend[f"{method} {endpoint}"].extend(values)
+            if not status.startswith("2"):
+                backend_errors[f"{method} {endpoint}"] += len(values)
+        return {
+            "meta": {
+                "users": self.args.users,
+                "conversations": self.args.conversations,
+                "telegram_latency_ms": self.args.telegram_latency * 1000,
+                "backend_latency_ms": self.args.backend_latency * 1000,
+                "telegram_limits": self.args.telegram_limits,
+                "seed": self.args.seed,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            },
+            "updates": total,
+            "duration_s": round(elapsed, 3),
+            "updates_per_s": round(total / elapsed, 2),
+            "steps": {name: _latency_summary(values, self.errors[name]) for name, values in sorted(self.steps.items())},
+            "missing": dict(self.missing),
+            "handlers": {
+                name: _latency_summary(values, handler_errors[name]) for name, values in sorted(handlers.items())
+            },
+            "backend": {
+                name: _latency_summary(values, backend_errors[name]) for name, values in sorted(backend.items())
+            },
+            "telegram_calls": dict(sorted(self.session.calls.items())),
+            "memory": {
+                "dialogs": self.args.memory_dialogs,
+                "bytes_per_dialog": None,
+            },
+        }
+
+
+# ----------------------------- отчёт ----------------------------- #
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Возвращает список регрессий относительно baseline."""
+    regressions = []
+    if baseline.get("updates_per_s") and current["updates_per_s"] < baseline["updates_per_s"] * (1 - tolerance):
+        regressions.append(f"updates_per_s {baseline['updates_per_s']} -> {current['updates_per_s']}")
+    for name, base in baseline.get("steps", {}).items():
+        cur = current["steps"].get(name)
+        if cur is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base.get(metric) and cur.get(metric) and cur[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {base[metric]} -> {cur[metric]}")
+    base_memory = (baseline.get("memory") or {}).get("bytes_per_dialog")
+    cur_memory = current["memory"]["bytes_per_dialog"]
+    if base_memory and cur_memory and cur_memory > base_memory * (1 + tolerance):
+        regressions.append(f"bytes_per_dialog {base_memory} -> {cur_memory}")
+    return regressions
+
+
+def _print_table(title: str, rows: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{title:<36}{'count':>8}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, item in rows.items():
+        print(
+            f"{name[:35]:<36}{item['count']:>8}{item['errors']:>6}"
+            f"{item['p50_ms'] or '-':>10}{item['p95_ms'] or '-':>10}{item['p99_ms'] or '-':>10}"
+        )
+    print()
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    _print_table("шаг сценария (мс)", report["steps"])
+    _print_table("хендлер (мс)", report["handlers"])
+    _print_table("запрос к backend (мс)", report["backend"])
+    print(f"Апдейтов: {report['updates']} за {report['duration_s']} с — {report['updates_per_s']} updates/s")
+    if report["missing"]:
+        print(f"Не дождались ответа или кнопки: {report['missing']}")
+    if report["memory"]["bytes_per_dialog"] is not None:
+        print(f"Память на открытый диалог: {report['memory']['bytes_per_dialog']} байт")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк Dispatcher Telegram-бота")
+    parser.add_argument("--users", type=int, default=100, help="Количество виртуальных пользователей")
+    parser.add_argument(
+        "--conversations", type=int, default=5, help="Сценариев «создать задачу + список» на пользователя"
+    )
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="Задержка ответа Bot API, секунды")
+    parser.add_argument("--backend-latency", type=float, default=0.0, help="Задержка ответа backend, секунды")
+    parser.add_argument("--think", type=float, default=0.0, help="Средняя пауза пользователя между действиями, секунды")
+    parser.add_argument("--seed-tasks", type=int, default=12, help="Задач у пользователя до начала прогона")
+    parser.add_argument("--memory-dialogs", type=int, default=500, help="Диалогов для замера памяти (0 — не мерить)")
+    parser.add_argument(
+        "--telegram-limits",
+        action="store_true",
+        help="Оставить лимиты очереди исходящих сообщений из настроек (по умолчанию сняты)",
+    )
+    parser.add_argument("--reply-timeout", type=float, default=30.0, help="Сколько ждать ответа из очереди сообщений")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--telegram-id-base", type=int, default=8_000_000_000)
+    parser.add_argument("--output", default="bot-bench.json", help="Куда записать результаты в JSON")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Допустимое ухудшение")
+    return parser.parse_args(argv)
+
+
+def _configure_env(args: argparse.Namespace) -> None:
+    """Офлайн-окружение: фейковый токен, FSM и кеши в памяти, без multiprocess-метрик."""
+    os.environ["TELEGRAM_BOT_TOKEN"] = FAKE_TOKEN
+    os.environ["BOT_FSM_STORAGE"] = "memory"
+    os.environ["BOT_REDIS_URL"] = ""
+    os.environ["BOT_EVENTS_REDIS_URL"] = ""
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    if not args.telegram_limits:
+        # меряем Dispatcher, а не паузы token bucket очереди исходящих сообщений
+        for name in ("BOT_OUTBOX_GLOBAL_RATE", "BOT_OUTBOX_CHAT_RATE", "BOT_OUTBOX_CHAT_BURST"):
+            os.environ[name] = "1000000"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    baseline = None
+    if args.baseline:
+        # проверяем до прогона, чтобы не ждать его впустую
+        try:
+            with open(args.baseline, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        except FileNotFoundError:
+            print(
+                f"Baseline {args.baseline} не найден. Сначала сохраните прогон: "
+                f"python loadtest.py --output {args.baseline}",
+                file=sys.stderr,
+            )
+            return 2
+    _configure_env(args)
+    report = asyncio.run(BotLoadTest(args).run())
+    print_report(report)
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+
+    if baseline is None:
+        return 0
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print("\nРегрессии относительно baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nРегрессий относительно baseline нет.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import functools
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+HANDLER_LATENCY = Histogram(
+    "todo_bot_handler_duration_seconds",
+    "Время выполнения хендлера, геттера или обработчика диалога бота.",
+    ["handler", "result"],
+)
+BACKEND_LATENCY = Histogram(
+    "todo_bot_backend_request_duration_seconds",
+    "Время запроса бота к backend API.",
+    ["method", "endpoint", "status"],
+)
+UPDATE_LAG = Histogram(
+    "todo_bot_update_lag_seconds",
+    "Задержка от отправки события в Telegram до начала его обработки ботом.",
+    ["update_type"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+WEBHOOK_QUEUE_LAG = Histogram(
+    "todo_bot_webhook_queue_lag_seconds",
+    "Время от приёма апдейта webhook до начала его обработки воркером.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+BACKEND_RETRIES = Counter(
+    "todo_bot_backend_retries_total",
+    "Повторы запросов бота к backend после ошибки или 5xx.",
+    ["endpoint"],
+)
+BACKEND_HEDGED = Counter(
+    "todo_bot_backend_hedged_total",
+    "Дублирующие (hedged) запросы к backend, отправленные из-за медленного первого.",
+    ["endpoint"],
+)
+BACKEND_FALLBACKS = Counter(
+    "todo_bot_backend_fallbacks_total",
+    "Запросы к backend, завершённые без ответа backend: из кеша (stale) или ошибкой (error).",
+    ["endpoint", "reason", "result"],
+)
+BACKEND_CIRCUIT_OPEN = Gauge(
+    "todo_bot_backend_circuit_open",
+    "1 — автомат (circuit breaker) запросов к backend разомкнут.",
+    multiprocess_mode="max",
+)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+def timed(func: F) -> F:
+    """Декоратор для геттеров и обработчиков aiogram_dialog: пишет латентность в HANDLER_LATENCY."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = "error"
+        try:
+            value = await func(*args, **kwargs)
+            result = "ok"
+            return value
+        finally:
+            HANDLER_LATENCY.labels(name, result).observe(time.perf_counter() - started)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class HandlerLatencyMiddleware(BaseMiddleware):
+    """
+    Inner-middleware: латентность каждого сработавшего хендлера по имени функции.
+
+    Регистрируется на наблюдателях Dispatcher и поэтому действует на все вложенные роутеры.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = getattr(callback, "__qualname__", None) or type(event).__name__
+        started = time.perf_counter()
+        result = "error"
+        try:
+            value = await handler(event, data)
+            result = "ok"
+            return value
+        finally:
+            HANDLER_LATENCY.labels(name, result).observe(time.perf_counter() - started)
+
+
+class UpdateLagMiddleware(BaseMiddleware):
+    """Outer-middleware для update: сколько прошло от даты события в Telegram до обработки."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            # дата есть у сообщений и подобных событий; у callback/inline-запросов её нет
+            sent_at = getattr(event.event, "date", None)
+            if isinstance(sent_at, datetime):
+                lag = (datetime.now(timezone.utc) - sent_at).total_seconds()
+                UPDATE_LAG.labels(event.event_type).observe(max(lag, 0))
+        return await handler(event, data)
+
+
+def setup_metrics(dp) -> None:
+    """Подключает middleware метрик к Dispatcher."""
+    dp.update.outer_middleware(UpdateLagMiddleware())
+    latency = HandlerLatencyMiddleware()
+    for observer in (dp.message, dp.callback_query, dp.inline_query):
+        observer.middleware(latency)
+
+
+def get_registry() -> CollectorRegistry:
+    """Реестр метрик с учётом multiprocess-режима (воркеры webhook-режима)."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> bytes:
+    return generate_latest(get_registry())
+
+
+def start_metrics_server(port: int) -> None:
+    """Отдельный HTTP-эндпоинт метрик (polling-режим)."""
+    start_http_server(port, registry=get_registry())
+
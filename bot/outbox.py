@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+COALESCE_SEPARATOR = "\n\n"
+# Telegram не сообщает, какой лимит сработал: 429 сразу в нескольких чатах считаем общим лимитом бота
+GLOBAL_FLOOD_CHATS = 3
+GLOBAL_FLOOD_WINDOW = 1.0
+# Методы Bot API, на которые распространяются лимиты Telegram на сообщения в чат
+RATE_LIMITED_METHODS = ("Send", "Edit", "Copy", "Forward")
+
+# Внутри задачи отправки очереди запросы к Bot API идут мимо OutboxMiddleware
+_draining: ContextVar[bool] = ContextVar("outbox_draining", default=False)
+
+
+class AsyncTokenBucket:
+    """Token bucket для asyncio: `acquire` ждёт, пока не появится токен."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float) -> None:
+        """Запрещает выдачу токенов на `seconds` секунд (ответ 429 с retry_after)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+@dataclass
+class _Outgoing:
+    text: str
+    reply_markup: object = None
+    futures: List["asyncio.Future[Message]"] = field(default_factory=list)
+
+    def can_merge(self, other: "_Item") -> bool:
+        if not isinstance(other, _Outgoing):
+            return False
+        # сообщения с inline-клавиатурой потом редактируются целиком, их не склеиваем
+        if isinstance(self.reply_markup, InlineKeyboardMarkup) or isinstance(other.reply_markup, InlineKeyboardMarkup):
+            return False
+        if self.reply_markup is not None and other.reply_markup is not None and self.reply_markup != other.reply_markup:
+            return False
+        return len(self.text) + len(COALESCE_SEPARATOR) + len(other.text) <= MESSAGE_LIMIT
+
+    def merge(self, other: "_Outgoing") -> None:
+        self.text = f"{self.text}{COALESCE_SEPARATOR}{other.text}"
+        self.reply_markup = other.reply_markup or self.reply_markup
+        self.futures.extend(other.futures)
+
+    def send(self, bot: Bot, chat_id: int) -> Awaitable[Message]:
+        return bot.send_message(chat_id, self.text, reply_markup=self.reply_markup)
+
+
+@dataclass
+class _Request:
+    """Запрос к Bot API, перехваченный OutboxMiddleware (окно диалога, редактирование сообщения)."""
+
+    make_request: Callable[[], Awaitable[Any]]
+    futures: List["asyncio.Future[Any]"] = field(default_factory=list)
+
+    def can_merge(self, other: "_Item") -> bool:
+        return False
+
+    def send(self, bot: Bot, chat_id: int) -> Awaitable[Any]:
+        return self.make_request()
+
+
+_Item = Union[_Outgoing, _Request]
+
+
+@dataclass
+class _ChatQueue:
+    bucket: AsyncTokenBucket
+    pending: Deque[_Item] = field(default_factory=deque)
+    worker: Optional[asyncio.Task] = None
+
+
+def _consume_exception(future: "asyncio.Future[Message]") -> None:
+    # результат отправки чаще всего никто не ждёт — не засоряем лог «exception was never retrieved»
+    if not future.cancelled():
+        future.exception()
+
+
+class Outbox:
+    """
+    Очередь исходящих сообщений бота.
+
+    Хендлер ставит сообщение в очередь и сразу возвращается; отправкой занимается фоновая
+    задача чата. Общий token bucket держит суммарную скорость в пределах лимитов Telegram,
+    bucket чата — скорость в один чат. Сообщения одного чата уходят строго по порядку;
+    если в очереди чата скопилось несколько простых сообщений подряд, они склеиваются
+    в одно. На 429 отправка в чат приостанавливается на retry_after и повторяется; если 429
+    за короткое время пришёл в несколько чатов, это общий лимит бота, и пауза ставится всем.
+
+    Остальные запросы бота к чату (окна aiogram_dialog, редактирование сообщений) попадают
+    в ту же очередь через OutboxMiddleware сессии Bot, поэтому лимиты распространяются на весь
+    исходящий трафик, а ответ хендлера, поставленный до перерисовки окна, уходит раньше окна —
+    ждать его future не нужно.
+    """
+
+    def __init__(self):
+        self._global = AsyncTokenBucket(settings.outbox_global_rate, settings.outbox_global_rate)
+        self._chats: Dict[int, _ChatQueue] = {}
+        # время последнего 429 по чатам — чтобы отличить общий flood limit от лимита одного чата
+        self._flooded: Dict[int, float] = {}
+
+    def send(self, bot: Bot, chat_id: int, text: str, reply_markup=None) -> "asyncio.Future[Message]":
+        """Ставит сообщение в очередь; future завершится отправленным Message."""
+        future: "asyncio.Future[Message]" = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._enqueue(bot, chat_id, _Outgoing(text, reply_markup, [future]))
+        return future
+
+    def request(self, bot: Bot, chat_id: int, make_request: Callable[[], Awaitable[Any]]) -> "asyncio.Future[Any]":
+        """Ставит в очередь чата произвольный запрос к Bot API; future завершится его результатом."""
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._enqueue(bot, chat_id, _Request(make_request, [future]))
+        return future
+
+    def _enqueue(self, bot: Bot, chat_id: int, item: _Item) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _ChatQueue(AsyncTokenBucket(settings.outbox_chat_rate, settings.outbox_chat_burst))
+            self._chats[chat_id] = chat
+        chat.pending.append(item)
+        if chat.worker is None or chat.worker.done():
+            chat.worker = asyncio.create_task(self._drain(bot, chat_id, chat))
+
+    def answer(self, message: Message, text: str, reply_markup=None) -> "asyncio.Future[Message]":
+        """Аналог message.answer через очередь."""
+        return self.send(message.bot, message.chat.id, text, reply_markup=reply_markup)
+
+    async def _drain(self, bot: Bot, chat_id: int, chat: _ChatQueue) -> None:
+        # задача работает в своей копии контекста: флаг не виден хендлерам
+        _draining.set(True)
+        try:
+            while chat.pending:
+                await chat.bucket.acquire()
+                item = chat.pending.popleft()
+                # пока ждали токен, в очередь могли добавиться сообщения — отправим их одним
+                while chat.pending and item.can_merge(chat.pending[0]):
+                    item.merge(chat.pending.popleft())
+                await self._global.acquire()
+                await self._deliver(bot, chat_id, chat, item)
+        finally:
+            if not chat.pending and self._chats.get(chat_id) is chat:
+                del self._chats[chat_id]
+
+    async def _deliver(self, bot: Bot, chat_id: int, chat: _ChatQueue, item: _Item) -> None:
+        for _ in range(settings.outbox_max_retries + 1):
+            try:
+                result = await item.send(bot, chat_id)
+            except TelegramRetryAfter as exc:
+                if self._is_global_flood(chat_id):
+                    logger.warning("Общий flood limit Telegram, пауза %s с", exc.retry_after)
+                    self._global.block(exc.retry_after)
+                else:
+                    logger.warning("Flood limit Telegram для чата %s, пауза %s с", chat_id, exc.retry_after)
+                chat.bucket.block(exc.retry_after)
+                await chat.bucket.acquire()
+                await self._global.acquire()
+                continue
+            except Exception as exc:  # noqa: BLE001
+                # ошибку перехваченного запроса обрабатывает вызвавший его код (например, aiogram_dialog)
+                if isinstance(item, _Outgoing):
+                    logger.warning("Не удалось отправить сообщение в чат %s: %s", chat_id, exc)
+                _resolve(item, exc=exc)
+                return
+            _resolve(item, result=result)
+            return
+        _resolve(item, exc=RuntimeError(f"Сообщение в чат {chat_id} не отправлено после повторов"))
+
+    def _is_global_flood(self, chat_id: int) -> bool:
+        """Отмечает 429 в чате; True, если за GLOBAL_FLOOD_WINDOW его получили GLOBAL_FLOOD_CHATS чатов."""
+        now = time.monotonic()
+        self._flooded = {chat: at for chat, at in self._flooded.items() if now - at < GLOBAL_FLOOD_WINDOW}
+        self._flooded[chat_id] = now
+        return len(self._flooded) >= GLOBAL_FLOOD_CHATS
+
+    async def close(self, timeout: float = 10) -> None:
+        """Дожидается отправки уже поставленных сообщений."""
+        workers = [chat.worker for chat in self._chats.values() if chat.worker is not None]
+        if workers:
+            await asyncio.wait(workers, timeout=timeout)
+
+
+def _resolve(item: _Item, result: Any = None, exc: Optional[BaseException] = None) -> None:
+    for future in item.futures:
+        if future.done():
+            continue
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+
+class OutboxMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии Bot: запросы, которые отправляют или меняют сообщения чата, выполняются
+    в очереди этого чата — после ранее поставленных сообщений и с теми же лимитами.
+    """
+
+    def __init__(self, queue: Outbox):
+        self.queue = queue
+
+    async def __call__(self, make_request, bot: Bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        limited = isinstance(chat_id, int) and type(method).__name__.startswith(RATE_LIMITED_METHODS)
+        # запросы из самой очереди уже прошли лимиты; inline-сообщения (без chat_id) не привязаны к чату
+        if _draining.get() or not limited:
+            return await make_request(bot, method)
+        return await self.queue.request(bot, chat_id, lambda: make_request(bot, method))
+
+
+outbox = Outbox()
+
+
+def setup_outbox(bot: Bot) -> None:
+    """Пускает исходящий трафик бота через очередь outbox."""
+    bot.session.middleware(OutboxMiddleware(outbox))
@@ -0,0 +1,86 @@
+import json
+from datetime import date, datetime, time
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisEventIsolation, RedisStorage
+from redis.asyncio import Redis
+
+from config import settings
+
+# Метки типов в JSON: dialog_data хранит date/time, которые стандартный json не сериализует
+DATE_TAG = "$d"
+TIME_TAG = "$t"
+DATETIME_TAG = "$dt"
+
+
+def _encode(value: Any) -> Dict[str, str]:
+    # datetime проверяется раньше date: это его подкласс
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    if isinstance(value, date):
+        return {DATE_TAG: value.isoformat()}
+    if isinstance(value, time):
+        return {TIME_TAG: value.isoformat(timespec="minutes" if not value.second else "seconds")}
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в хранилище FSM")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) != 1:
+        return obj
+    if DATE_TAG in obj:
+        return date.fromisoformat(obj[DATE_TAG])
+    if TIME_TAG in obj:
+        return time.fromisoformat(obj[TIME_TAG])
+    if DATETIME_TAG in obj:
+        return datetime.fromisoformat(obj[DATETIME_TAG])
+    return obj
+
+
+def dumps(data: Any) -> str:
+    """Компактный JSON: без пробелов, кириллица без \\u-экранирования, date/time — короткие ISO-строки."""
+    return json.dumps(data, default=_encode, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(raw: str) -> Any:
+    return json.loads(raw, object_hook=_decode)
+
+
+_redis: Optional[Redis] = None
+
+
+def _get_redis() -> Redis:
+    global _redis
+    if _redis is None:
+        if not settings.redis_url:
+            raise RuntimeError("BOT_FSM_STORAGE=redis требует BOT_REDIS_URL")
+        _redis = Redis.from_url(settings.redis_url)
+    return _redis
+
+
+def build_storage() -> BaseStorage:
+    """
+    Хранилище FSM и стека диалогов aiogram_dialog.
+
+    redis — общее для всех процессов и реплик бота и переживает перезапуск; брошенные диалоги
+    удаляются по TTL. memory — только для одного процесса.
+    """
+    if settings.fsm_storage != "redis":
+        return MemoryStorage()
+    return RedisStorage(
+        _get_redis(),
+        # with_destiny обязателен для aiogram_dialog: стек и контексты диалогов хранятся отдельными ключами
+        key_builder=DefaultKeyBuilder(prefix="bot:fsm", with_destiny=True),
+        state_ttl=settings.fsm_state_ttl,
+        data_ttl=settings.fsm_data_ttl,
+        json_loads=loads,
+        json_dumps=dumps,
+    )
+
+
+def build_events_isolation() -> BaseEventIsolation:
+    """Блокировка обработки апдейтов одного чата: в Redis — между процессами, иначе — в процессе."""
+    if settings.fsm_storage != "redis":
+        return SimpleEventIsolation()
+    return RedisEventIsolation(_get_redis(), key_builder=DefaultKeyBuilder(prefix="bot:fsm", with_destiny=True))
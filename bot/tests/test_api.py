@@ -0,0 +1,219 @@
+"""
+Автомат, повторы и hedging клиента backend (api.BackendAPI).
+
+Backend подменяется httpx.MockTransport. Запуск из каталога bot: `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+from typing import Awaitable, Callable, List
+from unittest import mock
+
+import httpx
+
+from api import BackendAPI, BackendUnavailable, CircuitBreaker
+from config import settings
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("api.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def test_opens_after_threshold(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.is_open)
+
+    def test_half_open_lets_single_probe(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertFalse(self.breaker.is_open)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open)
+        self.now += 10
+        self.assertFalse(self.breaker.allow())
+
+    def test_lost_probe_is_retried_after_reset_timeout(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+        # проба отменена и не сообщила результат
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+
+
+class BackendAPITest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = mock.patch.multiple(
+            settings,
+            api_retries=2,
+            api_retry_backoff=0,
+            api_hedge_delay=0,
+            api_read_deadline=1,
+            api_write_deadline=1,
+            api_breaker_failures=2,
+            api_breaker_reset=30,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.requests: List[httpx.Request] = []
+        self.responses: List[Handler] = []
+        self.api = BackendAPI()
+        self.api._client = httpx.AsyncClient(base_url=self.api.base_url, transport=httpx.MockTransport(self._handle))
+        self.addAsyncCleanup(self.api.close)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        # последний ответ повторяется для всех следующих запросов
+        handler = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return await handler(request)
+
+    def respond(self, *handlers: Handler) -> None:
+        self.responses = list(handlers)
+
+    async def test_get_retried_after_5xx(self):
+        self.respond(_status(503), _json([{"id": 1}]))
+        self.assertEqual(await self.api.list_categories(1), [{"id": 1}])
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_get_retried_after_transport_error(self):
+        self.respond(_fail(), _json([]))
+        self.assertEqual(await self.api.list_categories(1), [])
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_5xx_without_cache_raises_backend_unavailable(self):
+        self.respond(_status(502))
+        with self.assertRaises(BackendUnavailable):
+            await self.api.list_categories(1)
+        self.assertEqual(len(self.requests), settings.api_retries + 1)
+
+    async def test_5xx_returns_stale_response(self):
+        self.respond(_json([{"id": 1}]), _status(500))
+        await self.api.list_categories(1)
+        self.assertEqual(await self.api.list_categories(1), [{"id": 1}])
+
+    async def test_stale_response_is_per_user(self):
+        self.respond(_json([{"id": 1}]), _status(500))
+        await self.api.list_categories(1)
+        with self.assertRaises(BackendUnavailable):
+            await self.api.list_categories(2)
+
+    async def test_4xx_is_not_retried(self):
+        self.respond(_status(404))
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.api.list_categories(1)
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_post_without_key_is_not_retried(self):
+        self.respond(_status(503))
+        with self.assertRaises(BackendUnavailable):
+            await self.api.create_category(1, "Дом")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_keyed_post_retried_with_same_key(self):
+        self.respond(_fail(), _status(409), _json({"id": 1}))
+        self.assertEqual(await self.api.create_category(1, "Дом", idempotency_key="key"), {"id": 1})
+        self.assertEqual([request.headers["Idempotency-Key"] for request in self.requests], ["key"] * 3)
+
+    async def test_conflict_without_key_is_not_retried(self):
+        self.respond(_status(409))
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.api.create_category(1, "Дом")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_deadline_exceeded_raises_backend_unavailable(self):
+        settings.api_read_deadline = 0.05
+        self.respond(_slow(1, _json([])))
+        with self.assertRaises(BackendUnavailable):
+            await self.api.list_categories(1)
+
+    async def test_open_breaker_skips_backend(self):
+        self.respond(_json([{"id": 1}]), _fail())
+        await self.api.list_categories(1)
+        for _ in range(settings.api_breaker_failures):
+            await self.api.list_categories(1)
+        self.assertTrue(self.api.breaker.is_open)
+        sent = len(self.requests)
+        self.assertEqual(await self.api.list_categories(1), [{"id": 1}])
+        with self.assertRaises(BackendUnavailable):
+            await self.api.list_tasks(1)
+        self.assertEqual(len(self.requests), sent)
+
+    async def test_slow_request_is_hedged(self):
+        settings.api_hedge_delay = 0.05
+        self.respond(_slow(1, _json(["slow"])), _json(["fast"]))
+        self.assertEqual(await self.api.list_categories(1), ["fast"])
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_fast_request_is_not_hedged(self):
+        settings.api_hedge_delay = 0.5
+        self.respond(_json(["fast"]))
+        self.assertEqual(await self.api.list_categories(1), ["fast"])
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_hedge_failure_waits_for_other_request(self):
+        settings.api_hedge_delay = 0.05
+        self.respond(_slow(0.2, _json(["slow"])), _fail())
+        self.assertEqual(await self.api.list_categories(1), ["slow"])
+        self.assertEqual(len(self.requests), 2)
+
+
+def _status(code: int) -> Handler:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(code)
+
+    return handler
+
+
+def _json(data) -> Handler:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=data)
+
+    return handler
+
+
+def _fail() -> Handler:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    return handler
+
+
+def _slow(delay: float, then: Handler) -> Handler:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return await then(request)
+
+    return handler
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Webhook-режим бота с несколькими процессами-обработчиками.
+
+Главный процесс поднимает aiohttp-сервер, принимает апдейты от Telegram и раскладывает
+их по очередям воркеров по chat id. Каждый воркер — отдельный процесс со своим event loop,
+который скармливает апдейты общему Dispatcher. Апдейты одного чата всегда попадают
+в один воркер и обрабатываются строго по порядку, разные чаты — параллельно.
+"""
+
+import asyncio
+import functools
+import hmac
+import logging
+import multiprocessing
+import queue
+import time
+from multiprocessing.context import SpawnProcess
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from config import settings
+from metrics import CONTENT_TYPE_LATEST, WEBHOOK_QUEUE_LAG, render_metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# как часто главный процесс проверяет, живы ли воркеры
+SUPERVISE_INTERVAL = 1.0
+# spawn, а не fork: воркеры не наследуют event loop и сокеты главного процесса
+_mp = multiprocessing.get_context("spawn")
+
+
+def shard_key(update: Dict[str, Any]) -> int:
+    """Chat id апдейта (для inline-запросов и подобных — id пользователя, иначе update_id)."""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return int(chat["id"])
+        user = event.get("from") or event.get("user")
+        if user:
+            return int(user["id"])
+    return int(update.get("update_id", 0))
+
+
+class ChatSequencer:
+    """
+    Выполняет задачи одного чата последовательно, разных чатов — конкурентно.
+
+    Каждая новая задача чата ждёт завершения предыдущей. Число задач в процессе (выполняемых
+    и ждущих своей очереди в чате) ограничено `limit`: слот занимается через `acquire()`
+    до чтения апдейта из очереди процесса и освобождается по завершении задачи. Пока слотов
+    нет, апдейты копятся в очереди процесса, и главный процесс при её переполнении отвечает 503.
+    """
+
+    def __init__(self, limit: int):
+        self._tails: Dict[int, asyncio.Task] = {}
+        self._slots = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> None:
+        await self._slots.acquire()
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def submit(self, chat_id: int, job: Callable[[], Awaitable[Any]]) -> None:
+        """Ставит задачу в очередь чата; слот должен быть занят через `acquire()`."""
+        task = asyncio.create_task(self._run(self._tails.get(chat_id), job))
+        self._tails[chat_id] = task
+        task.add_done_callback(lambda done: self._forget(chat_id, done))
+
+    def _forget(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._tails.get(chat_id) is task:
+            del self._tails[chat_id]
+
+    async def _run(self, previous: Optional[asyncio.Task], job: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await job()
+        except Exception:  # noqa: BLE001
+            logger.exception("Ошибка обработки апдейта")
+        finally:
+            self._slots.release()
+
+    async def drain(self) -> None:
+        while self._tails:
+            await asyncio.gather(*self._tails.values(), return_exceptions=True)
+
+
+async def _worker_loop(updates: "multiprocessing.Queue") -> None:
+    # Импорт здесь: модули бота читают настройки и создают клиентов при импорте
+    from api import backend_api
+    from app import create_bot, create_dispatcher, shutdown_resources
+    from events import change_listener
+
+    bot = create_bot()
+    dp = create_dispatcher()
+    await backend_api.start()
+    change_listener.start()
+    # как и start_polling: startup/shutdown закрывают хранилище FSM и прочие ресурсы Dispatcher
+    await dp.emit_startup(bot=bot)
+    sequencer = ChatSequencer(settings.webhook_worker_concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def process(received_at: float, update: Dict[str, Any]) -> None:
+        # от приёма webhook до начала обработки: очередь процесса и ожидание предыдущих апдейтов чата
+        WEBHOOK_QUEUE_LAG.observe(max(time.time() - received_at, 0))
+        await dp.feed_raw_update(bot, update)
+
+    try:
+        while True:
+            await sequencer.acquire()
+            item = await loop.run_in_executor(None, updates.get)
+            if item is None:
+                sequencer.release()
+                break
+            received_at, update = item
+            sequencer.submit(shard_key(update), functools.partial(process, received_at, update))
+        await sequencer.drain()
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await shutdown_resources()
+        await bot.session.close()
+
+
+def run_worker(index: int, updates: "multiprocessing.Queue") -> None:
+    """Точка входа процесса-воркера."""
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Webhook-воркер %s запущен", index)
+    asyncio.run(_worker_loop(updates))
+
+
+class WebhookServer:
+    """Главный процесс: принимает апдейты и распределяет их по воркерам по chat id."""
+
+    def __init__(self, workers: int):
+        self.queues: List["multiprocessing.Queue"] = [
+            _mp.Queue(maxsize=settings.webhook_queue_size) for _ in range(workers)
+        ]
+        self.processes: List[SpawnProcess] = []
+
+    def start_workers(self) -> None:
+        for index in range(len(self.queues)):
+            self.processes.append(self._spawn(index))
+
+    def _spawn(self, index: int) -> SpawnProcess:
+        process = _mp.Process(
+            target=run_worker, args=(index, self.queues[index]), name=f"bot-worker-{index}", daemon=True
+        )
+        process.start()
+        return process
+
+    async def supervise(self) -> None:
+        """
+        Перезапускает упавшие воркеры.
+
+        Новый процесс читает ту же очередь, так что накопленные в ней апдейты не теряются;
+        пропадают только апдейты, которые упавший воркер уже взял в обработку.
+        """
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                logger.error("Webhook-воркер %s завершился с кодом %s, перезапуск", index, process.exitcode)
+                process.close()
+                self.processes[index] = self._spawn(index)
+
+    def stop_workers(self) -> None:
+        for updates in self.queues:
+            updates.put(None)
+        for process in self.processes:
+            process.join(timeout=settings.request_timeout + 5)
+            if process.is_alive():
+                process.terminate()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if settings.webhook_secret and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), settings.webhook_secret
+        ):
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        target = self.queues[shard_key(update) % len(self.queues)]
+        try:
+            target.put_nowait((time.time(), update))
+        except queue.Full:
+            # Telegram повторит доставку позже
+            logger.warning("Очередь воркера переполнена, апдейт %s отклонён", update.get("update_id"))
+            return web.Response(status=503)
+        return web.Response()
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        # при PROMETHEUS_MULTIPROC_DIR здесь сводные метрики всех воркеров
+        return web.Response(body=render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(settings.webhook_path, self.handle)
+        app.router.add_get("/metrics", self.metrics)
+        return app
+
+
+async def run_webhook(bot, allowed_updates: List[str]) -> None:
+    """Регистрирует webhook в Telegram и обслуживает его до остановки процесса."""
+    if not settings.webhook_url:
+        raise RuntimeError("BOT_WEBHOOK_URL не задан")
+
+    workers = settings.webhook_workers or multiprocessing.cpu_count()
+    server = WebhookServer(workers)
+    server.start_workers()
+    runner = web.AppRunner(server.build_app())
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, settings.webhook_host, settings.webhook_port).start()
+        await bot.set_webhook(
+            url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret or None,
+            allowed_updates=allowed_updates,
+            max_connections=settings.webhook_max_connections,
+        )
+        logger.info(
+            "Webhook слушает %s:%s%s, воркеров: %s",
+            settings.webhook_host,
+            settings.webhook_port,
+            settings.webhook_path,
+            workers,
+        )
+        await server.supervise()
+    finally:
+        await runner.cleanup()
+        server.stop_workers()